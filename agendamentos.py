@@ -0,0 +1,392 @@
+"""Agendamentos: transações programadas e recorrentes (ordens permanentes).
+
+Cada agendamento guarda só a chave das contas, o tipo, o valor, o próximo
+instante (segundos da época) e, se recorrente, o intervalo e as repetições
+restantes. Os próximos instantes ficam num heap de (instante, id); um
+cancelamento apenas tira o agendamento do dicionário e a entrada do heap é
+descartada quando chega ao topo. Os vencidos são retirados em lote e
+executados por Cliente.realizar_transacao, como as operações do menu.
+
+Com um diário (arquivo JSON por linha), cada agendamento, avanço e
+cancelamento é gravado antes de ter efeito, então os agendamentos
+sobrevivem a reinícios. O avanço de um lote é gravado antes de executá-lo:
+uma queda no meio do lote não repete pagamentos (no máximo uma vez). Na
+abertura o diário é compactado para conter só os agendamentos ativos.
+
+Um recorrente que perdeu várias ocorrências (sistema parado, por exemplo)
+não dispara uma rajada ao voltar: as ocorrências vencidas são agrupadas e
+executadas no máximo limite_atrasadas vezes (1 por padrão, ou seja, uma
+execução só; None executa todas). As ocorrências puladas contam como
+repetições e o próximo instante passa a ser o primeiro ainda no futuro.
+
+A thread do agendador não escreve no terminal: o que as operações dela
+imprimiriam fica guardado (as últimas mensagens) junto com a contagem do
+que ela executou, e uma falha numa rodada é registrada e contada sem
+encerrar a thread.
+"""
+
+from collections import deque
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+import metricas
+
+
+DEPOSITO = 'deposito'
+SAQUE = 'saque'
+TRANSFERENCIA = 'transferencia'
+TIPOS = (DEPOSITO, SAQUE, TRANSFERENCIA)
+
+
+def _resultado_vazio():
+    return {'executados': 0, 'recusados': 0, 'falhas': 0}
+
+
+_desvios = {}  # Identificador da thread -> função que recebe o que ela imprime
+_lock_saida = threading.Lock()
+
+
+class _SaidaDesviada:
+    """sys.stdout que entrega a escrita das threads desviadas à função delas"""
+
+    def __init__(self, original):
+        self._original = original
+
+    def write(self, texto):
+        destino = _desvios.get(threading.get_ident())
+        if destino is None:
+            return self._original.write(texto)
+        destino(texto)
+        return len(texto)
+
+    def __getattr__(self, nome):
+        return getattr(self._original, nome)
+
+
+def _desviar_saida(destino):
+    """Desvia para destino(texto) o que a thread corrente imprimir; as demais continuam no terminal"""
+    with _lock_saida:
+        if not isinstance(sys.stdout, _SaidaDesviada):
+            sys.stdout = _SaidaDesviada(sys.stdout)
+        _desvios[threading.get_ident()] = destino
+
+
+def _restaurar_saida():
+    with _lock_saida:
+        _desvios.pop(threading.get_ident(), None)
+
+
+class Agendamento:
+    """Uma transação programada; intervalo em segundos para as recorrentes"""
+
+    __slots__ = ('id', 'agencia', 'numero', 'tipo', 'valor', 'instante', 'intervalo', 'restantes', 'destino')
+
+    def __init__(self, id, agencia, numero, tipo, valor, instante, intervalo=None, restantes=None, destino=None):
+        self.id = id
+        self.agencia = agencia
+        self.numero = numero
+        self.tipo = tipo
+        self.valor = valor
+        self.instante = instante
+        self.intervalo = intervalo
+        self.restantes = restantes  # None: repete até ser cancelado
+        self.destino = destino  # (agência, número) das transferências
+
+    def registro(self):
+        return {'op': 'agendar', 'id': self.id, 'agencia': self.agencia, 'numero': self.numero,
+                'tipo': self.tipo, 'valor': self.valor, 'instante': self.instante,
+                'intervalo': self.intervalo, 'restantes': self.restantes,
+                'destino': list(self.destino) if self.destino else None}
+
+    def vencidas(self, agora):
+        """Ocorrências vencidas até agora, a atual inclusive, sem passar das repetições restantes"""
+        if not self.intervalo:
+            return 1
+        vencidas = int((agora - self.instante) // self.intervalo) + 1
+        return vencidas if self.restantes is None else min(vencidas, self.restantes)
+
+    def avancar(self, ocorrencias=1):
+        """Pula as ocorrências informadas; retorna False se não há outra"""
+        if not self.intervalo or (self.restantes is not None and self.restantes <= ocorrencias):
+            return False
+        self.instante += self.intervalo * ocorrencias
+        if self.restantes is not None:
+            self.restantes -= ocorrencias
+        return True
+
+
+class Agendador:
+    """Heap de agendamentos pendentes, executados em lote quando vencem"""
+
+    def __init__(self, sistema, diario=None, relogio=time.time, tamanho_lote=1000, limite_atrasadas=1,
+                 registrar_metricas=True):
+        self._sistema = sistema
+        self._caminho_diario = diario
+        self._relogio = relogio
+        self._tamanho_lote = tamanho_lote
+        self._limite_atrasadas = limite_atrasadas  # Execuções por recuperação de um recorrente atrasado
+        self._agendamentos = {}
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._mudou = threading.Condition(self._lock)
+        self._thread = None
+        self._parar = False
+        self._resultado_thread = _resultado_vazio()  # O que a thread executou desde a última consulta
+        self._mensagens_thread = deque(maxlen=100)  # O que as operações da thread imprimiriam (as últimas)
+        self._diario = None
+
+        if diario:
+            self._carregar_diario()
+            self._diario = open(diario, 'a', encoding='utf-8')
+        if registrar_metricas:
+            metricas.registro.medidor('agendamentos_pendentes', len,
+                                      "Agendamentos aguardando execução", dono=self)
+
+    def __len__(self):
+        return len(self._agendamentos)
+
+    # Diário
+
+    def _carregar_diario(self):
+        if os.path.exists(self._caminho_diario):
+            with open(self._caminho_diario, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        break  # Última linha truncada por uma queda: o resto não foi gravado
+                    self._reaplicar(registro)
+        maior = max(self._agendamentos, default=0)
+        self._ids = itertools.count(maior + 1)
+        self._heap = [(agendamento.instante, agendamento.id) for agendamento in self._agendamentos.values()]
+        heapq.heapify(self._heap)
+        self._compactar()
+
+    def _reaplicar(self, registro):
+        operacao = registro['op']
+        if operacao == 'agendar':
+            destino = registro['destino']
+            self._agendamentos[registro['id']] = Agendamento(
+                registro['id'], registro['agencia'], registro['numero'], registro['tipo'], registro['valor'],
+                registro['instante'], registro['intervalo'], registro['restantes'],
+                tuple(destino) if destino else None)
+        elif operacao == 'avancar':
+            agendamento = self._agendamentos.get(registro['id'])
+            if agendamento is not None:
+                agendamento.instante = registro['instante']
+                agendamento.restantes = registro['restantes']
+        elif operacao in ('cancelar', 'concluir'):
+            self._agendamentos.pop(registro['id'], None)
+
+    def _compactar(self):
+        """Reescreve o diário só com os agendamentos ativos (troca atômica do arquivo)"""
+        temporario = self._caminho_diario + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            for agendamento in self._agendamentos.values():
+                arquivo.write(json.dumps(agendamento.registro()) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self._caminho_diario)
+
+    def _gravar(self, registros):
+        if self._diario is None:
+            return
+        self._diario.write(''.join(json.dumps(registro) + "\n" for registro in registros))
+        self._diario.flush()
+
+    # Agendamento
+
+    def agendar(self, conta, tipo, valor, instante, intervalo=None, repeticoes=None, destino=None):
+        """Programa uma transação para o instante (segundos da época); retorna o id do agendamento"""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de agendamento inválido: {tipo}")
+        if tipo == TRANSFERENCIA and destino is None:
+            raise ValueError("Transferência agendada precisa da conta de destino")
+        if valor <= 0:
+            raise ValueError("O valor agendado deve ser positivo")
+        with self._lock:
+            agendamento = Agendamento(
+                next(self._ids), conta.agencia, conta.numero, tipo, valor, instante, intervalo, repeticoes,
+                (destino.agencia, destino.numero) if destino is not None else None)
+            self._gravar([agendamento.registro()])
+            self._agendamentos[agendamento.id] = agendamento
+            heapq.heappush(self._heap, (agendamento.instante, agendamento.id))
+            self._mudou.notify()
+        return agendamento.id
+
+    def cancelar(self, identificador):
+        """Cancela o agendamento; retorna False se ele não existe (ou já terminou)"""
+        with self._lock:
+            if identificador not in self._agendamentos:
+                return False
+            self._gravar([{'op': 'cancelar', 'id': identificador}])
+            del self._agendamentos[identificador]
+            return True
+
+    def pendentes(self, conta=None, limite=20):
+        """Próximos agendamentos (de uma conta, se informada), em ordem de vencimento"""
+        chave = (conta.agencia, conta.numero) if conta is not None else None
+        with self._lock:
+            agendamentos = [agendamento for agendamento in self._agendamentos.values()
+                            if chave is None or (agendamento.agencia, agendamento.numero) == chave]
+        return heapq.nsmallest(limite, agendamentos, key=lambda agendamento: (agendamento.instante, agendamento.id))
+
+    def proximo_instante(self):
+        with self._lock:
+            self._limpar_topo()
+            return self._heap[0][0] if self._heap else None
+
+    def _limpar_topo(self):
+        # Entradas de agendamentos cancelados ou já avançados são descartadas ao chegar ao topo
+        while self._heap:
+            instante, identificador = self._heap[0]
+            agendamento = self._agendamentos.get(identificador)
+            if agendamento is not None and agendamento.instante == instante:
+                return
+            heapq.heappop(self._heap)
+
+    # Execução
+
+    def _retirar_vencidos(self, agora):
+        """Retira um lote de vencidos e grava o avanço de cada um antes da execução (com o lock)"""
+        lote = []
+        registros = []
+        while len(lote) < self._tamanho_lote:
+            self._limpar_topo()
+            if not self._heap or self._heap[0][0] > agora:
+                break
+            _, identificador = heapq.heappop(self._heap)
+            agendamento = self._agendamentos[identificador]
+            # Ocorrências atrasadas são agrupadas: no máximo limite_atrasadas execuções
+            vencidas = agendamento.vencidas(agora)
+            execucoes = vencidas if self._limite_atrasadas is None else min(vencidas, self._limite_atrasadas)
+            lote.extend((agendamento, agendamento.instante + (agendamento.intervalo or 0) * indice)
+                        for indice in range(execucoes))
+            if agendamento.avancar(vencidas):
+                registros.append({'op': 'avancar', 'id': identificador, 'instante': agendamento.instante,
+                                  'restantes': agendamento.restantes})
+                heapq.heappush(self._heap, (agendamento.instante, identificador))
+            else:
+                registros.append({'op': 'concluir', 'id': identificador})
+                del self._agendamentos[identificador]
+        if registros:
+            self._gravar(registros)
+        return lote
+
+    def _transacao(self, agendamento):
+        from sistema_bancario_POO_decoradores_relatorios_limites import Deposito, Saque, Transferencia
+
+        if agendamento.tipo == DEPOSITO:
+            return Deposito(agendamento.valor)
+        if agendamento.tipo == SAQUE:
+            return Saque(agendamento.valor)
+        destino = self._sistema.buscar_conta(*agendamento.destino)
+        return Transferencia(agendamento.valor, destino) if destino is not None else None
+
+    def executar_vencidos(self, agora=None):
+        """Executa, em lotes, tudo o que venceu até agora; retorna a contagem por resultado"""
+        agora = self._relogio() if agora is None else agora
+        resultado = _resultado_vazio()
+        while True:
+            with self._lock:
+                lote = self._retirar_vencidos(agora)
+            if not lote:
+                return resultado
+
+            inicio = time.perf_counter_ns()
+            for agendamento, _ in lote:
+                conta = self._sistema.buscar_conta(agendamento.agencia, agendamento.numero)
+                transacao = self._transacao(agendamento) if conta is not None else None
+                if transacao is None:
+                    resultado['falhas'] += 1  # Conta de origem ou de destino não existe mais
+                elif conta.cliente.realizar_transacao(conta, transacao):
+                    resultado['executados'] += 1
+                else:
+                    resultado['recusados'] += 1
+            metricas.registro.observar('agendamentos_lote', time.perf_counter_ns() - inicio, 'sucesso')
+
+    # Thread de execução
+
+    def iniciar(self, espera_maxima=60.0):
+        """Executa os vencidos numa thread própria, acordando no próximo vencimento"""
+        if self._thread is not None:
+            return
+        self._parar = False
+        self._thread = threading.Thread(target=self._laco, args=(espera_maxima,), name="agendador", daemon=True)
+        self._thread.start()
+
+    def resultado_em_segundo_plano(self):
+        """Contagem do que a thread executou desde a consulta anterior"""
+        with self._lock:
+            resultado, self._resultado_thread = self._resultado_thread, _resultado_vazio()
+        return resultado
+
+    def mensagens_em_segundo_plano(self):
+        """Mensagens da thread (operações e falhas) desde a consulta anterior"""
+        with self._lock:
+            mensagens = list(self._mensagens_thread)
+            self._mensagens_thread.clear()
+        return mensagens
+
+    def _guardar_mensagem(self, texto):
+        linhas = [linha for linha in texto.splitlines() if linha.strip()]
+        if linhas:
+            with self._lock:
+                self._mensagens_thread.extend(linhas)
+
+    def _laco(self, espera_maxima):
+        _desviar_saida(self._guardar_mensagem)  # Sem prints da thread no meio do menu
+        try:
+            self._laco_desviado(espera_maxima)
+        finally:
+            _restaurar_saida()
+
+    def _laco_desviado(self, espera_maxima):
+        while True:
+            inicio = time.perf_counter_ns()
+            try:
+                resultado = self.executar_vencidos()
+            except Exception as erro:  # Uma rodada que falha não pode matar a thread: a próxima tenta de novo
+                metricas.registro.observar('agendamentos_lote', time.perf_counter_ns() - inicio, 'erro')
+                self._guardar_mensagem(f"⚠️ Falha ao executar agendamentos: {type(erro).__name__}: {erro}")
+                resultado = _resultado_vazio()
+            with self._lock:
+                for chave, quantidade in resultado.items():
+                    self._resultado_thread[chave] += quantidade
+                if self._parar:
+                    return
+                self._limpar_topo()
+                espera = espera_maxima
+                if self._heap:
+                    espera = min(espera_maxima, max(0.0, self._heap[0][0] - self._relogio()))
+                # Um agendamento novo (ou parar) acorda a thread antes do prazo
+                self._mudou.wait(espera)
+                if self._parar:
+                    return
+
+    def parar(self):
+        with self._lock:
+            self._parar = True
+            self._mudou.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def fechar(self):
+        metricas.registro.remover_medidores(self)
+        self.parar()
+        if self._diario is not None:
+            self._diario.close()
+            self._diario = None
+
+
+def limite_atrasadas_por_ambiente():
+    """Execuções por recuperação de um recorrente atrasado (BANCO_AGENDAMENTOS_ATRASADAS; 0 executa todas)"""
+    limite = int(os.environ.get('BANCO_AGENDAMENTOS_ATRASADAS', '1'))
+    return limite or None
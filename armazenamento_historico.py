@@ -0,0 +1,195 @@
+"""Camada fria do histórico de transações.
+
+O Historico mantém em memória só a janela recente; as entradas mais antigas
+são descarregadas em segmentos gzip (uma entrada JSON por linha) e cada
+segmento guarda no índice em memória o menor e o maior instante que contém.
+Consultas por período abrem apenas os segmentos cujo intervalo as cruza.
+
+A gravação de um segmento (compressão e escrita) roda numa thread de descarga
+do processo, fora do lock da conta. Ao reiniciar, os segmentos que já estão no
+diretório voltam ao índice da camada da conta (e a numeração continua depois
+deles); os de uma conta aberta de novo são apagados, já que o histórico dela
+recomeça vazio.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import itertools
+import json
+import os
+import re
+import threading
+
+_executor_descarga = None
+_lock_executor = threading.Lock()
+
+
+def chave_data(data):
+    """Converte 'DD/MM/AAAA HH:MM:SS' numa chave ordenável ('AAAAMMDDHH:MM:SS')"""
+    return data[6:10] + data[3:5] + data[0:2] + data[11:]
+
+
+def chave_datetime(momento):
+    """Mesma chave de chave_data, a partir de um datetime"""
+    return momento.strftime('%Y%m%d%H:%M:%S')
+
+
+def descarregar_em_segundo_plano(gravar, entradas):
+    """Agenda gravar(entradas) na thread de descarga do processo; retorna o Future do segmento"""
+    global _executor_descarga
+    with _lock_executor:
+        if _executor_descarga is None:
+            _executor_descarga = ThreadPoolExecutor(max_workers=1, thread_name_prefix='descarga-historico')
+    return _executor_descarga.submit(gravar, entradas)
+
+
+def aguardar_descargas():
+    """Espera as descargas já agendadas (a thread é única, então elas terminam em ordem)"""
+    with _lock_executor:
+        executor = _executor_descarga
+    if executor is not None:
+        executor.submit(lambda: None).result()
+
+
+class SegmentoFrio:
+    """Um arquivo de entradas descarregadas e o intervalo de datas que ele cobre"""
+
+    def __init__(self, caminho, inicio, fim, quantidade):
+        self.caminho = caminho
+        self.inicio = inicio
+        self.fim = fim
+        self.quantidade = quantidade
+
+    def cruza(self, inicio, fim):
+        """True se o segmento tem entradas possivelmente dentro de [inicio, fim]"""
+        return (inicio is None or self.fim >= inicio) and (fim is None or self.inicio <= fim)
+
+
+def indexar_segmento(caminho):
+    """Lê um segmento já gravado e devolve o SegmentoFrio com o seu intervalo"""
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        chaves = [chave_data(json.loads(linha)['data']) for linha in arquivo]
+    return SegmentoFrio(caminho, min(chaves), max(chaves), len(chaves))
+
+
+class CamadaFria:
+    """Segmentos em disco do histórico de uma conta"""
+
+    def __init__(self, diretorio, prefixo, nivel_compressao=6, sequencia=None, segmentos=()):
+        self._diretorio = diretorio
+        self._prefixo = prefixo
+        self._nivel_compressao = nivel_compressao
+        self._segmentos = list(segmentos)  # Os já gravados, se a camada foi reconstruída do diretório
+        # Números dos arquivos; o armazenamento passa um contador que continua depois dos já gravados
+        self._sequencia = sequencia or itertools.count(1)
+
+    @property
+    def segmentos(self):
+        return self._segmentos
+
+    @property
+    def quantidade(self):
+        return sum(segmento.quantidade for segmento in self._segmentos)
+
+    def gravar(self, entradas):
+        """Grava as entradas num novo segmento e o acrescenta ao índice"""
+        chaves = [chave_data(entrada['data']) for entrada in entradas]
+        caminho = os.path.join(self._diretorio, f"{self._prefixo}_{next(self._sequencia):06d}.jsonl.gz")
+        with gzip.open(caminho, 'wt', encoding='utf-8', compresslevel=self._nivel_compressao) as arquivo:
+            for entrada in entradas:
+                arquivo.write(json.dumps(entrada, ensure_ascii=False))
+                arquivo.write('\n')
+        segmento = SegmentoFrio(caminho, min(chaves), max(chaves), len(entradas))
+        # Troca a lista inteira: quem já está iterando continua com o índice antigo
+        self._segmentos = self._segmentos + [segmento]
+        return segmento
+
+    def ler(self, segmento):
+        with gzip.open(segmento.caminho, 'rt', encoding='utf-8') as arquivo:
+            return [json.loads(linha) for linha in arquivo]
+
+    def entradas(self, inicio=None, fim=None, segmentos=None):
+        """Entradas entre as chaves inicio e fim, abrindo só os segmentos do intervalo.
+
+        segmentos restringe a leitura a uma versão anterior do índice.
+        """
+        for segmento in self._segmentos if segmentos is None else segmentos:
+            if not segmento.cruza(inicio, fim):
+                continue
+            for entrada in self.ler(segmento):
+                if inicio is None and fim is None:
+                    yield entrada
+                    continue
+                chave = chave_data(entrada['data'])
+                if (inicio is None or chave >= inicio) and (fim is None or chave <= fim):
+                    yield entrada
+
+
+class ArmazenamentoHistorico:
+    """Cria as camadas frias das contas num diretório comum"""
+
+    def __init__(self, diretorio, janela_quente=1000, nivel_compressao=6):
+        os.makedirs(diretorio, exist_ok=True)
+        self._diretorio = diretorio
+        self._janela_quente = janela_quente
+        self._nivel_compressao = nivel_compressao
+        self._lock = threading.Lock()
+        self._camadas = {}  # Uma camada por prefixo, reaproveitada se a conta for ligada de novo
+        # Segmentos já em disco por prefixo, listados uma vez (não a cada camada) e indexados sob demanda
+        self._arquivos = {}
+        padrao = re.compile(r"(.+)_(\d+)\.jsonl\.gz$")
+        for nome in os.listdir(diretorio):
+            encontrado = padrao.match(nome)
+            if encontrado:
+                self._arquivos.setdefault(encontrado.group(1), []).append(
+                    (int(encontrado.group(2)), os.path.join(diretorio, nome)))
+
+    @property
+    def janela_quente(self):
+        return self._janela_quente
+
+    def camada(self, conta, nova=False):
+        """Camada fria da conta, com arquivos prefixados por agência e número.
+
+        Os segmentos que a conta já tem em disco voltam ao índice da camada. Com nova, a conta
+        acabou de ser aberta: esses segmentos são de outra conta com o mesmo número, de uma
+        execução cujas contas não foram guardadas, e são apagados.
+        """
+        prefixo = f"{conta.agencia}_{conta.numero}"
+        with self._lock:
+            camada = self._camadas.get(prefixo)
+            if camada is not None and not nova:
+                return camada
+            if camada is not None:
+                aguardar_descargas()  # Um segmento ainda sendo gravado também entra na lista
+                arquivos = [segmento.caminho for segmento in camada.segmentos]
+            else:
+                arquivos = [caminho for _, caminho in sorted(self._arquivos.pop(prefixo, []))]
+            if nova:
+                for caminho in arquivos:
+                    try:
+                        os.remove(caminho)
+                    except FileNotFoundError:
+                        pass
+                camada = CamadaFria(self._diretorio, prefixo, self._nivel_compressao)
+            else:
+                segmentos = []
+                for caminho in arquivos:
+                    try:
+                        segmentos.append(indexar_segmento(caminho))
+                    except (OSError, EOFError, ValueError) as erro:  # Segmento truncado por uma queda
+                        print(f"⚠️ Segmento ignorado {caminho}: {erro}")
+                # A numeração continua depois do último arquivo, mesmo que ele tenha sido ignorado
+                ultimo = int(re.search(r"_(\d+)\.jsonl\.gz$", arquivos[-1]).group(1)) if arquivos else 0
+                camada = CamadaFria(self._diretorio, prefixo, self._nivel_compressao,
+                                    itertools.count(ultimo + 1), segmentos)
+            self._camadas[prefixo] = camada
+        return camada
+
+
+def armazenamento_por_ambiente():
+    """Camada fria em BANCO_HISTORICO_DIR, se definido (janela em BANCO_HISTORICO_JANELA)"""
+    diretorio = os.environ.get('BANCO_HISTORICO_DIR')
+    if not diretorio:
+        return None
+    return ArmazenamentoHistorico(diretorio, int(os.environ.get('BANCO_HISTORICO_JANELA', '1000')))
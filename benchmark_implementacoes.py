@@ -0,0 +1,342 @@
+"""Benchmark diferencial entre as cinco gerações do sistema bancário.
+
+Executa o mesmo roteiro de depósitos e saques em cada implementação, seja
+respondendo aos prompts do loop de input() ("entrada"), seja chamando as
+funções/classes diretamente ("direto"). Confere saldo final e extrato contra
+um modelo de referência (com o limite diário de transações das gerações que o
+têm) e mostra vazão, latência e pico de memória lado a lado.
+
+Uso:
+    python benchmark_implementacoes.py --operacoes 500 --modo ambos
+"""
+
+import argparse
+import builtins
+from contextlib import redirect_stdout
+import io
+import os
+import random
+import re
+import runpy
+import statistics
+import time
+import tracemalloc
+
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+LIMITE_SAQUE = 500.0
+LIMITE_SAQUES = 3
+DEPOSITO_INICIAL = 1000.0
+
+CLIENTE = {
+    'nome': "Cliente Benchmark",
+    'nascimento': "01/01/1990",
+    'cpf': "52998224725",
+    'logradouro': "Rua das Flores",
+    'numero': "100",
+    'bairro': "Centro",
+    'cidade': "São Paulo",
+    'estado': "SP",
+    'endereco': "Rua das Flores, 100 - Centro - São Paulo/SP",
+}
+
+
+class Implementacao:
+    """Descreve como dirigir uma das implementações pelo loop de input()"""
+
+    def __init__(self, nome, arquivo, codigos, entrada=None, saldo_inicial=0.0, limite_transacoes_diarias=None):
+        self.nome = nome
+        self.arquivo = arquivo
+        self.codigos = codigos
+        self.entrada = entrada  # None: o loop roda ao importar o módulo
+        self.saldo_inicial = saldo_inicial
+        self.limite_transacoes_diarias = limite_transacoes_diarias  # None: sem limite diário
+
+    @property
+    def caminho(self):
+        return os.path.join(DIRETORIO, self.arquivo)
+
+    def preparacao(self):
+        """Operações que criam cliente e conta e deixam o saldo inicial igual ao da referência"""
+        if 'criar_cliente' not in self.codigos:
+            return []
+        return [('criar_cliente', None), ('criar_conta', None), ('deposito', DEPOSITO_INICIAL)]
+
+
+_CODIGOS_MENU_NUMERICO = {
+    'criar_cliente': '1', 'criar_conta': '2', 'saque': '3', 'deposito': '4', 'extrato': '5', 'sair': '0'
+}
+
+IMPLEMENTACOES = [
+    Implementacao("sistema_bancario", "sistema_bancario.py",
+                  {'saque': '1', 'deposito': '2', 'extrato': '3', 'sair': '0'},
+                  entrada='main', saldo_inicial=DEPOSITO_INICIAL),
+    Implementacao("refatorado", "sistema_bancario_refatorado.py", _CODIGOS_MENU_NUMERICO, entrada='main'),
+    Implementacao("desafio_v2", "desafio_v2.py",
+                  {'criar_cliente': 'nu', 'criar_conta': 'nc', 'saque': 's', 'deposito': 'd',
+                   'extrato': 'e', 'sair': 'q'}),
+    Implementacao("POO_desafiocompleto", "sistema_bancario_POO_desafiocompleto.py",
+                  _CODIGOS_MENU_NUMERICO, entrada='SistemaBancario'),
+    Implementacao("POO_decoradores_limites", "sistema_bancario_POO_decoradores_relatorios_limites.py",
+                  _CODIGOS_MENU_NUMERICO, entrada='SistemaBancario', limite_transacoes_diarias=10),
+]
+
+
+def gerar_roteiro(operacoes, semente=42):
+    """Gera depósitos e saques, incluindo valores inválidos e acima do limite"""
+    rng = random.Random(semente)
+    roteiro = []
+    for _ in range(operacoes):
+        sorteio = rng.random()
+        if sorteio < 0.05:
+            valor = -round(rng.uniform(1, 100), 2)
+        elif sorteio < 0.55:
+            valor = round(rng.uniform(10, 800), 2)
+        else:
+            valor = round(rng.uniform(10, 700), 2)
+        roteiro.append(('deposito' if 0.05 <= sorteio < 0.55 else 'saque', valor))
+    return roteiro
+
+
+def simular_referencia(roteiro, limite_transacoes_diarias=None):
+    """Aplica as regras comuns a todas as gerações: saldo, limite por saque e 3 saques.
+
+    Com limite_transacoes_diarias, como na geração com limites, o depósito
+    inicial conta e, atingido o limite, toda operação seguinte é recusada.
+    """
+    saldo = DEPOSITO_INICIAL
+    saques = 0
+    extrato = [('Deposito', DEPOSITO_INICIAL)]
+    for tipo, valor in roteiro:
+        if limite_transacoes_diarias is not None and len(extrato) >= limite_transacoes_diarias:
+            break
+        if tipo == 'deposito':
+            if valor > 0:
+                saldo += valor
+                extrato.append(('Deposito', valor))
+        elif saques < LIMITE_SAQUES and 0 < valor <= LIMITE_SAQUE and valor <= saldo:
+            saldo -= valor
+            saques += 1
+            extrato.append(('Saque', valor))
+    return round(saldo, 2), extrato
+
+
+class _Saida(io.TextIOBase):
+    """stdout que descarta tudo, exceto enquanto o extrato final é impresso"""
+
+    def __init__(self):
+        self.capturando = False
+        self._partes = []
+
+    def write(self, texto):
+        if self.capturando:
+            self._partes.append(texto)
+        return len(texto)
+
+    @property
+    def capturado(self):
+        return "".join(self._partes)
+
+
+class _EntradaRoteirizada:
+    """Substitui input(): responde a cada prompt conforme a operação corrente"""
+
+    def __init__(self, operacoes, codigos, saida):
+        self._operacoes = operacoes
+        self._codigos = codigos
+        self._saida = saida
+        self._indice = -1
+        self.marcas = []
+
+    def __call__(self, prompt=""):
+        texto = prompt.lower()
+        if 'escolha uma operação' in texto or texto.rstrip().endswith('=>'):
+            self._indice += 1
+            if self._indice >= len(self._operacoes):
+                raise RuntimeError("Roteiro terminou sem o programa sair do menu")
+            self.marcas.append(time.perf_counter_ns())
+            operacao = self._operacoes[self._indice][0]
+            self._saida.capturando = operacao == 'extrato'
+            return self._codigos[operacao]
+
+        # A ordem importa: "Selecione o número da conta" e "CPF (apenas números)" contêm "número"
+        if 'enter' in texto:
+            return ""
+        if 'selecione' in texto:
+            return "1"
+        if 'valor' in texto:
+            return str(self._operacoes[self._indice][1])
+        for chave in ('cpf', 'nome', 'nascimento', 'endereço', 'logradouro', 'número',
+                      'bairro', 'cidade', 'estado'):
+            if chave in texto:
+                return CLIENTE[chave.replace('ç', 'c').replace('ú', 'u')]
+        raise RuntimeError(f"Prompt inesperado: {prompt!r}")
+
+
+def _ler_extrato(texto):
+    """Normaliza o extrato impresso por qualquer geração em [(tipo, valor)] e saldo"""
+    extrato = [
+        ('Deposito' if tipo.startswith('Dep') else 'Saque', float(valor))
+        for tipo, valor in re.findall(r"(Saque|Dep[oó]sito):\s*[+-]?R\$ (-?[\d.]+)", texto)
+    ]
+    saldos = re.findall(r"Saldo(?: atual)?:\s*R\$ (-?[\d.]+)", texto)
+    return (float(saldos[-1]) if saldos else None), extrato
+
+
+def executar_por_entrada(implementacao, roteiro):
+    """Roda o loop interativo da implementação alimentando input() com o roteiro"""
+    preparacao = implementacao.preparacao()
+    operacoes = preparacao + list(roteiro) + [('extrato', None), ('sair', None)]
+    saida = _Saida()
+    entrada = _EntradaRoteirizada(operacoes, implementacao.codigos, saida)
+
+    input_original = builtins.input
+    builtins.input = entrada
+    try:
+        with redirect_stdout(saida):
+            namespace = runpy.run_path(implementacao.caminho, run_name="benchmark")
+            if implementacao.entrada == 'main':
+                namespace['main']()
+            elif implementacao.entrada == 'SistemaBancario':
+                namespace['SistemaBancario']().executar()
+    finally:
+        builtins.input = input_original
+
+    saldo, extrato = _ler_extrato(saida.capturado)
+    # A primeira geração já começa com saldo, sem lançamento no extrato
+    if implementacao.saldo_inicial:
+        extrato.insert(0, ('Deposito', implementacao.saldo_inicial))
+
+    marcas = entrada.marcas[len(preparacao):len(preparacao) + len(roteiro) + 1]
+    latencias = [fim - inicio for inicio, fim in zip(marcas, marcas[1:])]
+    return saldo, extrato, latencias
+
+
+def _carregar_sem_executar(implementacao):
+    """Obtém o namespace do módulo; desafio_v2 roda o menu ao importar, então sai na hora"""
+    input_original = builtins.input
+    builtins.input = lambda prompt="": implementacao.codigos['sair']
+    try:
+        with redirect_stdout(_Saida()):
+            return runpy.run_path(implementacao.caminho, run_name="benchmark")
+    finally:
+        builtins.input = input_original
+
+
+def _direto_refatorado(namespace, roteiro):
+    saldo, extrato, saques = 0.0, [], 0
+    saldo, extrato = namespace['deposito'](saldo, DEPOSITO_INICIAL, extrato)
+    latencias = []
+    for tipo, valor in roteiro:
+        inicio = time.perf_counter_ns()
+        if tipo == 'deposito':
+            saldo, extrato = namespace['deposito'](saldo, valor, extrato)
+        else:
+            anterior = saldo
+            saldo, extrato = namespace['saque'](saldo=saldo, valor=valor, extrato=extrato, limite=LIMITE_SAQUE,
+                                                numero_saques=saques, limite_saques=LIMITE_SAQUES)
+            saques += saldo != anterior
+        latencias.append(time.perf_counter_ns() - inicio)
+    return saldo, _ler_extrato("\n".join(extrato))[1], latencias
+
+
+def _direto_poo(namespace, roteiro):
+    classe_cliente = namespace.get('PessoaFisicaCliente') or namespace['PessoaFisica']
+    cliente = classe_cliente(nome=CLIENTE['nome'], data_nascimento=CLIENTE['nascimento'],
+                             cpf=CLIENTE['cpf'], endereco=CLIENTE['endereco'])
+    conta = namespace['ContaCorrente'].nova_conta(cliente=cliente, numero=1)
+    cliente.adicionar_conta(conta)
+    cliente.realizar_transacao(conta, namespace['Deposito'](DEPOSITO_INICIAL))
+
+    deposito, saque = namespace['Deposito'], namespace['Saque']
+    latencias = []
+    for tipo, valor in roteiro:
+        inicio = time.perf_counter_ns()
+        cliente.realizar_transacao(conta, deposito(valor) if tipo == 'deposito' else saque(valor))
+        latencias.append(time.perf_counter_ns() - inicio)
+    extrato = [(transacao['tipo'], transacao['valor']) for transacao in conta.historico.transacoes]
+    return conta.saldo, extrato, latencias
+
+
+DIRETOS = {
+    "refatorado": _direto_refatorado,
+    "desafio_v2": _direto_poo,
+    "POO_desafiocompleto": _direto_poo,
+    "POO_decoradores_limites": _direto_poo,
+}
+
+
+def executar_direto(implementacao, roteiro):
+    """Chama as funções/classes da implementação sem passar pelo menu"""
+    namespace = _carregar_sem_executar(implementacao)
+    with redirect_stdout(_Saida()):
+        return DIRETOS[implementacao.nome](namespace, roteiro)
+
+
+def _comparar(esperado, obtido):
+    saldo_esperado, extrato_esperado = esperado
+    saldo, extrato = obtido
+    extrato = [(tipo, round(valor, 2)) for tipo, valor in extrato]
+    for posicao, (a, b) in enumerate(zip(extrato_esperado, extrato), 1):
+        if a != b:
+            return f"DIVERGE no lançamento {posicao}: esperado {a}, obtido {b}"
+    if len(extrato) != len(extrato_esperado):
+        return f"DIVERGE: {len(extrato)} lançamentos, esperados {len(extrato_esperado)}"
+    if saldo is None or round(saldo, 2) != saldo_esperado:
+        return f"DIVERGE no saldo: esperado {saldo_esperado:.2f}, obtido {saldo}"
+    return "OK"
+
+
+def medir(implementacao, roteiro, modo):
+    """Executa uma vez para tempo e outra sob tracemalloc para o pico de memória"""
+    executor = executar_por_entrada if modo == 'entrada' else executar_direto
+    saldo, extrato, latencias = executor(implementacao, roteiro)
+
+    tracemalloc.start()
+    try:
+        executor(implementacao, roteiro)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    total_ns = sum(latencias) or 1
+    ordenadas = sorted(latencias)
+    return {
+        'implementacao': implementacao.nome,
+        'modo': modo,
+        'ops_por_segundo': len(latencias) / (total_ns / 1e9),
+        'p50_us': statistics.median(ordenadas) / 1000 if ordenadas else 0.0,
+        'p99_us': ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] / 1000 if ordenadas else 0.0,
+        'pico_kb': pico / 1024,
+        'resultado': _comparar(simular_referencia(roteiro, implementacao.limite_transacoes_diarias),
+                               (saldo, extrato)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara as implementações do sistema bancário")
+    parser.add_argument("--operacoes", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--modo", choices=["entrada", "direto", "ambos"], default="ambos")
+    args = parser.parse_args()
+
+    roteiro = gerar_roteiro(args.operacoes, args.semente)
+    modos = ["entrada", "direto"] if args.modo == "ambos" else [args.modo]
+
+    print(f"\n📊 BENCHMARK DIFERENCIAL ({args.operacoes} operações, semente {args.semente})")
+    print("=" * 110)
+    print(f"{'Implementação':<26}{'Modo':<9}{'ops/s':>10}{'p50 µs':>10}{'p99 µs':>10}{'pico KB':>10}  Resultado")
+    print("-" * 110)
+    for modo in modos:
+        for implementacao in IMPLEMENTACOES:
+            if modo == "direto" and implementacao.nome not in DIRETOS:
+                continue
+            linha = medir(implementacao, roteiro, modo)
+            print(f"{linha['implementacao']:<26}{modo:<9}{linha['ops_por_segundo']:>10.0f}"
+                  f"{linha['p50_us']:>10.1f}{linha['p99_us']:>10.1f}{linha['pico_kb']:>10.1f}  {linha['resultado']}")
+    print("=" * 110)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Busca de contas por número, CPF ou nome do titular.
+
+O índice guarda, para cada conta, a chave (agência, número) e o nome do
+titular normalizado (minúsculas, sem acentos). Número e CPF são buscas
+exatas; nomes usam um índice ordenado (bisect) para prefixos e, quando o
+prefixo não encontra nada, um índice de trigramas tolerante a erros de
+digitação. Os trigramas indexam nomes distintos, não contas: homônimos
+custam uma única verificação. Os resultados vêm paginados e só carregam
+as contas escolhidas.
+"""
+
+from array import array
+from bisect import bisect_left
+import math
+import re
+import threading
+import unicodedata
+
+import validacao
+
+
+_ESPACOS = re.compile(r'\s+')
+_REFERENCIA = re.compile(r'(?:(\w+)/)?(\d+)')
+_FIM_PREFIXO = '\U0010ffff'
+
+
+def normalizar_nome(nome):
+    """Minúsculas, sem acentos e com espaços simples ('João  Lima' -> 'joao lima')"""
+    decomposto = unicodedata.normalize('NFKD', nome)
+    sem_acentos = ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+    return _ESPACOS.sub(' ', sem_acentos).strip().lower()
+
+
+def trigramas(nome_normalizado):
+    """Trigramas das palavras do nome, com as bordas marcadas por espaços"""
+    resultado = set()
+    for palavra in nome_normalizado.split():
+        marcada = f"  {palavra} "
+        resultado.update(marcada[i:i + 3] for i in range(len(marcada) - 2))
+    return resultado
+
+
+class IndiceContas:
+    """Índices de busca das contas: número, nome ordenado e trigramas.
+
+    carga, se informada, é chamada na primeira busca e produz (agência, número,
+    titular) de todas as contas; até lá as contas novas já estão na carga.
+    """
+
+    def __init__(self, carga=None, limiar=0.6):
+        self._carga = carga
+        self._limiar = limiar  # Fração mínima dos trigramas da consulta presentes no nome
+        self._chaves = []  # id -> (agência, número)
+        self._titulares = []
+        self._por_numero = {}
+        self._ordenados = []  # (nome normalizado, id), ordenado
+        self._novos = []  # Entradas ainda fora de _ordenados: entram de uma vez na próxima busca
+        self._nomes = {}  # nome normalizado -> id do nome
+        self._contas_do_nome = []  # id do nome -> (nome, array de ids das contas)
+        self._trigramas = {}  # trigrama -> array de ids de nomes
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            self._garantir()
+            return len(self._chaves)
+
+    def adicionar(self, agencia, numero, titular):
+        with self._lock:
+            if self._carga is not None:
+                return  # A carga pendente já vai trazer esta conta
+            self._adicionar(agencia, numero, titular)
+
+    def _adicionar(self, agencia, numero, titular):
+        identificador = len(self._chaves)
+        nome = normalizar_nome(titular)
+        self._chaves.append((agencia, numero))
+        self._titulares.append(titular)
+        self._por_numero.setdefault(numero, []).append(identificador)
+        self._novos.append((nome, identificador))
+
+        id_nome = self._nomes.get(nome)
+        if id_nome is None:
+            id_nome = self._nomes[nome] = len(self._contas_do_nome)
+            self._contas_do_nome.append((nome, array('I')))
+            for trigrama in trigramas(nome):
+                postagens = self._trigramas.get(trigrama)
+                if postagens is None:
+                    postagens = self._trigramas[trigrama] = array('I')
+                postagens.append(id_nome)
+        self._contas_do_nome[id_nome][1].append(identificador)
+
+    def _garantir(self):
+        """Executa a carga pendente e incorpora as entradas novas ao índice ordenado (com o lock)"""
+        if self._carga is not None:
+            carga, self._carga = self._carga, None
+            for agencia, numero, titular in carga():
+                self._adicionar(agencia, numero, titular)
+        if self._novos:
+            # Duas sequências ordenadas: o Timsort as junta em tempo linear
+            self._novos.sort()
+            self._ordenados.extend(self._novos)
+            self._ordenados.sort()
+            self._novos = []
+
+    def _item(self, identificador):
+        agencia, numero = self._chaves[identificador]
+        return {'agencia': agencia, 'numero': numero, 'titular': self._titulares[identificador]}
+
+    def _pagina(self, modo, identificadores, total, pagina, por_pagina):
+        return {
+            'modo': modo,
+            'itens': [self._item(identificador) for identificador in identificadores],
+            'pagina': pagina,
+            'paginas': max(1, math.ceil(total / por_pagina)),
+            'total': total,
+        }
+
+    # Buscas
+
+    def buscar(self, consulta, pagina=1, por_pagina=20, sistema=None):
+        """Busca por AG/número, número, CPF (com sistema) ou nome, retornando uma página de resultados"""
+        consulta = consulta.strip()
+        cpf = validacao.normalizar_cpf(consulta)
+        if sistema is not None and len(cpf) == 11 and validacao.cpf_valido(cpf):
+            return self.por_cpf(sistema, cpf, pagina, por_pagina)
+        referencia = _REFERENCIA.fullmatch(consulta)
+        if referencia:
+            return self.por_numero(int(referencia.group(2)), referencia.group(1), pagina, por_pagina)
+        resultado = self.por_prefixo(consulta, pagina, por_pagina)
+        if resultado['total'] == 0 and consulta:
+            resultado = self.aproximada(consulta, pagina, por_pagina)
+        return resultado
+
+    def por_numero(self, numero, agencia=None, pagina=1, por_pagina=20):
+        with self._lock:
+            self._garantir()
+            encontrados = [identificador for identificador in self._por_numero.get(numero, ())
+                           if agencia is None or self._chaves[identificador][0] == agencia]
+            inicio = (pagina - 1) * por_pagina
+            return self._pagina('numero', encontrados[inicio:inicio + por_pagina], len(encontrados),
+                                pagina, por_pagina)
+
+    def por_cpf(self, sistema, cpf, pagina=1, por_pagina=20):
+        """Contas do cliente do CPF (o índice de CPF do sistema já é exato)"""
+        cliente = sistema.buscar_cliente_por_cpf(cpf)
+        contas = list(cliente.contas) if cliente is not None else []
+        inicio = (pagina - 1) * por_pagina
+        itens = [{'agencia': conta.agencia, 'numero': conta.numero, 'titular': cliente.nome}
+                 for conta in contas[inicio:inicio + por_pagina]]
+        return {'modo': 'cpf', 'itens': itens, 'pagina': pagina,
+                'paginas': max(1, math.ceil(len(contas) / por_pagina)), 'total': len(contas)}
+
+    def por_prefixo(self, prefixo, pagina=1, por_pagina=20):
+        """Contas cujo titular começa com o prefixo, em ordem alfabética (prefixo vazio lista todas)"""
+        prefixo = normalizar_nome(prefixo)
+        with self._lock:
+            self._garantir()
+            baixo = bisect_left(self._ordenados, (prefixo,))
+            alto = bisect_left(self._ordenados, (prefixo + _FIM_PREFIXO,))
+            inicio = baixo + (pagina - 1) * por_pagina
+            fatia = self._ordenados[inicio:min(inicio + por_pagina, alto)]
+            return self._pagina('prefixo', [identificador for _, identificador in fatia], alto - baixo,
+                                pagina, por_pagina)
+
+    def aproximada(self, consulta, pagina=1, por_pagina=20):
+        """Busca tolerante a erros: nomes com a maior parte dos trigramas da consulta"""
+        procurados = trigramas(normalizar_nome(consulta))
+        if not procurados:
+            return self._pagina('aproximada', [], 0, pagina, por_pagina)
+        minimo = math.ceil(self._limiar * len(procurados))
+        with self._lock:
+            self._garantir()
+            # Quem tem 'minimo' dos trigramas tem ao menos um dos len - minimo + 1 mais raros:
+            # só as postagens desses geram candidatos, os trigramas comuns ficam de fora
+            raros = sorted(procurados, key=lambda trigrama: len(self._trigramas.get(trigrama, ())))
+            candidatos = set()
+            for trigrama in raros[:len(procurados) - minimo + 1]:
+                candidatos.update(self._trigramas.get(trigrama, ()))
+
+            pontuados = []
+            for id_nome in candidatos:
+                nome, contas = self._contas_do_nome[id_nome]
+                comuns = len(procurados & trigramas(nome))
+                if comuns >= minimo:
+                    pontuados.append((-comuns, len(nome), nome, contas))
+            pontuados.sort()
+
+            # Pagina sobre as contas dos nomes, na ordem dos nomes mais parecidos
+            total = sum(len(contas) for *_, contas in pontuados)
+            inicio = (pagina - 1) * por_pagina
+            identificadores = []
+            for *_, contas in pontuados:
+                if inicio >= len(contas):
+                    inicio -= len(contas)
+                    continue
+                identificadores.extend(contas[inicio:inicio + por_pagina - len(identificadores)])
+                inicio = 0
+                if len(identificadores) == por_pagina:
+                    break
+            return self._pagina('aproximada', identificadores, total, pagina, por_pagina)
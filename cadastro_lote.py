@@ -0,0 +1,198 @@
+"""Cadastro em lote de clientes para o sistema bancário POO.
+
+Lê arquivos CSV de clientes (mesmo layout do clientes.csv do gerador_carga),
+valida CPF, data de nascimento e endereço em lotes num pool de processos,
+descarta CPFs já cadastrados, insere os válidos em bloco e grava um
+relatório com as linhas rejeitadas e o motivo.
+
+Uso:
+    python cadastro_lote.py carga/clientes.csv --banco banco.db --rejeicoes rejeitados.csv
+
+Pela linha de comando os clientes vão para o banco SQLite de --banco (ou de
+BANCO_SQLITE), aberto sob demanda: os CPFs já gravados contam como
+duplicados e o cadastro fica lá para o sistema bancário.
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from datetime import datetime
+import os
+import time
+
+import validacao
+
+
+CAMPOS = ('nome', 'data_nascimento', 'cpf', 'logradouro', 'numero', 'bairro', 'cidade', 'uf')
+
+
+def validar_lote(linhas, hoje):
+    """Valida um lote de (número da linha, campos); roda nos processos do pool.
+
+    Retorna (válidos, rejeitados): válidos são (linha, nome, data, cpf, endereço)
+    e rejeitados são (linha, cpf, motivo).
+    """
+    validos = []
+    rejeitados = []
+    for numero_linha, campos in linhas:
+        if len(campos) != len(CAMPOS):
+            rejeitados.append((numero_linha, '', 'linha_malformada'))
+            continue
+
+        nome, data_nascimento, cpf, logradouro, numero, bairro, cidade, uf = (campo.strip() for campo in campos)
+        cpf = validacao.normalizar_cpf(cpf)
+        if not nome:
+            motivo = 'nome_vazio'
+        elif not validacao.cpf_valido(cpf):
+            motivo = 'cpf_invalido'
+        elif not validacao.data_valida(data_nascimento, hoje):
+            motivo = 'data_invalida'
+        else:
+            motivo = validacao.motivo_endereco_invalido(logradouro, numero, bairro, cidade, uf)
+
+        if motivo:
+            rejeitados.append((numero_linha, cpf, motivo))
+        else:
+            endereco = f"{logradouro}, {numero} - {bairro} - {cidade}/{uf.upper()}"
+            validos.append((numero_linha, nome, data_nascimento, cpf, endereco))
+    return validos, rejeitados
+
+
+def ler_lotes(caminhos, tamanho_lote):
+    """Lê os arquivos em fluxo, produzindo listas de (número da linha, campos)"""
+    for caminho in caminhos:
+        with open(caminho, newline='', encoding='utf-8') as arquivo:
+            leitor = csv.reader(arquivo)
+            cabecalho = next(leitor, None)
+            if cabecalho is None:
+                continue
+            indices = None
+            if tuple(cabecalho) != CAMPOS and set(CAMPOS) <= set(cabecalho):
+                indices = [cabecalho.index(campo) for campo in CAMPOS]
+
+            lote = []
+            for numero_linha, campos in enumerate(leitor, 2):
+                if indices is not None and len(campos) == len(cabecalho):
+                    campos = [campos[i] for i in indices]
+                lote.append((numero_linha, campos))
+                if len(lote) >= tamanho_lote:
+                    yield caminho, lote
+                    lote = []
+            if lote:
+                yield caminho, lote
+
+
+class CadastroLote:
+    """Pipeline de cadastro: leitura -> validação paralela -> deduplicação -> inserção em bloco"""
+
+    def __init__(self, sistema, processos=None, tamanho_lote=10000, abrir_contas=False, agencia=None):
+        self._sistema = sistema
+        self._processos = os.cpu_count() if processos is None else processos
+        self._tamanho_lote = tamanho_lote
+        self._abrir_contas = abrir_contas
+        self._agencia = agencia
+
+    def _inserir(self, validos, rejeitados):
+        """Deduplica contra o índice de CPF e insere o lote de uma vez (processo principal)"""
+        from sistema_bancario_POO_decoradores_relatorios_limites import PessoaFisicaCliente
+
+        novos = []
+        vistos = set()
+        for numero_linha, nome, data_nascimento, cpf, endereco in validos:
+            if cpf in vistos or self._sistema.buscar_cliente_por_cpf(cpf):
+                rejeitados.append((numero_linha, cpf, 'cpf_duplicado'))
+                continue
+            vistos.add(cpf)
+            novos.append(PessoaFisicaCliente(nome, data_nascimento, cpf, endereco))
+
+        self._sistema.adicionar_clientes(novos)
+        if self._abrir_contas:
+            opcoes = {'agencia': self._agencia} if self._agencia else {}
+            for cliente in novos:
+                self._sistema.abrir_conta_corrente(cliente, **opcoes)
+        return len(novos)
+
+    def executar(self, caminhos, caminho_rejeicoes=None):
+        """Processa os arquivos e retorna as estatísticas do cadastro"""
+        inicio = time.perf_counter()
+        hoje = datetime.now()
+        estatisticas = {'lidos': 0, 'cadastrados': 0, 'rejeitados': {}}
+
+        arquivo_rejeicoes = None
+        escritor = None
+        if caminho_rejeicoes:
+            arquivo_rejeicoes = open(caminho_rejeicoes, 'w', newline='', encoding='utf-8')
+            escritor = csv.writer(arquivo_rejeicoes)
+            escritor.writerow(['arquivo', 'linha', 'cpf', 'motivo'])
+
+        def consolidar(caminho, quantidade, validos, rejeitados):
+            estatisticas['lidos'] += quantidade
+            estatisticas['cadastrados'] += self._inserir(validos, rejeitados)
+            for numero_linha, cpf, motivo in rejeitados:
+                estatisticas['rejeitados'][motivo] = estatisticas['rejeitados'].get(motivo, 0) + 1
+                if escritor:
+                    escritor.writerow([caminho, numero_linha, cpf, motivo])
+
+        try:
+            lotes = ler_lotes(caminhos, self._tamanho_lote)
+            if self._processos <= 1:
+                for caminho, lote in lotes:
+                    consolidar(caminho, len(lote), *validar_lote(lote, hoje))
+            else:
+                with ProcessPoolExecutor(max_workers=self._processos) as executor:
+                    # Poucos lotes em voo: memória limitada e inserção na ordem dos arquivos
+                    em_voo = deque()
+                    for caminho, lote in lotes:
+                        em_voo.append((caminho, len(lote), executor.submit(validar_lote, lote, hoje)))
+                        if len(em_voo) >= 2 * self._processos:
+                            caminho_pronto, quantidade, futuro = em_voo.popleft()
+                            consolidar(caminho_pronto, quantidade, *futuro.result())
+                    while em_voo:
+                        caminho_pronto, quantidade, futuro = em_voo.popleft()
+                        consolidar(caminho_pronto, quantidade, *futuro.result())
+        finally:
+            if arquivo_rejeicoes:
+                arquivo_rejeicoes.close()
+
+        duracao = time.perf_counter() - inicio
+        estatisticas['duracao'] = duracao
+        estatisticas['clientes_por_segundo'] = estatisticas['lidos'] / duracao if duracao else 0.0
+        return estatisticas
+
+
+def exibir_estatisticas(estatisticas):
+    print(f"✅ {estatisticas['cadastrados']} de {estatisticas['lidos']} clientes cadastrados "
+          f"em {estatisticas['duracao']:.2f}s ({estatisticas['clientes_por_segundo']:.0f} linhas/s)")
+    for motivo, total in sorted(estatisticas['rejeitados'].items()):
+        print(f"   Rejeitados por {motivo}: {total}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cadastro em lote de clientes")
+    parser.add_argument("arquivos", nargs="+", help="arquivos CSV de clientes")
+    parser.add_argument("--processos", type=int, default=None, help="processos de validação (padrão: núcleos)")
+    parser.add_argument("--lote", type=int, default=10000, help="linhas por lote")
+    parser.add_argument("--rejeicoes", help="CSV de saída com as linhas rejeitadas")
+    parser.add_argument("--abrir-contas", action="store_true", help="abre uma conta corrente por cliente")
+    parser.add_argument("--banco", default=os.environ.get('BANCO_SQLITE'),
+                        help="banco SQLite onde os clientes são gravados (padrão: BANCO_SQLITE)")
+    args = parser.parse_args()
+    if not args.banco:
+        parser.error("informe --banco ou defina BANCO_SQLITE: sem persistência o cadastro se perderia ao sair")
+
+    from persistencia_sqlite import BancoSQLite
+    from sistema_bancario_POO_decoradores_relatorios_limites import SistemaBancario
+
+    sistema = SistemaBancario(persistencia=BancoSQLite(args.banco), registrar_metricas=False)
+    sistema.carregar_persistencia(preguicoso=True)
+    try:
+        cadastro = CadastroLote(sistema, processos=args.processos, tamanho_lote=args.lote,
+                                abrir_contas=args.abrir_contas)
+        exibir_estatisticas(cadastro.executar(args.arquivos, args.rejeicoes))
+    finally:
+        sistema.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Carga preguiçosa de contas e clientes persistidos.
+
+Com um BancoSQLite, o SistemaBancario pode subir sem materializar nada: a
+lista de contas e a de clientes viram sequências apoiadas no banco, e cada
+conta é um ContaPreguicosa que só carrega estado e histórico (este, por sua
+vez, lido sob demanda da camada fria) no primeiro acesso. As contas
+carregadas ficam num LRU aproximado (relógio, segunda chance) de
+capacidade fixa: um acesso só marca o proxy como usado, sem lock global, e
+na hora de descarregar as marcadas ganham mais uma volta na fila. As menos
+usadas são descarregadas quando ninguém as está usando, então a memória
+acompanha o conjunto de trabalho e não o tamanho do banco. Clientes só ficam em memória
+enquanto alguém os referencia (uma conta carregada, por exemplo), e a lista
+de contas de cada cliente guarda proxies, não contas.
+"""
+
+from collections import OrderedDict
+import threading
+import weakref
+
+
+class LockConta:
+    """RLock de uma conta que sabe se a thread corrente o segura"""
+
+    __slots__ = ('_lock', '_dono', '_profundidade')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._dono = None
+        self._profundidade = 0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        self._dono = threading.get_ident()
+        self._profundidade += 1
+        return True
+
+    def release(self):
+        self._profundidade -= 1
+        if not self._profundidade:
+            self._dono = None
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *excecao):
+        self.release()
+
+    def da_thread_atual(self):
+        # Só a própria thread escreve o seu ident em _dono: a comparação não precisa do lock
+        return self._dono == threading.get_ident()
+
+
+class ContaPreguicosa:
+    """Proxy de uma conta persistida: carrega no primeiro acesso e pode ser descarregado.
+
+    O lock pertence ao proxy e é emprestado à conta carregada, então continua
+    valendo entre uma descarga e a próxima carga.
+    """
+
+    def __init__(self, registro, agencia, numero, conta=None):
+        self._registro = registro
+        self._agencia = agencia
+        self._numero = numero
+        self._lock = LockConta()
+        self._usada = False  # Marca de acesso da segunda chance do LRU
+        if conta is not None:
+            conta._lock = self._lock  # Conta recém-aberta: ninguém a travou ainda
+        self._conta = conta
+
+    @property
+    def agencia(self):
+        return self._agencia
+
+    @property
+    def numero(self):
+        return self._numero
+
+    @property
+    def lock(self):
+        return self._lock
+
+    @property
+    def carregada(self):
+        return self._conta is not None
+
+    def _real(self):
+        conta = self._conta
+        if conta is not None:
+            self._usada = True  # Sem o lock do registro: só a carga entra na fila do LRU
+            return conta
+        with self._lock:
+            carregou = self._conta is None
+            if carregou:
+                self._conta = self._registro.carregar(self)
+            conta = self._conta
+        if carregou:
+            self._registro.tocar(self)
+        return conta
+
+    def __getattr__(self, nome):
+        # Só chamado para o que o proxy não tem: delega à conta carregada
+        return getattr(self._real(), nome)
+
+    def __str__(self):
+        return str(self._real())
+
+    def descarregar(self):
+        """Solta a conta carregada se ninguém a estiver usando; retorna True se soltou"""
+        # O RLock aceitaria a própria thread de novo: quem já o segura está usando a conta
+        if self._lock.da_thread_atual() or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._conta is not None:
+                self._registro.persistencia.confirmar()  # A próxima carga lê o estado já confirmado
+                self._registro.descarregada(self._conta)
+                self._conta = None
+            return True
+        finally:
+            self._lock.release()
+
+
+class SequenciaPersistida:
+    """Sequência somente leitura sobre uma tabela do banco, paginada pelo rowid"""
+
+    def __init__(self, contar, pagina, posicao, fabrica, confirmar, tamanho_pagina=1000):
+        self._contar = contar
+        self._pagina = pagina
+        self._posicao = posicao
+        self._fabrica = fabrica
+        self._confirmar = confirmar  # Itens anexados nesta sessão só aparecem nas páginas depois do COMMIT
+        self._tamanho_pagina = tamanho_pagina
+        self._tamanho = contar()
+
+    def __len__(self):
+        return self._tamanho
+
+    def __bool__(self):
+        return self._tamanho > 0
+
+    def __iter__(self):
+        self._confirmar()
+        ultimo = 0
+        while True:
+            linhas = self._pagina(ultimo, self._tamanho_pagina)
+            if not linhas:
+                return
+            for linha in linhas:
+                yield self._fabrica(linha[1:])
+            ultimo = linhas[-1][0]
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self._tamanho
+        if not 0 <= indice < self._tamanho:
+            raise IndexError("índice fora da sequência persistida")
+        self._confirmar()
+        return self._fabrica(self._posicao(indice))
+
+    def append(self, item):
+        """O item já foi gravado no banco: só acompanha o tamanho"""
+        self._tamanho += 1
+
+    def extend(self, itens):
+        self._tamanho += len(itens)
+
+
+class RegistroPreguicoso:
+    """Identidade, carga e descarga (LRU) das contas e clientes de um SistemaBancario persistido"""
+
+    def __init__(self, sistema, persistencia, clientes_carregados, capacidade=10000):
+        self._sistema = sistema
+        self._persistencia = persistencia
+        self._clientes_carregados = clientes_carregados  # CPF -> cliente, compartilhado com o sistema
+        self._capacidade = capacidade
+        # Um único proxy por conta enquanto alguém o referencia: é ele que guarda o lock
+        self._proxies = weakref.WeakValueDictionary()
+        self._carregadas = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.contas = SequenciaPersistida(persistencia.contar_contas, persistencia.pagina_contas,
+                                          persistencia.conta_na_posicao, lambda chave: self.conta(*chave),
+                                          persistencia.confirmar)
+        self.clientes = SequenciaPersistida(persistencia.contar_clientes, persistencia.pagina_clientes,
+                                            persistencia.cliente_na_posicao, lambda chave: self.cliente(*chave),
+                                            persistencia.confirmar)
+
+    @property
+    def persistencia(self):
+        return self._persistencia
+
+    @property
+    def carregadas(self):
+        return len(self._carregadas)
+
+    def contas_carregadas(self):
+        """Contas materializadas agora (sem carregar nenhuma)"""
+        with self._lock:
+            proxies = list(self._carregadas.values())
+        return [proxy._conta for proxy in proxies if proxy._conta is not None]
+
+    def clientes_carregados(self):
+        """Clientes em memória agora (sem ler o banco)"""
+        return list(self._clientes_carregados.values())
+
+    def conta(self, agencia, numero):
+        """Proxy da conta (sem carregá-la)"""
+        with self._lock:
+            proxy = self._proxies.get((agencia, numero))
+            if proxy is None:
+                proxy = ContaPreguicosa(self, agencia, numero)
+                self._proxies[(agencia, numero)] = proxy
+            return proxy
+
+    def buscar(self, agencia, numero):
+        """Proxy da conta, ou None se ela não existe no banco"""
+        with self._lock:
+            proxy = self._proxies.get((agencia, numero))
+        if proxy is None:
+            self._persistencia.confirmar()  # A conta pode ter sido aberta nesta sessão
+            if self._persistencia.conta(agencia, numero) is None:
+                return None
+        return proxy or self.conta(agencia, numero)
+
+    def adotar(self, conta):
+        """Registra uma conta recém-aberta, já carregada, e retorna o seu proxy"""
+        proxy = ContaPreguicosa(self, conta.agencia, conta.numero, conta)
+        with self._lock:
+            self._proxies[(conta.agencia, conta.numero)] = proxy
+        self.tocar(proxy)
+        return proxy
+
+    def cliente(self, cpf):
+        """Cliente pelo CPF, lido do banco (com os proxies das suas contas) no primeiro acesso"""
+        cliente = self._clientes_carregados.get(cpf)
+        if cliente is not None:
+            return cliente
+        self._persistencia.confirmar()  # Cliente e contas podem ter sido gravados nesta sessão
+        linha = self._persistencia.cliente(cpf)
+        if linha is None:
+            return None
+        from sistema_bancario_POO_decoradores_relatorios_limites import PessoaFisicaCliente
+
+        cliente = PessoaFisicaCliente(*linha)
+        for agencia, numero in self._persistencia.contas_do_cliente(cpf):
+            cliente.adicionar_conta(self.conta(agencia, numero))
+        with self._lock:
+            return self._clientes_carregados.setdefault(cpf, cliente)
+
+    def carregar(self, proxy):
+        """Materializa a conta do proxy (chamado com o lock do proxy)"""
+        from sistema_bancario_POO_decoradores_relatorios_limites import ContaCorrente
+
+        agencia, numero, cpf, limite, limite_saques, saldo, saques_realizados, ultimo_fechamento = \
+            self._persistencia.conta(proxy.agencia, proxy.numero)
+        # Sem eventos: a conta já foi aberta e o estado gravado vira o ponto de partida da loja
+        conta = ContaCorrente.restaurada(self.cliente(cpf), numero, saldo, saques_realizados, ultimo_fechamento,
+                                         limite=limite, limite_saques=limite_saques,
+                                         loja_eventos=self._sistema.loja_eventos, agencia=agencia,
+                                         estagio_risco=self._sistema.estagio_risco)
+        conta._lock = proxy.lock  # Mesmo lock em todas as encarnações da conta
+        self._sistema.ligar_conta(conta)
+        return conta
+
+    def descarregada(self, conta):
+        """Avisa o sistema de que a conta saiu da memória"""
+        self._sistema.desligar_conta(conta)
+
+    def tocar(self, proxy):
+        """Põe no fim do LRU um proxy recém-carregado e descarrega os excedentes menos usados"""
+        with self._lock:
+            self._carregadas[(proxy.agencia, proxy.numero)] = proxy
+            self._carregadas.move_to_end((proxy.agencia, proxy.numero))
+            if len(self._carregadas) <= self._capacidade:
+                return
+            excedentes = []
+            while len(self._carregadas) > self._capacidade:
+                chave, antigo = self._carregadas.popitem(last=False)
+                if antigo._usada:
+                    # Segunda chance: usado desde a última volta, vai para o fim da fila desmarcado
+                    antigo._usada = False
+                    self._carregadas[chave] = antigo
+                    continue
+                excedentes.append(antigo)
+
+        for antigo in excedentes:
+            if not antigo.descarregar():
+                # Em uso: volta para o fim da fila e tenta de novo mais tarde
+                with self._lock:
+                    self._carregadas[(antigo.agencia, antigo.numero)] = antigo
@@ -0,0 +1,212 @@
+"""Event sourcing para as contas do sistema bancário.
+
+Cada mudança de estado de uma conta é um evento de domínio (conta aberta,
+depósito, saque, transferência, rejeição, reinício de limites, juros,
+tarifas e a marca do fechamento diário). O estado da conta é a dobra (fold) de
+aplicar_evento sobre os eventos; a LojaEventos guarda os eventos por conta e
+um snapshot a cada N eventos da conta, então reconstruir ou auditar uma conta
+custa só os eventos desde o último snapshot, e os anteriores a ele podem ser
+descartados.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+CONTA_ABERTA = 'ContaAberta'
+DEPOSITO = 'Deposito'
+SAQUE = 'Saque'
+TRANSFERENCIA_ENVIADA = 'TransferenciaEnviada'
+TRANSFERENCIA_RECEBIDA = 'TransferenciaRecebida'
+REJEICAO = 'Rejeicao'
+LIMITES_REINICIADOS = 'LimitesReiniciados'
+JUROS = 'Juros'
+TARIFA = 'Tarifa'
+FECHAMENTO = 'Fechamento'  # Marca a data fechada, para um fechamento nunca ser aplicado duas vezes
+
+_CREDITOS = frozenset((DEPOSITO, TRANSFERENCIA_RECEBIDA, JUROS))
+_DEBITOS = frozenset((SAQUE, TRANSFERENCIA_ENVIADA, TARIFA))
+
+
+class Evento:
+    """Fato imutável ocorrido em uma conta"""
+
+    __slots__ = ('sequencia', 'tipo', 'agencia', 'numero', 'valor', 'dados', 'instante')
+
+    def __init__(self, tipo, agencia, numero, valor=0.0, dados=None):
+        self.sequencia = None  # atribuída pela LojaEventos
+        self.tipo = tipo
+        self.agencia = agencia
+        self.numero = numero
+        self.valor = valor
+        self.dados = dados or {}
+        self.instante = time.time()
+
+    @property
+    def chave(self):
+        return (self.agencia, self.numero)
+
+    def __repr__(self):
+        return f"Evento({self.sequencia}, {self.tipo}, {self.agencia}/{self.numero}, {self.valor}, {self.dados})"
+
+
+class EstadoConta:
+    """Estado de uma conta obtido pela dobra dos seus eventos"""
+
+    __slots__ = ('_saldo', '_saques_realizados', 'eventos_aplicados')
+
+    def __init__(self, saldo=0.0, saques_realizados=0, eventos_aplicados=0):
+        self._saldo = saldo
+        self._saques_realizados = saques_realizados
+        self.eventos_aplicados = eventos_aplicados
+
+    @property
+    def saldo(self):
+        return self._saldo
+
+    @property
+    def saques_realizados(self):
+        return self._saques_realizados
+
+    def copiar(self):
+        return EstadoConta(self._saldo, self._saques_realizados, self.eventos_aplicados)
+
+
+def aplicar_evento(alvo, evento):
+    """Única transição de estado das contas: vale para a Conta viva e para o EstadoConta.
+
+    O alvo precisa ter _saldo; _saques_realizados só é atualizado se existir.
+    """
+    tipo = evento.tipo
+    if tipo in _CREDITOS:
+        alvo._saldo += evento.valor
+    elif tipo in _DEBITOS:
+        alvo._saldo -= evento.valor
+        if tipo == SAQUE and hasattr(alvo, '_saques_realizados'):
+            alvo._saques_realizados += 1
+    elif tipo == LIMITES_REINICIADOS and hasattr(alvo, '_saques_realizados'):
+        alvo._saques_realizados = 0
+    elif tipo == FECHAMENTO and hasattr(alvo, '_ultimo_fechamento'):
+        alvo._ultimo_fechamento = evento.dados['data']
+
+
+def dobrar(eventos, estado=None):
+    """Aplica os eventos em ordem sobre um estado (novo, se não informado)"""
+    estado = estado.copiar() if estado else EstadoConta()
+    for evento in eventos:
+        aplicar_evento(estado, evento)
+        estado.eventos_aplicados += 1
+    return estado
+
+
+class LojaEventos:
+    """Log append-only de eventos por conta, com snapshots incrementais.
+
+    Cada evento é guardado uma só vez, no fluxo da sua conta; a ordem global é a
+    das sequências. truncar() descarta os eventos já cobertos pelo último
+    snapshot de cada conta (com truncar_no_snapshot, isso acontece a cada snapshot).
+    """
+
+    def __init__(self, intervalo_snapshot=100, truncar_no_snapshot=False):
+        self._intervalo = intervalo_snapshot
+        self._truncar_no_snapshot = truncar_no_snapshot
+        # chave -> [posição do primeiro evento guardado, eventos guardados]; as posições contam
+        # todos os eventos da conta, inclusive os já truncados
+        self._fluxos = {}
+        self._snapshots = {}  # chave -> (posição, estado depois dos eventos até ela)
+        self._guardados = 0
+        self._sequencia = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def intervalo_snapshot(self):
+        return self._intervalo
+
+    def __len__(self):
+        """Eventos guardados (os truncados não contam)"""
+        return self._guardados
+
+    def registrar(self, evento):
+        """Acrescenta o evento ao fluxo da conta"""
+        with self._lock:
+            evento.sequencia = next(self._sequencia)
+            fluxo = self._fluxos.setdefault(evento.chave, [0, []])
+            fluxo[1].append(evento)
+            self._guardados += 1
+            if (fluxo[0] + len(fluxo[1])) % self._intervalo == 0:
+                self._tirar_snapshot(evento.chave, fluxo)
+                if self._truncar_no_snapshot:
+                    self._truncar(evento.chave)
+        return evento
+
+    def _tirar_snapshot(self, chave, fluxo):
+        # Parte do snapshot anterior: custo amortizado O(1) por evento
+        inicio, guardados = fluxo
+        posicao, estado = self._snapshots.get(chave, (inicio, None))
+        self._snapshots[chave] = (inicio + len(guardados), dobrar(guardados[posicao - inicio:], estado))
+
+    def _truncar(self, chave):
+        fluxo = self._fluxos[chave]
+        posicao = self._snapshots.get(chave, (fluxo[0], None))[0]
+        descartados = posicao - fluxo[0]
+        if descartados > 0:
+            fluxo[0] = posicao
+            del fluxo[1][:descartados]
+            self._guardados -= descartados
+        return max(descartados, 0)
+
+    def truncar(self, agencia=None, numero=None):
+        """Descarta os eventos anteriores ao último snapshot (da conta, ou de todas); retorna quantos"""
+        with self._lock:
+            chaves = [(agencia, numero)] if agencia is not None else list(self._fluxos)
+            return sum(self._truncar(chave) for chave in chaves if chave in self._fluxos)
+
+    def restaurar(self, agencia, numero, saldo, saques_realizados=0):
+        """Estado gravado de uma conta restaurada como ponto de partida do seu fluxo.
+
+        Só vale se a conta ainda não tem eventos neste processo; recarregada depois
+        de descarregada, o fluxo já existente continua sendo a fonte do estado.
+        """
+        with self._lock:
+            if (agencia, numero) in self._fluxos:
+                return False
+            self._fluxos[(agencia, numero)] = [0, []]
+            self._snapshots[(agencia, numero)] = (0, EstadoConta(saldo, saques_realizados))
+        return True
+
+    def eventos(self, desde_sequencia=0):
+        """Eventos guardados com sequência maior que desde_sequencia, na ordem global"""
+        with self._lock:
+            fluxos = [list(guardados) for _, guardados in self._fluxos.values()]
+        # Cada fluxo já está em ordem de sequência: basta intercalá-los
+        return [evento for evento in heapq.merge(*fluxos, key=lambda evento: evento.sequencia)
+                if evento.sequencia > desde_sequencia]
+
+    def eventos_da_conta(self, agencia, numero):
+        """Eventos guardados da conta (os anteriores a um truncamento ficam só no snapshot)"""
+        with self._lock:
+            return list(self._fluxos.get((agencia, numero), (0, ()))[1])
+
+    def reconstruir(self, agencia, numero):
+        """Estado da conta: último snapshot + eventos posteriores a ele"""
+        with self._lock:
+            inicio, guardados = self._fluxos.get((agencia, numero), (0, []))
+            posicao, estado = self._snapshots.get((agencia, numero), (inicio, None))
+            recentes = guardados[posicao - inicio:]
+        return dobrar(recentes, estado)
+
+    def auditar(self, conta):
+        """Compara o estado vivo da conta com o reconstruído pelos eventos"""
+        estado = self.reconstruir(conta.agencia, conta.numero)
+        saques_vivos = getattr(conta, 'saques_realizados', estado.saques_realizados)
+        return {
+            'conta': f"{conta.agencia}/{conta.numero}",
+            'saldo_vivo': conta.saldo,
+            'saldo_eventos': estado.saldo,
+            'saques_vivos': saques_vivos,
+            'saques_eventos': estado.saques_realizados,
+            'eventos': estado.eventos_aplicados,
+            'consistente': abs(conta.saldo - estado.saldo) < 1e-6 and saques_vivos == estado.saques_realizados,
+        }
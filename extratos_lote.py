@@ -0,0 +1,209 @@
+"""Extratos em lote (extrato mensal) de todas as contas do sistema bancário POO.
+
+As contas são divididas em partições distribuídas num pool de processos;
+cada processo grava os extratos da sua partição num arquivo próprio
+(extratos_NNNN.txt). Com persistência SQLite os processos leem os
+históricos direto do banco, numa conexão somente leitura cada um, e o
+processo principal só distribui as chaves das contas. Sem o banco os
+históricos só existem na memória deste processo: cada partição segue para
+o pool numa forma compacta, tuplas (tipo, sinal, valor, data) já filtradas,
+e só 2 partições por processo ficam em voo. Com um processo só, nada é
+serializado e as partições são gravadas aqui mesmo. O andamento e a vazão
+são informados a cada partição concluída.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import os
+import time
+
+from armazenamento_historico import chave_datetime
+
+
+def compactar(transacoes, tipo, sinal_transacao):
+    """Linhas (tipo, sinal, valor, data) do extrato, só do tipo pedido: o que viaja até o pool"""
+    return tuple((transacao['tipo'], sinal_transacao(transacao), transacao['valor'], transacao['data'])
+                 for transacao in transacoes if tipo is None or transacao['tipo'] == tipo)
+
+
+def _escrever_extrato(arquivo, cabecalho, linhas):
+    agencia, numero, titular, saldo, saques_realizados, limite_saques = cabecalho
+    arquivo.write("=" * 35 + "\n")
+    arquivo.write(f"EXTRATO - Ag {agencia} - Conta {numero}\n")
+    arquivo.write(f"Titular: {titular}\n")
+    arquivo.write("-" * 35 + "\n")
+    quantidade = 0
+    for tipo_transacao, sinal, valor, data in linhas:
+        quantidade += 1
+        arquivo.write(f"{quantidade:2d}. {tipo_transacao}: {sinal}R$ {valor:.2f} - {data}\n")
+    if quantidade == 0:
+        arquivo.write("Nenhuma transação no período.\n")
+    arquivo.write("-" * 35 + "\n")
+    arquivo.write(f"Saldo atual: R$ {saldo:.2f}\n")
+    if limite_saques is not None:
+        arquivo.write(f"Saques realizados hoje: {saques_realizados}/{limite_saques}\n")
+    return quantidade
+
+
+def gerar_particao(indice, diretorio, contas, caminho_banco=None, tipo=None, inicio=None, fim=None):
+    """Roda num processo do pool: grava os extratos da partição no seu arquivo.
+
+    contas é um iterável de (cabeçalho, linhas compactadas); linhas None manda ler o
+    histórico do banco em caminho_banco. Retorna (contas, transações, caminho).
+    """
+    from persistencia_sqlite import conectar_leitura, entradas_conta
+    from sistema_bancario_POO_decoradores_relatorios_limites import sinal_transacao
+
+    conexao = conectar_leitura(caminho_banco) if caminho_banco else None
+    caminho = os.path.join(diretorio, f"extratos_{indice:04d}.txt")
+    quantidade = total = 0
+    try:
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            for cabecalho, linhas in contas:
+                quantidade += 1
+                if linhas is None:
+                    linhas = compactar(entradas_conta(conexao, cabecalho[0], cabecalho[1], inicio, fim),
+                                       tipo, sinal_transacao)
+                total += _escrever_extrato(arquivo, cabecalho, linhas)
+    finally:
+        if conexao is not None:
+            conexao.close()
+    return quantidade, total, caminho
+
+
+class ExtratosLote:
+    """Job de extratos de todas as contas: partições -> pool de processos -> um arquivo por partição"""
+
+    def __init__(self, sistema, diretorio, processos=None, contas_por_particao=500, tipo=None,
+                 inicio=None, fim=None, progresso=None):
+        self._sistema = sistema
+        self._diretorio = diretorio
+        self._processos = processos or os.cpu_count() or 1
+        self._contas_por_particao = contas_por_particao
+        self._tipo = tipo
+        self._inicio = inicio
+        self._fim = fim
+        self._progresso = progresso or exibir_progresso
+
+    def _caminho_banco(self):
+        persistencia = self._sistema.persistencia
+        return getattr(persistencia, 'caminho', None)
+
+    def _contas(self, caminho_banco):
+        """Gera (cabeçalho, linhas compactadas) de cada conta; linhas None quando os processos leem do banco"""
+        from sistema_bancario_POO_decoradores_relatorios_limites import sinal_transacao
+
+        if caminho_banco:
+            for linha in self._sistema.persistencia.contas_extrato():
+                yield linha, None
+            return
+
+        for conta in self._sistema.contas:
+            if self._inicio is not None or self._fim is not None:
+                saldo, saques_realizados = conta.saldo, getattr(conta, 'saques_realizados', 0)
+                transacoes = conta.historico.gerar_relatorio(None, self._inicio, self._fim)
+            else:
+                saldo, saques_realizados, transacoes = self._sistema.dados_extrato(conta)
+            cabecalho = (conta.agencia, conta.numero, conta.cliente.nome, saldo, saques_realizados,
+                         getattr(conta, 'limite_saques', None))
+            yield cabecalho, compactar(transacoes, self._tipo, sinal_transacao)
+
+    def _particoes(self, caminho_banco):
+        particao = []
+        for conta in self._contas(caminho_banco):
+            particao.append(conta)
+            if len(particao) >= self._contas_por_particao:
+                yield particao
+                particao = []
+        if particao:
+            yield particao
+
+    def executar(self):
+        """Gera os extratos e retorna as estatísticas do job"""
+        os.makedirs(self._diretorio, exist_ok=True)
+        inicio_job = time.perf_counter()
+        caminho_banco = self._caminho_banco()
+        if caminho_banco:
+            self._sistema.persistencia.confirmar()  # Os processos só enxergam o que já foi confirmado
+        chave_inicio = chave_datetime(self._inicio) if self._inicio else None
+        chave_fim = chave_datetime(self._fim) if self._fim else None
+
+        estatisticas = {'contas': 0, 'transacoes': 0, 'arquivos': []}
+        total_contas = len(self._sistema.contas)
+
+        def concluir(contas, transacoes, caminho):
+            estatisticas['contas'] += contas
+            estatisticas['transacoes'] += transacoes
+            estatisticas['arquivos'].append(caminho)
+            decorrido = time.perf_counter() - inicio_job
+            self._progresso(estatisticas['contas'], total_contas, estatisticas['contas'] / decorrido)
+
+        if self._processos == 1:
+            for indice, particao in enumerate(self._particoes(caminho_banco)):
+                concluir(*gerar_particao(indice, self._diretorio, particao, caminho_banco, self._tipo,
+                                         chave_inicio, chave_fim))
+        else:
+            with ProcessPoolExecutor(max_workers=self._processos) as executor:
+                pendentes = set()
+                for indice, particao in enumerate(self._particoes(caminho_banco)):
+                    pendentes.add(executor.submit(gerar_particao, indice, self._diretorio, particao,
+                                                  caminho_banco, self._tipo, chave_inicio, chave_fim))
+                    # Poucas partições em voo: as linhas compactadas não se acumulam na memória
+                    if len(pendentes) >= 2 * self._processos:
+                        feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                        for futuro in feitos:
+                            concluir(*futuro.result())
+                for futuro in wait(pendentes).done:
+                    concluir(*futuro.result())
+
+        estatisticas['arquivos'].sort()
+        estatisticas['duracao'] = time.perf_counter() - inicio_job
+        estatisticas['contas_por_segundo'] = (estatisticas['contas'] / estatisticas['duracao']
+                                              if estatisticas['duracao'] else 0.0)
+        return estatisticas
+
+
+def exibir_progresso(feitas, total, vazao):
+    print(f"📄 {feitas}/{total} contas ({vazao:.0f} contas/s)")
+
+
+def exibir_estatisticas(estatisticas):
+    print(f"✅ {estatisticas['contas']} extratos ({estatisticas['transacoes']} transações) "
+          f"em {estatisticas['duracao']:.2f}s ({estatisticas['contas_por_segundo']:.0f} contas/s)")
+    print(f"   {len(estatisticas['arquivos'])} arquivos gerados")
+
+
+def medir_escala(sistema, diretorio, processos=(1, 2, 4)):
+    """Vazão (contas/s) do job para cada quantidade de processos: mostra quanto ele escala nesta máquina"""
+    return {quantidade: ExtratosLote(sistema, os.path.join(diretorio, f"p{quantidade}"), processos=quantidade,
+                                     progresso=lambda *_: None).executar()['contas_por_segundo']
+            for quantidade in processos}
+
+
+def main():
+    import argparse
+    import contextlib
+    import io
+    import tempfile
+
+    from gerador_carga import GeradorCarga, PerfilCarga
+    from sistema_bancario_POO_decoradores_relatorios_limites import SistemaBancario
+
+    parser = argparse.ArgumentParser(description="Mede a escala dos extratos em lote com uma carga sintética")
+    parser.add_argument("--clientes", type=int, default=20000)
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    sistema = SistemaBancario(registrar_metricas=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        GeradorCarga(PerfilCarga(clientes=args.clientes, dias=args.dias)).carregar(sistema)
+    print(f"{os.cpu_count()} núcleos, {args.clientes} contas")
+    with tempfile.TemporaryDirectory() as diretorio:
+        vazoes = medir_escala(sistema, diretorio, args.processos)
+    for quantidade, vazao in vazoes.items():
+        print(f"   {quantidade} processo(s): {vazao:.0f} contas/s (x{vazao / vazoes[args.processos[0]]:.2f})")
+    sistema.fechar()
+
+
+if __name__ == "__main__":
+    main()
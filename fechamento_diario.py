@@ -0,0 +1,183 @@
+"""Fechamento diário (end-of-day) das contas correntes.
+
+Em uma passada sobre todas as ContaCorrente: calcula juros e tarifas de
+manutenção por blocos de saldos (vetorizado com NumPy quando disponível),
+aplica-os com os lançamentos de histórico em bloco e zera os contadores de
+saques do dia. Cada conta grava a data do seu último fechamento, então a
+mesma data nunca é cobrada duas vezes, nem depois de reiniciar o processo.
+O saldo usado no cálculo em bloco é conferido sob o lock de cada conta antes
+de aplicar: se uma operação o mudou no meio tempo, a conta é recalculada.
+O progresso vai para um checkpoint por data (uma linha JSON por bloco
+concluído, com as chaves (agência, número) exatas das contas do bloco): uma
+execução interrompida retoma de onde parou, com qualquer número de faixas
+paralelas, e uma conta aberta depois ainda entra no fechamento.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as hora
+import json
+import math
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele o cálculo usa listas
+    np = None
+
+
+class TabelaTarifas:
+    """Juros sobre saldo positivo e tarifa de manutenção para saldos abaixo da isenção"""
+
+    def __init__(self, taxa_juros_anual=0.06, tarifa_manutencao=0.50, saldo_isencao=1000.0):
+        self.taxa_juros_anual = taxa_juros_anual
+        self.tarifa_manutencao = tarifa_manutencao
+        self.saldo_isencao = saldo_isencao
+
+    @property
+    def taxa_juros_diaria(self):
+        return (1 + self.taxa_juros_anual) ** (1 / 365) - 1
+
+
+def calcular_juros_tarifas(saldos, tabela):
+    """Calcula (juros, tarifas) para uma sequência de saldos, em centavos truncados.
+
+    A tarifa incide sobre o saldo já com juros e nunca deixa a conta negativa.
+    """
+    taxa = tabela.taxa_juros_diaria
+    if np is not None:
+        vetor = np.asarray(saldos, dtype=np.float64)
+        juros = np.where(vetor > 0, np.floor(vetor * taxa * 100) / 100, 0.0)
+        base = vetor + juros
+        tarifas = np.where(base < tabela.saldo_isencao,
+                           np.minimum(tabela.tarifa_manutencao, np.maximum(base, 0.0)), 0.0)
+        return juros.tolist(), np.round(tarifas, 2).tolist()
+
+    juros = [math.floor(saldo * taxa * 100) / 100 if saldo > 0 else 0.0 for saldo in saldos]
+    tarifas = [
+        round(min(tabela.tarifa_manutencao, max(saldo + j, 0.0)), 2) if saldo + j < tabela.saldo_isencao else 0.0
+        for saldo, j in zip(saldos, juros)
+    ]
+    return juros, tarifas
+
+
+def diretorio_por_ambiente():
+    """Diretório dos checkpoints do fechamento, de BANCO_FECHAMENTO_DIRETORIO"""
+    return os.environ.get('BANCO_FECHAMENTO_DIRETORIO', 'checkpoints_fechamento')
+
+
+def _chave(conta):
+    return [conta.agencia, conta.numero]
+
+
+class FechamentoDiario:
+    """Job de fechamento de uma data de referência, retomável por checkpoint"""
+
+    def __init__(self, sistema, tabela=None, data_referencia=None, tamanho_bloco=10000,
+                 diretorio_checkpoint=None):
+        self._sistema = sistema
+        self._tabela = tabela or TabelaTarifas()
+        self._data = data_referencia or date.today()
+        self._tamanho_bloco = tamanho_bloco
+        self._diretorio = diretorio_checkpoint
+        self._lock_checkpoint = threading.Lock()
+        # Lançamentos do fechamento ficam no último segundo do dia de referência
+        self._data_lancamento = datetime.combine(self._data, hora(23, 59, 59))
+
+    @property
+    def data_referencia(self):
+        return self._data
+
+    def _caminho_checkpoint(self):
+        if not self._diretorio:
+            return None
+        return os.path.join(self._diretorio, f"fechamento_{self._data.isoformat()}.jsonl")
+
+    def _ler_checkpoint(self):
+        estado = {'data': self._data.isoformat(), 'blocos': []}
+        caminho = self._caminho_checkpoint()
+        if not caminho or not os.path.exists(caminho):
+            return estado
+        with open(caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    estado['blocos'].append(json.loads(linha))
+                except ValueError:  # Última linha cortada por uma queda: o bloco dela é refeito
+                    break
+        return estado
+
+    def _concluir_bloco(self, estado, bloco):
+        """Registra um bloco concluído e o acrescenta ao checkpoint (threads de faixas diferentes compartilham o arquivo)"""
+        with self._lock_checkpoint:
+            estado['blocos'].append(bloco)
+            caminho = self._caminho_checkpoint()
+            if not caminho:
+                return
+            os.makedirs(self._diretorio, exist_ok=True)
+            # Só acrescenta: regravar o arquivo inteiro a cada bloco custaria O(contas) por bloco
+            with open(caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(bloco) + "\n")
+
+    def _pendentes(self, estado):
+        """Contas ainda não fechadas nesta data, em ordem de chave (agência, número)"""
+        concluidas = {tuple(chave) for bloco in estado['blocos'] for chave in bloco['chaves']}
+        contas = sorted(self._sistema.contas, key=_chave)
+        pendentes = []
+        for conta in contas:
+            # A chave antes do hasattr: numa conta preguiçosa, ele carregaria a conta
+            if (conta.agencia, conta.numero) in concluidas:
+                continue
+            if hasattr(conta, 'aplicar_fechamento'):
+                pendentes.append(conta)
+        return pendentes
+
+    def _processar(self, contas, estado):
+        for bloco_inicio in range(0, len(contas), self._tamanho_bloco):
+            bloco = contas[bloco_inicio:bloco_inicio + self._tamanho_bloco]
+            saldos = [conta.saldo for conta in bloco]
+            juros, tarifas = calcular_juros_tarifas(saldos, self._tabela)
+
+            resultado = {'chaves': [_chave(conta) for conta in bloco],
+                         'processadas': 0, 'ignoradas': 0, 'juros': 0.0, 'tarifas': 0.0}
+            for conta, saldo, valor_juros, valor_tarifa in zip(bloco, saldos, juros, tarifas):
+                # A própria conta ignora uma data que já fechou (a marca é gravada com ela) e, sob o
+                # seu lock, recalcula se uma operação mudou o saldo depois da leitura do bloco
+                aplicado = conta.aplicar_fechamento(self._data, valor_juros, valor_tarifa, self._data_lancamento,
+                                                    saldo, self._recalcular)
+                if aplicado is not None:
+                    valor_juros, valor_tarifa = aplicado
+                    resultado['processadas'] += 1
+                    resultado['juros'] += valor_juros
+                    resultado['tarifas'] += valor_tarifa
+                else:
+                    resultado['ignoradas'] += 1
+            self._concluir_bloco(estado, resultado)
+
+    def _recalcular(self, saldo):
+        (juros,), (tarifa,) = calcular_juros_tarifas([saldo], self._tabela)
+        return juros, tarifa
+
+    def _totais(self, estado):
+        totais = {'data': self._data.isoformat(), 'processadas': 0, 'ignoradas': 0, 'juros': 0.0, 'tarifas': 0.0}
+        for bloco in estado['blocos']:
+            for chave in ('processadas', 'ignoradas', 'juros', 'tarifas'):
+                totais[chave] += bloco[chave]
+        return totais
+
+    def executar(self):
+        """Processa em blocos as contas ainda pendentes na data"""
+        estado = self._ler_checkpoint()
+        self._processar(self._pendentes(estado), estado)
+        return self._totais(estado)
+
+    def executar_paralelo(self, faixas=None):
+        """Divide as contas pendentes em faixas contíguas de chaves e processa cada uma numa thread"""
+        estado = self._ler_checkpoint()
+        pendentes = self._pendentes(estado)
+        faixas = faixas or os.cpu_count() or 1
+        tamanho = max(1, math.ceil(len(pendentes) / faixas))
+        grupos = [pendentes[inicio:inicio + tamanho] for inicio in range(0, len(pendentes), tamanho)]
+
+        with ThreadPoolExecutor(max_workers=len(grupos) or 1) as executor:
+            list(executor.map(lambda grupo: self._processar(grupo, estado), grupos))
+        return self._totais(estado)
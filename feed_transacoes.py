@@ -0,0 +1,340 @@
+"""Feed de mudanças (CDC) das transações confirmadas no sistema bancário.
+
+Cada entrada confirmada num Historico (depósito, saque, ponta de
+transferência, juros, tarifa) recebe um número de sequência global e
+monotônico e é publicada num buffer circular de tamanho fixo. Cada
+assinante lê, em lotes, a partir do seu próprio cursor:
+
+- política 'descartar': quem fica mais de um buffer para trás perde as
+  mudanças mais antigas (contadas em perdidas) e segue da mais antiga que
+  ainda está no buffer;
+- política 'bloquear': a operação espera o assinante liberar espaço
+  (backpressure), por no máximo espera_bloqueio segundos e antes de travar
+  as contas, então quem espera não segura lock de conta nenhuma; depois
+  disso o assinante é tratado como atrasado até alcançar o buffer de novo,
+  para que um assinante parado não trave o banco.
+
+Com persistência, a sequência de cada mudança é gravada junto com a
+entrada do histórico e a posição confirmada de cada assinante também: a
+numeração continua depois de reiniciar, um assinante retoma de onde
+confirmou e o que já saiu do buffer é lido do banco em vez de perdido.
+"""
+
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import metricas
+
+
+BLOQUEAR = 'bloquear'
+DESCARTAR = 'descartar'
+POLITICAS = (BLOQUEAR, DESCARTAR)
+
+
+class Mudanca:
+    """Entrada confirmada de um histórico, com a sua posição no feed"""
+
+    __slots__ = ('sequencia', 'agencia', 'numero', 'sequencia_conta', 'entrada')
+
+    def __init__(self, sequencia, agencia, numero, sequencia_conta, entrada):
+        self.sequencia = sequencia
+        self.agencia = agencia
+        self.numero = numero
+        self.sequencia_conta = sequencia_conta  # Posição da entrada no histórico da conta (1 = primeira)
+        self.entrada = entrada
+
+    @property
+    def chave(self):
+        return (self.agencia, self.numero)
+
+    def registro(self):
+        return dict(self.entrada, sequencia=self.sequencia, agencia=self.agencia, numero=self.numero,
+                    sequencia_conta=self.sequencia_conta)
+
+    def __repr__(self):
+        return f"Mudanca({self.sequencia}, {self.agencia}/{self.numero}, {dict(self.entrada)})"
+
+
+class Assinatura:
+    """Cursor de um assinante sobre o feed; cada assinatura deve ter um só leitor"""
+
+    def __init__(self, feed, nome, posicao, politica=DESCARTAR, tipos=None):
+        self._feed = feed
+        self._nome = nome
+        self._posicao = posicao  # Próxima sequência a ler
+        self._confirmada = None
+        self._politica = politica
+        self._tipos = frozenset(tipos) if tipos else None
+        self._perdidas = 0
+        self._atrasada = False  # Estourou a espera do bloqueio: não segura mais a publicação
+        self._cancelada = False
+        self._thread = None
+        self._erro = None
+
+    @property
+    def nome(self):
+        return self._nome
+
+    @property
+    def posicao(self):
+        return self._posicao
+
+    @property
+    def politica(self):
+        return self._politica
+
+    @property
+    def perdidas(self):
+        return self._perdidas
+
+    @property
+    def atraso(self):
+        return self._feed.proxima - self._posicao
+
+    @property
+    def erro(self):
+        return self._erro
+
+    def ler(self, maximo=100, espera=None):
+        """Próximo lote (até maximo mudanças); com espera, aguarda até espera segundos se não houver nada"""
+        return self._feed._ler(self, maximo, espera)
+
+    def confirmar(self):
+        """Grava a posição atual: depois de reiniciar, a assinatura retoma daqui"""
+        if self._confirmada != self._posicao:
+            self._feed._confirmar(self)
+            self._confirmada = self._posicao
+
+    def consumir(self, funcao, tamanho_lote=100, espera=0.5):
+        """Entrega os lotes a funcao(lote) numa thread, confirmando a posição depois de cada lote"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._laco, args=(funcao, tamanho_lote, espera),
+                                        name=f"feed-{self._nome}", daemon=True)
+        self._thread.start()
+
+    def _laco(self, funcao, tamanho_lote, espera):
+        while not self._cancelada:
+            lote = self.ler(tamanho_lote, espera)
+            if lote:
+                try:
+                    funcao(lote)
+                except Exception as erro:
+                    # Sem confirmar: ao retomar, o lote com falha é entregue de novo
+                    self._erro = erro
+                    return
+            self.confirmar()
+
+    def cancelar(self):
+        """Encerra a assinatura (e a thread de consumo, se houver)"""
+        self._cancelada = True
+        self._feed._remover(self)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+class FeedTransacoes:
+    """Buffer circular das mudanças confirmadas, lido pelas assinaturas"""
+
+    def __init__(self, capacidade=65536, persistencia=None, espera_bloqueio=1.0, registrar_metricas=True):
+        self._capacidade = capacidade
+        self._buffer = [None] * capacidade
+        self._persistencia = persistencia
+        self._espera_bloqueio = espera_bloqueio
+        inicio = persistencia.ultima_mudanca() + 1 if persistencia is not None else 1
+        self._base = inicio  # Primeira sequência publicada por este processo; as anteriores só no banco
+        self._proxima = inicio
+        self._assinaturas = {}
+        self._transbordos = 0
+        self._lock = threading.Lock()
+        self._novas = threading.Condition(self._lock)  # Acorda leitores quando há publicação
+        self._avancos = threading.Condition(self._lock)  # Acorda publicadores quando um cursor anda
+
+        if registrar_metricas:
+            # Com dono: o registro global guarda o feed só por referência fraca
+            metricas.registro.medidor('feed_sequencia', lambda feed: feed._proxima - 1,
+                                      "Última sequência publicada no feed de mudanças", dono=self)
+            metricas.registro.medidor('feed_atraso_maximo', FeedTransacoes.atraso_maximo,
+                                      "Maior atraso (em mudanças) entre os assinantes do feed", dono=self)
+            metricas.registro.medidor('feed_mudancas_perdidas',
+                                      lambda feed: sum(assinatura.perdidas for assinatura in feed.assinaturas()),
+                                      "Mudanças que assinantes lentos perderam (política descartar)", dono=self)
+            metricas.registro.medidor('feed_transbordos', lambda feed: feed._transbordos,
+                                      "Publicações que desistiram de esperar um assinante bloqueante", dono=self)
+
+    @property
+    def capacidade(self):
+        return self._capacidade
+
+    @property
+    def proxima(self):
+        return self._proxima
+
+    @property
+    def mais_antiga(self):
+        """Menor sequência ainda no buffer"""
+        return max(self._base, self._proxima - self._capacidade)
+
+    def assinaturas(self):
+        with self._lock:
+            return list(self._assinaturas.values())
+
+    def atraso_maximo(self):
+        return max((assinatura.atraso for assinatura in self.assinaturas()), default=0)
+
+    # Publicação
+
+    def ouvintes(self, conta):
+        """(ouvinte, em_lote) a inscrever no Historico da conta, depois dos da persistência"""
+        proxima = [len(conta.historico) + 1]  # Sequência da próxima entrada no histórico da conta
+
+        def _ouvinte(historico, entrada):
+            proxima[0] += 1
+            self.publicar(conta, proxima[0] - 1, entrada)
+
+        def _em_lote(historico, entradas):
+            primeira = proxima[0]
+            proxima[0] += len(entradas)
+            self.publicar_lote(conta, primeira, entradas)
+        return _ouvinte, _em_lote
+
+    def aguardar_espaco(self, quantidade=1):
+        """Backpressure antes de travar a conta: espera os assinantes bloqueantes abrirem espaço"""
+        with self._lock:
+            self._esperar_assinantes(min(quantidade, self._capacidade), self._espera_bloqueio)
+
+    def publicar(self, conta, sequencia_conta, entrada):
+        """Dá a próxima sequência à entrada e a coloca no buffer; retorna a sequência.
+
+        Chamada sob o lock da conta, não espera: quem ainda ficaria sem espaço
+        (a espera de aguardar_espaco já passou) é marcado como atrasado.
+        """
+        with self._lock:
+            self._esperar_assinantes()
+            sequencia = self._proxima
+            self._buffer[sequencia % self._capacidade] = Mudanca(
+                sequencia, conta.agencia, conta.numero, sequencia_conta, MappingProxyType(entrada))
+            if self._persistencia is not None:
+                self._persistencia.gravar_mudanca(sequencia, conta, sequencia_conta)
+            self._proxima = sequencia + 1
+            self._novas.notify_all()
+        return sequencia
+
+    def publicar_lote(self, conta, primeira_conta, entradas):
+        """Publica entradas consecutivas do histórico da conta com uma só passagem pelo lock"""
+        with self._lock:
+            self._esperar_assinantes(len(entradas))
+            primeira = self._proxima
+            for deslocamento, entrada in enumerate(entradas):
+                sequencia = primeira + deslocamento
+                self._buffer[sequencia % self._capacidade] = Mudanca(
+                    sequencia, conta.agencia, conta.numero, primeira_conta + deslocamento, MappingProxyType(entrada))
+            if self._persistencia is not None:
+                self._persistencia.gravar_mudancas(primeira, conta, primeira_conta, len(entradas))
+            self._proxima = primeira + len(entradas)
+            self._novas.notify_all()
+        return primeira
+
+    def _esperar_assinantes(self, quantidade=1, espera=0.0):
+        """Backpressure (com o lock): espera até espera segundos os assinantes bloqueantes que perderiam
+        as mudanças mais antigas; depois disso eles passam a atrasados"""
+        prazo = None
+        while True:
+            cheias = [assinatura for assinatura in self._assinaturas.values()
+                      if assinatura._politica == BLOQUEAR and not assinatura._atrasada
+                      and self._proxima + quantidade - 1 - assinatura._posicao >= self._capacidade]
+            if not cheias:
+                return
+            if prazo is None:
+                prazo = time.monotonic() + espera
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                self._transbordos += 1
+                for assinatura in cheias:
+                    assinatura._atrasada = True
+                return
+            self._avancos.wait(restante)
+
+    # Leitura
+
+    def assinar(self, nome, desde=None, politica=DESCARTAR, tipos=None):
+        """Cria a assinatura nome a partir da sequência desde.
+
+        Sem desde, retoma da posição confirmada (com persistência) ou começa nas
+        próximas mudanças. tipos restringe as entregas ('Deposito', 'Saque'...).
+        """
+        if politica not in POLITICAS:
+            raise ValueError(f"Política inválida: {politica} (use {', '.join(POLITICAS)})")
+        if desde is None and self._persistencia is not None:
+            self._persistencia.confirmar()  # O cursor pode ter sido salvo nesta sessão
+            desde = self._persistencia.cursor(nome)
+        with self._lock:
+            if nome in self._assinaturas:
+                raise ValueError(f"Assinatura já existe: {nome}")
+            posicao = self._proxima if desde is None else min(max(1, desde), self._proxima)
+            assinatura = Assinatura(self, nome, posicao, politica, tipos)
+            self._assinaturas[nome] = assinatura
+        return assinatura
+
+    def ler_desde(self, desde, maximo=100):
+        """Leitura avulsa, sem assinatura: (até maximo mudanças a partir de desde, posição seguinte)"""
+        avulsa = Assinatura(self, None, max(1, desde))
+        return avulsa.ler(maximo), avulsa.posicao
+
+    def _ler(self, assinatura, maximo, espera):
+        with self._lock:
+            if espera and assinatura._posicao >= self._proxima:
+                self._novas.wait_for(lambda: assinatura._posicao < self._proxima or assinatura._cancelada, espera)
+            posicao = assinatura._posicao
+            mais_antiga = self.mais_antiga
+            if posicao < mais_antiga and self._persistencia is None:
+                assinatura._perdidas += mais_antiga - posicao
+                posicao = mais_antiga
+            if posicao >= mais_antiga:
+                fim = min(self._proxima, posicao + maximo)
+                lote = [self._buffer[sequencia % self._capacidade] for sequencia in range(posicao, fim)]
+                self._avancar(assinatura, fim)
+                return self._filtrar(assinatura, lote)
+            fim = min(mais_antiga, posicao + maximo)
+
+        # Fora do buffer, com persistência: lê do banco sem segurar o lock do feed
+        self._persistencia.confirmar()
+        lote = [Mudanca(sequencia, agencia, numero, sequencia_conta, MappingProxyType(entrada))
+                for sequencia, agencia, numero, sequencia_conta, entrada
+                in self._persistencia.mudancas(posicao, fim, maximo)]
+        with self._lock:
+            self._avancar(assinatura, fim)
+        return self._filtrar(assinatura, lote)
+
+    def _avancar(self, assinatura, posicao):
+        assinatura._posicao = posicao
+        if assinatura._atrasada and self._proxima - posicao < self._capacidade:
+            assinatura._atrasada = False  # Alcançou o buffer: volta a segurar a publicação
+        self._avancos.notify_all()
+
+    @staticmethod
+    def _filtrar(assinatura, lote):
+        if assinatura._tipos is None:
+            return lote
+        return [mudanca for mudanca in lote if mudanca.entrada['tipo'] in assinatura._tipos]
+
+    def _confirmar(self, assinatura):
+        if self._persistencia is not None and assinatura._nome is not None:
+            self._persistencia.salvar_cursor(assinatura._nome, assinatura._posicao)
+
+    def _remover(self, assinatura):
+        with self._lock:
+            if self._assinaturas.get(assinatura._nome) is assinatura:
+                del self._assinaturas[assinatura._nome]
+            self._novas.notify_all()
+            self._avancos.notify_all()
+
+
+def feed_por_ambiente(persistencia=None):
+    """Feed de mudanças se BANCO_FEED estiver definido (tamanho do buffer em BANCO_FEED_CAPACIDADE)"""
+    if not os.environ.get('BANCO_FEED'):
+        return None
+    return FeedTransacoes(int(os.environ.get('BANCO_FEED_CAPACIDADE', '65536')), persistencia)
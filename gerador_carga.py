@@ -0,0 +1,338 @@
+"""Gerador de carga sintética para o sistema bancário POO.
+
+Gera, de forma reprodutível a partir de uma semente, clientes com CPF,
+data de nascimento e endereço válidos e anos de transações com mistura
+configurável (contas "quentes" em distribuição de Zipf e clientes que
+estouram limites). A carga pode ser aplicada direto em um SistemaBancario
+ou gravada em arquivos CSV para ingestão.
+
+Uso:
+    python gerador_carga.py --clientes 100000 --dias 730 --saida carga/
+"""
+
+import argparse
+from array import array
+import bisect
+import csv
+from datetime import datetime, timedelta
+import itertools
+import math
+import os
+import random
+import time
+
+from validacao import digitos_verificadores_cpf
+
+
+NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique",
+    "Isabela", "João", "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Pedro",
+    "Rafaela", "Sérgio", "Tatiane", "Vinícius", "Beatriz", "Gustavo", "Larissa", "Mateus",
+]
+
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+    "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes",
+    "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Moreira",
+]
+
+LOGRADOUROS = [
+    "Rua das Flores", "Avenida Brasil", "Rua XV de Novembro", "Avenida Paulista",
+    "Rua Sete de Setembro", "Rua da Consolação", "Avenida Atlântica", "Rua Augusta",
+    "Rua Direita", "Avenida Getúlio Vargas", "Rua São Bento", "Travessa do Comércio",
+]
+
+BAIRROS = [
+    "Centro", "Jardim América", "Vila Nova", "Boa Vista", "Santa Cecília",
+    "Liberdade", "Copacabana", "Savassi", "Moinhos de Vento", "Aldeota",
+]
+
+CIDADES = [
+    ("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Belo Horizonte", "MG"),
+    ("Porto Alegre", "RS"), ("Curitiba", "PR"), ("Salvador", "BA"),
+    ("Fortaleza", "CE"), ("Recife", "PE"), ("Brasília", "DF"), ("Campinas", "SP"),
+]
+
+MIX_PADRAO = {'Deposito': 0.45, 'Saque': 0.45, 'Transferencia': 0.10}
+
+
+class PerfilCarga:
+    """Parâmetros da carga sintética"""
+
+    def __init__(self, clientes=1000, dias=365, transacoes_por_conta_dia=0.3, mix=None,
+                 valor_mediano=150.0, dispersao_valor=1.0, expoente_zipf=1.1,
+                 proporcao_estouradores=0.02, saldo_inicial_mediano=1000.0, data_final=None):
+        self.clientes = clientes
+        self.dias = dias
+        self.transacoes_por_conta_dia = transacoes_por_conta_dia
+        self.mix = dict(mix or MIX_PADRAO)
+        self.valor_mediano = valor_mediano
+        self.dispersao_valor = dispersao_valor
+        self.expoente_zipf = expoente_zipf  # 0 = todas as contas igualmente ativas
+        self.proporcao_estouradores = proporcao_estouradores
+        self.saldo_inicial_mediano = saldo_inicial_mediano
+        self.data_final = data_final or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class GeradorCarga:
+    """Gera clientes e transações determinísticos para um perfil e uma semente"""
+
+    def __init__(self, perfil=None, semente=42):
+        self._perfil = perfil or PerfilCarga()
+        self._semente = semente
+
+    @property
+    def perfil(self):
+        return self._perfil
+
+    def _rng(self, fluxo):
+        # Fluxos independentes: mudar a mistura de transações não muda os clientes
+        return random.Random(f"{self._semente}:{fluxo}")
+
+    def clientes(self):
+        """Gera os dados cadastrais de cada cliente (um dicionário por cliente)"""
+        rng = self._rng("clientes")
+        # Permutação afim de 0..10^9-1: CPFs únicos sem guardar um conjunto em memória
+        multiplicador = rng.randrange(1, 10 ** 9) | 1
+        while multiplicador % 5 == 0:
+            multiplicador = rng.randrange(1, 10 ** 9) | 1
+        deslocamento = rng.randrange(10 ** 9)
+        hoje = self._perfil.data_final
+
+        gerados = 0
+        for k in itertools.count():
+            if gerados >= self._perfil.clientes:
+                break
+            base = f"{(multiplicador * k + deslocamento) % 10 ** 9:09d}"
+            if len(set(base)) == 1:
+                continue  # 000000000-00, 111111111-11... são CPFs inválidos
+            gerados += 1
+
+            idade_dias = rng.randint(18 * 365, 85 * 365)
+            cidade, uf = rng.choice(CIDADES)
+            yield {
+                'nome': f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+                'data_nascimento': (hoje - timedelta(days=idade_dias)).strftime('%d/%m/%Y'),
+                'cpf': base + digitos_verificadores_cpf(base),
+                'logradouro': rng.choice(LOGRADOUROS),
+                'numero': str(rng.randint(1, 9999)),
+                'bairro': rng.choice(BAIRROS),
+                'cidade': cidade,
+                'uf': uf,
+            }
+
+    def _valor(self, rng):
+        valor = rng.lognormvariate(math.log(self._perfil.valor_mediano), self._perfil.dispersao_valor)
+        return max(1.0, round(valor, 2))
+
+    def transacoes(self, limite_saque=500):
+        """Gera (data, conta, tipo, valor, conta_destino) em ordem cronológica.
+
+        Contas são índices 0..clientes-1 (uma conta corrente por cliente).
+        """
+        perfil = self._perfil
+        rng = self._rng("transacoes")
+        total_contas = perfil.clientes
+        if total_contas == 0:
+            return
+
+        # Contas quentes: pesos de Zipf sobre uma ordem embaralhada das contas
+        ordem = list(range(total_contas))
+        rng.shuffle(ordem)
+        acumulado = array('d')
+        soma = 0.0
+        if perfil.expoente_zipf > 0:
+            for posicao in range(total_contas):
+                soma += 1.0 / (posicao + 1) ** perfil.expoente_zipf
+                acumulado.append(soma)
+
+        def sortear_conta():
+            if perfil.expoente_zipf <= 0:
+                return rng.randrange(total_contas)
+            posicao = bisect.bisect_left(acumulado, rng.random() * soma)
+            return ordem[min(posicao, total_contas - 1)]
+
+        estouradores = rng.sample(range(total_contas), int(total_contas * perfil.proporcao_estouradores))
+        tipos = list(perfil.mix)
+        pesos_tipos = list(itertools.accumulate(perfil.mix.values()))
+        inicio = perfil.data_final - timedelta(days=perfil.dias - 1)
+
+        # Depósito de abertura de cada conta à meia-noite do primeiro dia, antes das transações dele
+        abertura = inicio
+        for conta in range(total_contas):
+            valor = rng.lognormvariate(math.log(perfil.saldo_inicial_mediano), 0.8)
+            yield abertura, conta, 'Deposito', round(valor, 2), None
+
+        media_dia = total_contas * perfil.transacoes_por_conta_dia
+        for dia in range(perfil.dias):
+            data_dia = inicio + timedelta(days=dia)
+            quantidade = max(0, int(rng.gauss(media_dia, math.sqrt(media_dia)) + 0.5)) if media_dia else 0
+            eventos = []
+            for _ in range(quantidade):
+                conta = sortear_conta()
+                tipo = tipos[bisect.bisect_left(pesos_tipos, rng.random() * pesos_tipos[-1])]
+                destino = None
+                if tipo == 'Transferencia':
+                    if total_contas < 2:
+                        continue
+                    destino = rng.randrange(total_contas - 1)
+                    destino += destino >= conta
+                eventos.append((rng.randrange(86400), conta, tipo, self._valor(rng), destino))
+
+            # Estouradores fazem rajadas de saques, às vezes acima do limite por saque
+            for conta in estouradores:
+                for _ in range(rng.randint(3, 6)):
+                    valor = round(limite_saque * rng.uniform(1.0, 2.0), 2) if rng.random() < 0.3 \
+                        else self._valor(rng)
+                    eventos.append((rng.randrange(86400), conta, 'Saque', valor, None))
+
+            eventos.sort(key=lambda evento: evento[0])
+            for segundos, conta, tipo, valor, destino in eventos:
+                yield data_dia + timedelta(seconds=segundos), conta, tipo, valor, destino
+
+    def carregar(self, sistema):
+        """Aplica a carga direto em um SistemaBancario, sem prompts nem prints.
+
+        As regras da ContaCorrente (saldo, limite por saque, saques e transações
+        por dia) são avaliadas na data de cada transação; as rejeitadas não
+        entram no histórico e são contadas por motivo. Os saldos mudam pelos
+        mesmos eventos de domínio das operações interativas.
+        """
+        import eventos
+        from sistema_bancario_POO_decoradores_relatorios_limites import (
+            Deposito, PessoaFisicaCliente, Saque, Transferencia
+        )
+
+        contas = []
+        for dados in self.clientes():
+            endereco = (f"{dados['logradouro']}, {dados['numero']} - {dados['bairro']} - "
+                        f"{dados['cidade']}/{dados['uf']}")
+            cliente = sistema.adicionar_cliente(
+                PessoaFisicaCliente(dados['nome'], dados['data_nascimento'], dados['cpf'], endereco)
+            )
+            contas.append(sistema.abrir_conta_corrente(cliente))
+
+        estatisticas = {'clientes': len(contas), 'aplicadas': 0, 'rejeitadas': {}}
+        if not contas:
+            return estatisticas
+
+        limite_saque = contas[0].limite
+        dia_atual = None
+        saques_dia = {}
+        transacoes_dia = {}
+
+        def rejeitar(motivo):
+            estatisticas['rejeitadas'][motivo] = estatisticas['rejeitadas'].get(motivo, 0) + 1
+
+        for data, indice, tipo, valor, indice_destino in self.transacoes(limite_saque):
+            if data.date() != dia_atual:
+                # Virada do dia: reinicia o limite de saques de quem sacou
+                for indice_sacou in saques_dia:
+                    contas[indice_sacou].reiniciar_limites_diarios()
+                dia_atual = data.date()
+                saques_dia.clear()
+                transacoes_dia.clear()
+
+            conta = contas[indice]
+            if transacoes_dia.get(indice, 0) >= conta.limite_transacoes_diarias:
+                rejeitar('limite_diario')
+                continue
+
+            if tipo == 'Deposito':
+                conta._aplicar_evento(eventos.DEPOSITO, valor)
+                conta.historico.adicionar_transacao(Deposito(valor), data=data)
+            elif tipo == 'Saque':
+                if saques_dia.get(indice, 0) >= conta.limite_saques:
+                    rejeitar('limite_saques')
+                    continue
+                if valor > conta.limite:
+                    rejeitar('limite_valor')
+                    continue
+                if valor > conta.saldo:
+                    rejeitar('saldo_insuficiente')
+                    continue
+                conta._aplicar_evento(eventos.SAQUE, valor)
+                saques_dia[indice] = saques_dia.get(indice, 0) + 1
+                conta.historico.adicionar_transacao(Saque(valor), data=data)
+            else:
+                if valor > conta.saldo:
+                    rejeitar('saldo_insuficiente')
+                    continue
+                destino = contas[indice_destino]
+                transferencia = Transferencia(valor, destino)
+                conta._aplicar_evento(eventos.TRANSFERENCIA_ENVIADA, valor,
+                                      contrapartida=f"{destino.agencia}/{destino.numero}")
+                destino._aplicar_evento(eventos.TRANSFERENCIA_RECEBIDA, valor,
+                                        contrapartida=f"{conta.agencia}/{conta.numero}")
+                conta.historico.adicionar_transferencia(transferencia, 'debito', destino, data=data)
+                destino.historico.adicionar_transferencia(transferencia, 'credito', conta, data=data)
+                transacoes_dia[indice_destino] = transacoes_dia.get(indice_destino, 0) + 1
+
+            transacoes_dia[indice] = transacoes_dia.get(indice, 0) + 1
+            estatisticas['aplicadas'] += 1
+
+        # Só os saques de hoje continuam contando para o limite diário
+        if dia_atual != datetime.now().date():
+            for indice_sacou in saques_dia:
+                contas[indice_sacou].reiniciar_limites_diarios()
+
+        return estatisticas
+
+    def exportar(self, diretorio):
+        """Grava clientes.csv e transacoes.csv em fluxo, sem manter a carga em memória"""
+        os.makedirs(diretorio, exist_ok=True)
+        totais = {'clientes': 0, 'transacoes': 0}
+
+        with open(os.path.join(diretorio, 'clientes.csv'), 'w', newline='', encoding='utf-8') as arquivo:
+            campos = ['nome', 'data_nascimento', 'cpf', 'logradouro', 'numero', 'bairro', 'cidade', 'uf']
+            escritor = csv.DictWriter(arquivo, fieldnames=campos)
+            escritor.writeheader()
+            for dados in self.clientes():
+                escritor.writerow(dados)
+                totais['clientes'] += 1
+
+        with open(os.path.join(diretorio, 'transacoes.csv'), 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(['data', 'conta', 'tipo', 'valor', 'conta_destino'])
+            for data, indice, tipo, valor, indice_destino in self.transacoes():
+                # Números de conta seguem a sequência do sistema: índice + 1
+                escritor.writerow([
+                    data.strftime('%d/%m/%Y %H:%M:%S'), indice + 1, tipo, f"{valor:.2f}",
+                    '' if indice_destino is None else indice_destino + 1
+                ])
+                totais['transacoes'] += 1
+
+        return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera carga sintética para o sistema bancário")
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--taxa", type=float, default=0.3, help="transações por conta por dia")
+    parser.add_argument("--zipf", type=float, default=1.1, help="expoente de Zipf (0 = uniforme)")
+    parser.add_argument("--estouradores", type=float, default=0.02, help="proporção de contas que estouram limites")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="diretório para gravar os CSVs (sem ele, carrega em memória)")
+    args = parser.parse_args()
+
+    perfil = PerfilCarga(clientes=args.clientes, dias=args.dias, transacoes_por_conta_dia=args.taxa,
+                         expoente_zipf=args.zipf, proporcao_estouradores=args.estouradores)
+    gerador = GeradorCarga(perfil, semente=args.semente)
+
+    inicio = time.perf_counter()
+    if args.saida:
+        totais = gerador.exportar(args.saida)
+        print(f"✅ {totais['clientes']} clientes e {totais['transacoes']} transações gravados em {args.saida}")
+    else:
+        from sistema_bancario_POO_decoradores_relatorios_limites import SistemaBancario
+        estatisticas = gerador.carregar(SistemaBancario())
+        print(f"✅ {estatisticas['clientes']} clientes carregados, "
+              f"{estatisticas['aplicadas']} transações aplicadas")
+        for motivo, total in sorted(estatisticas['rejeitadas'].items()):
+            print(f"   Rejeitadas por {motivo}: {total}")
+    print(f"Tempo: {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Pegada de memória do sistema bancário POO.
+
+Três medições complementares:
+
+- pegada_por_tipo: percorre com sys.getsizeof uma amostra de clientes,
+  contas, históricos e entradas do histórico (e os wrappers do log_operacao)
+  e estima o custo de cada tipo de domínio. Cada objeto é medido sem os
+  outros objetos de domínio que referencia (a conta não inclui o cliente).
+  Com carga preguiçosa, só entra o que já está em memória.
+- alocacoes_por_local: roda uma carga sob tracemalloc e agrupa a memória
+  alocada por linha de código.
+- modelo_capacidade: monta bancos de tamanhos crescentes sob tracemalloc e
+  ajusta por mínimos quadrados as retas de bytes por conta e bytes por
+  transação, para projetar a memória de um banco maior. Cada banco medido é
+  montado num processo próprio: as operações sintéticas não entram nas
+  métricas nem na memória do banco em execução.
+
+Funciona a partir do Python 3.8: o ajuste das retas não depende de
+statistics.linear_regression (3.10) e, antes do 3.11 (sem
+max_tasks_per_child), cada medição abre o seu próprio pool de um processo.
+
+Uso:
+    python memoria.py --contas 1000 2000 4000 8000 --transacoes 0 2 4 8
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import os
+import statistics
+import sys
+import threading
+import tracemalloc
+from contextlib import redirect_stdout
+from types import FunctionType
+
+
+_ESCALARES = (str, bytes, int, float, complex, bool, type(None))
+_CONTEINERES = (dict, list, tuple, set, frozenset)
+# Objetos opacos que pertencem a um único objeto de domínio: entram pelo tamanho raso
+_PROPRIOS = (type(threading.Lock()), type(threading.RLock()))
+
+
+def tamanho_profundo(objeto, excluir=()):
+    """Bytes do objeto, dos seus atributos e dos contêineres e valores que eles guardam.
+
+    Outras instâncias (o cliente de uma conta, ouvintes, estágios compartilhados)
+    não entram; excluir são ids de objetos a ignorar. Strings compartilhadas
+    são contadas em cada dono, então o resultado é um limite superior.
+    """
+    vistos = set(excluir)
+    pilha = [objeto]
+    total = 0
+    while pilha:
+        atual = pilha.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        if atual is not objeto and not isinstance(atual, _ESCALARES + _CONTEINERES + _PROPRIOS):
+            continue
+        total += sys.getsizeof(atual)
+
+        if isinstance(atual, dict):
+            pilha.extend(atual.keys())
+            pilha.extend(atual.values())
+        elif isinstance(atual, _CONTEINERES):
+            pilha.extend(atual)
+        elif atual is objeto:
+            if hasattr(atual, '__dict__'):
+                pilha.append(vars(atual))
+            for nome in getattr(type(atual), '__slots__', ()):
+                if hasattr(atual, nome):
+                    pilha.append(getattr(atual, nome))
+    return total
+
+
+def _amostra(itens, limite):
+    """Até limite itens espaçados ao longo da sequência"""
+    quantidade = len(itens)
+    passo = max(1, quantidade // limite) if limite else 1
+    return [itens[indice] for indice in range(0, quantidade, passo)][:limite]
+
+
+def _wrappers_log(modulo):
+    """Funções decoradas com log_operacao nas classes do módulo (wrapper com __wrapped__)"""
+    wrappers = []
+    for valor in vars(modulo).values():
+        if isinstance(valor, type) and valor.__module__ == modulo.__name__:
+            wrappers.extend(funcao for funcao in vars(valor).values()
+                            if isinstance(funcao, FunctionType) and hasattr(funcao, '__wrapped__'))
+    return wrappers
+
+
+def _tamanho_wrapper(wrapper):
+    # O wrapper em si, o __dict__ copiado pelo functools.wraps e as células da closure
+    total = sys.getsizeof(wrapper) + sys.getsizeof(wrapper.__dict__)
+    for celula in wrapper.__closure__ or ():
+        total += sys.getsizeof(celula)
+    return total
+
+
+def pegada_por_tipo(sistema, amostra=1000):
+    """Custo estimado por tipo de domínio: {tipo: {'quantidade', 'bytes_medio', 'bytes_total'}}"""
+    import sistema_bancario_POO_decoradores_relatorios_limites as banco
+
+    resultado = {}
+
+    def registrar(tipo, quantidade, tamanhos):
+        medio = statistics.fmean(tamanhos) if tamanhos else 0.0
+        resultado[tipo] = {'quantidade': quantidade, 'bytes_medio': medio, 'bytes_total': medio * quantidade}
+
+    if sistema.registro is not None:
+        # Carga preguiçosa: percorrer sistema.contas carregaria todas; mede só as que já estão em memória
+        todos_clientes = sistema.registro.clientes_carregados()
+        todas_contas = sistema.registro.contas_carregadas()
+    else:
+        todos_clientes, todas_contas = sistema.clientes, sistema.contas
+
+    clientes = _amostra(todos_clientes, amostra)
+    registrar('PessoaFisicaCliente', len(todos_clientes),
+              [tamanho_profundo(cliente) for cliente in clientes])
+
+    contas = _amostra(todas_contas, amostra)
+    # Historico é medido à parte, e as entradas dele também
+    registrar('ContaCorrente', len(todas_contas), [tamanho_profundo(conta) for conta in contas])
+
+    historicos = [conta.historico for conta in contas]
+    total_entradas = sum(len(conta.historico) for conta in todas_contas)
+    # Só as entradas quentes estão em memória; as da camada fria custam um segmento no disco
+    entradas = [entrada for historico in historicos for entrada in historico._camadas[1]]
+    registrar('Historico', len(todas_contas),
+              [tamanho_profundo(historico, {id(entrada) for entrada in historico._camadas[1]})
+               for historico in historicos])
+    registrar('entrada do Historico', total_entradas,
+              [tamanho_profundo(entrada) for entrada in _amostra(entradas, amostra)])
+
+    wrappers = _wrappers_log(banco)
+    registrar('wrapper log_operacao', len(wrappers), [_tamanho_wrapper(wrapper) for wrapper in wrappers])
+    return resultado
+
+
+def alocacoes_por_local(carga, limite=10, quadros=1):
+    """Roda carga() sob tracemalloc; retorna as linhas que mais alocaram [(local, bytes, blocos)]"""
+    ja_rastreando = tracemalloc.is_tracing()
+    if not ja_rastreando:
+        tracemalloc.start(quadros)
+    try:
+        antes = tracemalloc.take_snapshot()
+        carga()
+        depois = tracemalloc.take_snapshot()
+    finally:
+        if not ja_rastreando:
+            tracemalloc.stop()
+
+    filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+    diferencas = depois.filter_traces(filtros).compare_to(antes.filter_traces(filtros), 'lineno')
+    return [(f"{os.path.basename(diferenca.traceback[0].filename)}:{diferenca.traceback[0].lineno}",
+             diferenca.size_diff, diferenca.count_diff)
+            for diferenca in diferencas[:limite]]
+
+
+def _montar_banco(contas, transacoes_por_conta):
+    """Monta um banco sem modelo de leitura nem persistência: só o custo do domínio em memória.
+
+    O banco não registra medidores; quem o monta deve chamar sistema.fechar().
+    """
+    import sistema_bancario_POO_decoradores_relatorios_limites as banco
+    import validacao
+
+    sistema = banco.SistemaBancario(registrar_metricas=False)
+    clientes = []
+    for indice in range(contas):
+        base = f"{indice:09d}"
+        cpf = base + validacao.digitos_verificadores_cpf(base)
+        clientes.append(banco.PessoaFisicaCliente(f"Cliente {indice}", "01/01/1990", cpf,
+                                                  "Rua A, 1 - Centro - Recife/PE"))
+    sistema.adicionar_clientes(clientes)
+    for cliente in clientes:
+        conta = sistema.abrir_conta_corrente(cliente)
+        for _ in range(transacoes_por_conta):
+            cliente.realizar_transacao(conta, banco.Deposito(10.0))
+    return sistema
+
+
+def _medir_no_processo(contas, transacoes_por_conta):
+    tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as nulo, redirect_stdout(nulo):
+            antes = tracemalloc.get_traced_memory()[0]
+            sistema = _montar_banco(contas, transacoes_por_conta)
+            depois = tracemalloc.get_traced_memory()[0]
+            sistema.fechar()
+    finally:
+        tracemalloc.stop()
+    return depois - antes
+
+
+def medir_banco(contas, transacoes_por_conta, executor=None):
+    """Bytes rastreados pelo tracemalloc para montar um banco desse tamanho, num processo à parte"""
+    if executor is not None:
+        return executor.submit(_medir_no_processo, contas, transacoes_por_conta).result()
+    # Um processo novo por medição: nada do banco medido fica neste processo
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_medir_no_processo, contas, transacoes_por_conta).result()
+
+
+def _executor_isolado():
+    """Pool de um processo trocado a cada medição (3.11+); antes disso, None: medir_banco abre um por medição"""
+    if sys.version_info >= (3, 11):
+        return ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1)
+    return nullcontext()
+
+
+def _ajustar(xs, ys):
+    """Reta de mínimos quadrados (inclinação, intercepto) e o seu R²"""
+    media_x, media_y = statistics.fmean(xs), statistics.fmean(ys)
+    sxx = sum((x - media_x) ** 2 for x in xs)
+    syy = sum((y - media_y) ** 2 for y in ys)
+    sxy = sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys))
+    if not sxx:
+        raise statistics.StatisticsError("as medições precisam de pelo menos dois tamanhos distintos")
+    inclinacao = sxy / sxx
+    r2 = sxy * sxy / (sxx * syy) if syy else 1.0
+    return inclinacao, media_y - inclinacao * media_x, r2
+
+
+class ModeloCapacidade:
+    """Retas ajustadas de memória: bytes = fixo + contas * por_conta + transações * por_transacao"""
+
+    def __init__(self, bytes_por_conta, bytes_por_transacao, bytes_fixos, r2_contas, r2_transacoes, medicoes):
+        self.bytes_por_conta = bytes_por_conta
+        self.bytes_por_transacao = bytes_por_transacao
+        self.bytes_fixos = bytes_fixos
+        self.r2_contas = r2_contas
+        self.r2_transacoes = r2_transacoes
+        self.medicoes = medicoes  # [(contas, transações por conta, bytes)]
+
+    def projetar(self, contas, transacoes):
+        """Bytes estimados para um banco com esse total de contas e de transações"""
+        return self.bytes_fixos + contas * self.bytes_por_conta + transacoes * self.bytes_por_transacao
+
+
+def modelo_capacidade(tamanhos=(1000, 2000, 4000, 8000), transacoes_por_conta=(0, 2, 4, 8)):
+    """Mede bancos de tamanhos crescentes e ajusta as retas de bytes por conta e por transação.
+
+    A reta por conta usa os bancos sem transações; a por transação fixa o maior
+    número de contas e varia as transações de cada uma (até o limite diário).
+    """
+    with _executor_isolado() as executor:
+        medicoes = [(contas, 0, medir_banco(contas, 0, executor)) for contas in tamanhos]
+        contas = max(tamanhos)
+        variando = [(contas, transacoes, medir_banco(contas, transacoes, executor))
+                    for transacoes in transacoes_por_conta]
+    por_conta, fixos, r2_contas = _ajustar([contas for contas, _, _ in medicoes],
+                                           [total for _, _, total in medicoes])
+    por_transacao, _, r2_transacoes = _ajustar([contas * transacoes for _, transacoes, _ in variando],
+                                               [total for _, _, total in variando])
+    return ModeloCapacidade(por_conta, por_transacao, fixos, r2_contas, r2_transacoes, medicoes + variando)
+
+
+def exibir_pegada(pegada):
+    print(f"{'Tipo':<24}{'Qtd':>10}{'Bytes/obj':>12}{'Total MB':>12}")
+    print("-" * 58)
+    for tipo, dados in pegada.items():
+        print(f"{tipo:<24}{dados['quantidade']:>10}{dados['bytes_medio']:>12.0f}"
+              f"{dados['bytes_total'] / 2**20:>12.2f}")
+
+
+def exibir_modelo(modelo):
+    print(f"{'Contas':>10}{'Trans/conta':>13}{'MB':>10}")
+    for contas, transacoes, total in modelo.medicoes:
+        print(f"{contas:>10}{transacoes:>13}{total / 2**20:>10.2f}")
+    print(f"📐 {modelo.bytes_por_conta:.0f} bytes por conta (R² {modelo.r2_contas:.3f}), "
+          f"{modelo.bytes_por_transacao:.0f} bytes por transação (R² {modelo.r2_transacoes:.3f})")
+    for contas in (100_000, 1_000_000):
+        print(f"   {contas} contas com 100 transações cada: "
+              f"~{modelo.projetar(contas, contas * 100) / 2**30:.2f} GB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pegada de memória e modelo de capacidade")
+    parser.add_argument("--contas", type=int, nargs="+", default=[1000, 2000, 4000, 8000],
+                        help="tamanhos de banco medidos")
+    parser.add_argument("--transacoes", type=int, nargs="+", default=[0, 2, 4, 8],
+                        help="transações por conta medidas (no máximo o limite diário)")
+    parser.add_argument("--locais", type=int, default=10, help="linhas de alocação exibidas")
+    args = parser.parse_args()
+
+    sistema = None
+
+    def carga():
+        nonlocal sistema
+        with open(os.devnull, 'w') as nulo, redirect_stdout(nulo):
+            sistema = _montar_banco(max(args.contas), max(args.transacoes))
+
+    print("🔬 Alocações por local")
+    for local, tamanho, blocos in alocacoes_por_local(carga, args.locais):
+        print(f"   {local:<60}{tamanho / 1024:>10.1f} KiB{blocos:>10} blocos")
+    print("\n🔬 Pegada por tipo")
+    exibir_pegada(pegada_por_tipo(sistema))
+    sistema.fechar()
+    print("\n🔬 Modelo de capacidade")
+    exibir_modelo(modelo_capacidade(args.contas, args.transacoes))
+
+
+if __name__ == "__main__":
+    main()
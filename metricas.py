@@ -0,0 +1,250 @@
+"""Métricas de operação do sistema bancário.
+
+Histogramas de latência no estilo HDR, contadores de sucesso/rejeição e
+medidores (gauges), expostos em texto no formato Prometheus por um pequeno
+servidor HTTP local.
+"""
+
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import weakref
+
+
+# Precisão dos histogramas: 4 bits significativos (erro relativo < 12,5%)
+_BITS = 4
+_SUB_BUCKETS = 1 << _BITS
+_METADE = _SUB_BUCKETS >> 1
+_TOTAL_BUCKETS = _SUB_BUCKETS + 48 * _METADE
+
+QUANTIS = (0.5, 0.9, 0.99, 0.999)
+
+
+def _indice_bucket(valor):
+    """Converte um valor (ns) no índice do bucket log-linear"""
+    if valor < _SUB_BUCKETS:
+        return valor
+    deslocamento = valor.bit_length() - _BITS
+    mantissa = valor >> deslocamento
+    indice = _SUB_BUCKETS + (deslocamento - 1) * _METADE + (mantissa - _METADE)
+    return min(indice, _TOTAL_BUCKETS - 1)
+
+
+def _limite_bucket(indice):
+    """Retorna o maior valor (ns) representado por um bucket"""
+    if indice < _SUB_BUCKETS:
+        return indice
+    deslocamento = (indice - _SUB_BUCKETS) // _METADE + 1
+    mantissa = (indice - _SUB_BUCKETS) % _METADE + _METADE
+    return ((mantissa + 1) << deslocamento) - 1
+
+
+class HistogramaLatencia:
+    """Histograma de latências com buckets log-lineares de tamanho fixo"""
+
+    def __init__(self):
+        self._buckets = [0] * _TOTAL_BUCKETS
+        self._contagem = 0
+        self._soma = 0
+        self._maximo = 0
+        self._lock = threading.Lock()
+
+    @property
+    def contagem(self):
+        return self._contagem
+
+    @property
+    def soma(self):
+        return self._soma
+
+    @property
+    def maximo(self):
+        return self._maximo
+
+    def registrar(self, nanossegundos):
+        """Registra uma latência em nanossegundos"""
+        indice = _indice_bucket(nanossegundos)
+        with self._lock:
+            self._buckets[indice] += 1
+            self._contagem += 1
+            self._soma += nanossegundos
+            if nanossegundos > self._maximo:
+                self._maximo = nanossegundos
+
+    def quantil(self, q):
+        """Retorna o quantil q (0 a 1) em nanossegundos"""
+        with self._lock:
+            buckets = list(self._buckets)
+            contagem = self._contagem
+            maximo = self._maximo
+
+        if contagem == 0:
+            return 0
+
+        alvo = max(1, int(q * contagem + 0.5))
+        acumulado = 0
+        for indice, quantidade in enumerate(buckets):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min(_limite_bucket(indice), maximo)
+        return maximo
+
+
+class RegistroMetricas:
+    """Guarda histogramas, contadores e medidores das operações"""
+
+    def __init__(self):
+        self._histogramas = {}
+        self._operacoes = {}
+        self._rejeicoes = {}
+        self._medidores = {}  # nome -> [(referência fraca ao dono ou None, função, descrição)], o último vale
+        self._lock = threading.Lock()
+
+    def _histograma(self, operacao):
+        histograma = self._histogramas.get(operacao)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(operacao, HistogramaLatencia())
+        return histograma
+
+    def observar(self, operacao, nanossegundos, resultado):
+        """Registra a latência e o resultado ('sucesso', 'rejeitado', 'erro') de uma operação"""
+        self._histograma(operacao).registrar(nanossegundos)
+        chave = (operacao, resultado)
+        with self._lock:
+            self._operacoes[chave] = self._operacoes.get(chave, 0) + 1
+
+    def rejeicao(self, motivo):
+        """Conta uma rejeição pelo motivo (ex: 'saldo_insuficiente')"""
+        with self._lock:
+            self._rejeicoes[motivo] = self._rejeicoes.get(motivo, 0) + 1
+
+    def medidor(self, nome, funcao, descricao="", dono=None):
+        """Registra um medidor calculado por funcao() no momento da leitura.
+
+        Com dono, o medidor é funcao(dono) e guarda o dono só por referência fraca: ele some
+        quando o dono é coletado ou passado a remover_medidores. Um nome já registrado por
+        outro dono fica encoberto pelo novo e volta a valer quando o novo sai.
+        """
+        referencia = weakref.ref(dono) if dono is not None else None
+        with self._lock:
+            pilha = [item for item in self._medidores.get(nome, ())
+                     if (item[0]() if item[0] is not None else None) is not dono]
+            pilha.append((referencia, funcao, descricao))
+            self._medidores[nome] = pilha
+
+    def remover_medidores(self, dono):
+        """Tira os medidores registrados por dono (chamado ao fechar o componente)"""
+        with self._lock:
+            for nome, pilha in list(self._medidores.items()):
+                pilha = [item for item in pilha if item[0] is None or item[0]() is not dono]
+                if pilha:
+                    self._medidores[nome] = pilha
+                else:
+                    del self._medidores[nome]
+
+    def _medidores_vigentes(self):
+        """{nome: (função sem argumentos, descrição)}, descartando os de donos já coletados"""
+        vigentes = {}
+        with self._lock:
+            for nome, pilha in list(self._medidores.items()):
+                vivos = []
+                for referencia, funcao, descricao in pilha:
+                    if referencia is None:
+                        vigentes[nome] = (funcao, descricao)
+                    else:
+                        dono = referencia()
+                        if dono is None:
+                            continue
+                        vigentes[nome] = (functools.partial(funcao, dono), descricao)
+                    vivos.append((referencia, funcao, descricao))
+                if vivos:
+                    self._medidores[nome] = vivos
+                else:
+                    del self._medidores[nome]
+        return vigentes
+
+    def resumo(self):
+        """Retorna um dicionário com o estado atual das métricas"""
+        with self._lock:
+            histogramas = dict(self._histogramas)
+            operacoes = dict(self._operacoes)
+            rejeicoes = dict(self._rejeicoes)
+        medidores = self._medidores_vigentes()
+
+        return {
+            'latencias': {
+                operacao: {
+                    'contagem': histograma.contagem,
+                    'soma_ns': histograma.soma,
+                    'maximo_ns': histograma.maximo,
+                    'quantis_ns': {q: histograma.quantil(q) for q in QUANTIS},
+                }
+                for operacao, histograma in sorted(histogramas.items())
+            },
+            'operacoes': operacoes,
+            'rejeicoes': rejeicoes,
+            'medidores': {nome: funcao() for nome, (funcao, _) in sorted(medidores.items())},
+        }
+
+    def formato_prometheus(self):
+        """Gera o texto de exposição no formato Prometheus"""
+        resumo = self.resumo()
+        linhas = [
+            "# HELP banco_operacao_latencia_segundos Latência das operações bancárias",
+            "# TYPE banco_operacao_latencia_segundos summary",
+        ]
+        for operacao, dados in resumo['latencias'].items():
+            for q, valor in dados['quantis_ns'].items():
+                linhas.append(f'banco_operacao_latencia_segundos{{operacao="{operacao}",quantile="{q}"}} '
+                              f'{valor / 1e9:.9f}')
+            linhas.append(f'banco_operacao_latencia_segundos_sum{{operacao="{operacao}"}} '
+                          f'{dados["soma_ns"] / 1e9:.9f}')
+            linhas.append(f'banco_operacao_latencia_segundos_count{{operacao="{operacao}"}} {dados["contagem"]}')
+
+        linhas.append("# HELP banco_operacoes_total Operações por resultado")
+        linhas.append("# TYPE banco_operacoes_total counter")
+        for (operacao, resultado), total in sorted(resumo['operacoes'].items()):
+            linhas.append(f'banco_operacoes_total{{operacao="{operacao}",resultado="{resultado}"}} {total}')
+
+        linhas.append("# HELP banco_rejeicoes_total Operações rejeitadas por motivo")
+        linhas.append("# TYPE banco_rejeicoes_total counter")
+        for motivo, total in sorted(resumo['rejeicoes'].items()):
+            linhas.append(f'banco_rejeicoes_total{{motivo="{motivo}"}} {total}')
+
+        descricoes = {nome: descricao for nome, (_, descricao) in self._medidores_vigentes().items()}
+        for nome, valor in resumo['medidores'].items():
+            linhas.append(f"# HELP banco_{nome} {descricoes.get(nome) or nome}")
+            linhas.append(f"# TYPE banco_{nome} gauge")
+            linhas.append(f"banco_{nome} {valor}")
+
+        return "\n".join(linhas) + "\n"
+
+
+# Registro padrão usado pelo decorador log_operacao
+registro = RegistroMetricas()
+
+
+def iniciar_servidor(registro_metricas=None, host="127.0.0.1", porta=9100):
+    """Inicia o endpoint /metrics em uma thread daemon e retorna o servidor"""
+    registro_metricas = registro_metricas or registro
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = registro_metricas.formato_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), _Handler)
+    thread = threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True)
+    thread.start()
+    return servidor
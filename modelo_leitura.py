@@ -0,0 +1,184 @@
+"""Modelo de leitura (CQRS) do sistema bancário.
+
+As transações confirmadas são publicadas numa fila em processo e aplicadas
+por uma thread própria em projeções separadas (resumo por conta e as
+últimas entradas do histórico). Extratos, relatórios e listagens leem
+dessas projeções, então nunca seguram os locks das contas; o atraso máximo
+tolerado é configurável e o atraso atual é exposto como métrica.
+
+A projeção não guarda o histórico inteiro: de cada conta ficam o resumo, o
+número de entradas projetadas e uma cauda limitada. As entradas anteriores
+à cauda são lidas da visão do histórico da própria conta (que pode estar na
+camada fria), e uma conta descarregada sai da projeção.
+"""
+
+from collections import deque
+import itertools
+import queue
+import threading
+import time
+
+import eventos
+import metricas
+
+
+_PARAR = object()
+# Eventos que mudam o resumo sem gerar entrada no histórico
+_SEM_ENTRADA = frozenset((eventos.LIMITES_REINICIADOS,))
+
+
+class ModeloLeitura:
+    """Projeções de leitura alimentadas de forma assíncrona pelas transações confirmadas"""
+
+    def __init__(self, limite_atraso=0.5, cauda=100, registrar_metricas=True):
+        self._limite_atraso = limite_atraso
+        self._cauda = cauda
+        self._fila = queue.SimpleQueue()
+        self._resumos = {}  # agência -> {(agência, número): resumo}
+        self._caudas = {}  # (agência, número) -> [entradas projetadas, deque das últimas]
+        self._publicadas = 0
+        self._aplicadas = 0
+        self._instantes_pendentes = deque()
+        self._lock = threading.Lock()
+        self._aplicou = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._consumir, name="modelo-leitura", daemon=True)
+        self._thread.start()
+
+        if registrar_metricas:
+            metricas.registro.medidor('modelo_leitura_atraso_segundos', ModeloLeitura.atraso,
+                                      "Idade da transação confirmada mais antiga ainda não projetada", dono=self)
+            metricas.registro.medidor('modelo_leitura_pendentes', lambda modelo: modelo.pendentes,
+                                      "Transações confirmadas aguardando projeção", dono=self)
+
+    @property
+    def pendentes(self):
+        return self._publicadas - self._aplicadas
+
+    def atraso(self):
+        """Segundos desde a publicação mais antiga ainda não aplicada (0 se em dia)"""
+        with self._lock:
+            if not self._instantes_pendentes:
+                return 0.0
+            return time.monotonic() - self._instantes_pendentes[0]
+
+    # Lado da escrita: chamado com a conta travada, precisa ser barato
+
+    def _publicar(self, mensagem):
+        with self._lock:
+            self._publicadas += 1
+            self._instantes_pendentes.append(time.monotonic())
+        self._fila.put(mensagem)
+
+    def registrar_conta(self, conta):
+        """Publica a abertura (ou recarga) de uma conta, com o que o histórico já tinha"""
+        self._publicar(('conta', (conta.agencia, conta.numero), ({
+            'agencia': conta.agencia,
+            'numero': conta.numero,
+            'titular': conta.cliente.nome,
+            'saldo': conta.saldo,
+            'tipo': conta.__class__.__name__,
+            'saques_realizados': getattr(conta, 'saques_realizados', 0),
+            'limite_saques': getattr(conta, 'limite_saques', None),
+            'limite_transacoes_diarias': getattr(conta, 'limite_transacoes_diarias', None),
+        }, len(conta.historico))))
+
+    def descartar_conta(self, conta):
+        """Tira da projeção uma conta descarregada da memória"""
+        self._publicar(('descartar', (conta.agencia, conta.numero), None))
+
+    def publicar_transacao(self, conta, entrada):
+        """Publica uma entrada recém-confirmada no histórico com o saldo do momento"""
+        self._publicar(('transacao', (conta.agencia, conta.numero),
+                        (dict(entrada), conta.saldo, getattr(conta, 'saques_realizados', 0))))
+
+    def ouvinte(self, conta):
+        """Retorna o ouvinte a inscrever no Historico da conta"""
+        def _ouvinte(historico, entrada):
+            self.publicar_transacao(conta, entrada)
+        return _ouvinte
+
+    def ouvinte_eventos(self, conta):
+        """Ouvinte a inscrever na conta: projeta as mudanças que não geram entrada (reinício de limites)"""
+        def _ouvinte(conta_alterada, evento):
+            if evento.tipo in _SEM_ENTRADA:
+                self._publicar(('estado', (conta.agencia, conta.numero),
+                                (conta.saldo, getattr(conta, 'saques_realizados', 0))))
+        return _ouvinte
+
+    # Consumidor
+
+    def _consumir(self):
+        while True:
+            mensagem = self._fila.get()
+            if mensagem is _PARAR:
+                return
+            tipo, chave, dados = mensagem
+            with self._lock:
+                if tipo == 'conta':
+                    resumo, anteriores = dados
+                    self._resumos.setdefault(chave[0], {})[chave] = resumo
+                    # Uma conta recarregada recomeça a cauda; as entradas que já tinha ficam na conta
+                    self._caudas[chave] = [anteriores, deque(maxlen=self._cauda)]
+                elif tipo == 'descartar':
+                    self._resumos.get(chave[0], {}).pop(chave, None)
+                    self._caudas.pop(chave, None)
+                else:
+                    if tipo == 'transacao':
+                        entrada, saldo, saques = dados
+                        cauda = self._caudas.setdefault(chave, [0, deque(maxlen=self._cauda)])
+                        cauda[0] += 1
+                        cauda[1].append(entrada)
+                    else:
+                        saldo, saques = dados
+                    resumo = self._resumos.get(chave[0], {}).get(chave)
+                    if resumo is not None:
+                        resumo['saldo'] = saldo
+                        resumo['saques_realizados'] = saques
+                self._aplicadas += 1
+                self._instantes_pendentes.popleft()
+                self._aplicou.notify_all()
+
+    def fechar(self):
+        """Aplica o que já foi publicado, encerra a thread consumidora e tira os medidores"""
+        metricas.registro.remover_medidores(self)
+        if not self._thread.is_alive():
+            return
+        self._fila.put(_PARAR)  # A fila é FIFO: a thread só para depois de drenar as anteriores
+        self._thread.join()
+
+    # Lado da leitura
+
+    def sincronizar(self, limite_atraso=None, tempo_maximo=5.0):
+        """Espera até o atraso ficar dentro do limite (staleness limitada)"""
+        limite_atraso = self._limite_atraso if limite_atraso is None else limite_atraso
+        with self._lock:
+            if not self._instantes_pendentes:
+                return True
+            if time.monotonic() - self._instantes_pendentes[0] <= limite_atraso:
+                return True
+            alvo = self._publicadas
+            return self._aplicou.wait_for(lambda: self._aplicadas >= alvo, tempo_maximo)
+
+    def listar_contas(self, limite_atraso=None, agencia=None):
+        """Resumos das contas agrupados por agência; com agencia, lê só a partição dela"""
+        self.sincronizar(limite_atraso)
+        with self._lock:
+            if agencia is not None:
+                return [dict(resumo) for resumo in self._resumos.get(agencia, {}).values()]
+            return [dict(resumo) for particao in self._resumos.values() for resumo in particao.values()]
+
+    def extrato(self, conta, limite_atraso=None):
+        """Resumo e histórico projetados de uma conta (resumo None se ela não está na projeção)"""
+        self.sincronizar(limite_atraso)
+        chave = (conta.agencia, conta.numero)
+        with self._lock:
+            resumo = self._resumos.get(chave[0], {}).get(chave)
+            if resumo is None:
+                return None, []
+            projetadas, cauda = self._caudas[chave]
+            resumo, cauda = dict(resumo), list(cauda)
+        # O que não cabe na cauda vem do histórico da conta (pode ler do disco: fora do lock)
+        anteriores = projetadas - len(cauda)
+        if anteriores <= 0:
+            return resumo, cauda
+        return resumo, list(itertools.islice(conta.historico.visao(), anteriores)) + cauda
@@ -0,0 +1,335 @@
+"""Detector de operações lentas do sistema bancário.
+
+As operações do log_operacao (e o relatório de transações) passam pelo
+monitor do detector. Quando uma operação passa do limiar, uma captura em
+JSON vai para o diretório de capturas, que guarda só as mais recentes:
+argumentos, tamanho do histórico da conta, duração e, conforme o modo,
+
+- 'perfil': estatísticas do cProfile da operação (cada operação é perfilada
+  e o perfil só é guardado se ela for lenta; se outro perfilador já estiver
+  ativo, como no Python 3.12+ com duas threads, a operação cai na amostragem);
+- 'amostragem': as pilhas mais frequentes da thread da operação, amostradas
+  por uma thread à parte a cada poucos milissegundos (custo bem menor);
+- 'desligado': só os dados da chamada.
+
+Só a operação mais externa de cada thread é monitorada (transferir não
+captura de novo o sacar que chama). A thread da operação, que pode ainda
+segurar locks de contas, só junta os dados da chamada: formatar o perfil e
+gravar o arquivo fica com uma thread escritora do detector. Limiar e modo mudam em tempo de
+execução, pelo menu de métricas, pelo comando 'lentas' do roteiro ou, em
+POSIX, pelo sinal SIGUSR1, que liga o perfil (com um limiar padrão, se o
+detector estava desligado) e depois volta ao modo e limiar anteriores.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import cProfile
+from datetime import datetime
+import io
+import itertools
+import json
+import os
+import pstats
+import reprlib
+import signal
+import sys
+import threading
+import time
+import traceback
+
+import metricas
+
+
+MODOS = ('desligado', 'amostragem', 'perfil')
+LIMIAR_SINAL_MS = 100.0  # Limiar do SIGUSR1 quando o detector está desligado
+_PREFIXO = "lenta_"
+
+_repr = reprlib.Repr()
+_repr.maxstring = 80
+_repr.maxother = 80
+
+
+def _descrever(valor):
+    """Descrição curta de um argumento: contas pela chave, transações pelo valor"""
+    if hasattr(valor, 'agencia') and hasattr(valor, 'numero'):
+        return f"{type(valor).__name__} {valor.agencia}/{valor.numero}"
+    if hasattr(valor, 'valor') and not isinstance(valor, (int, float)):
+        return f"{type(valor).__name__}({valor.valor})"
+    return _repr.repr(valor)
+
+
+def _tamanho_historico(args):
+    for valor in args:
+        historico = getattr(valor, 'historico', None)
+        if historico is not None:
+            return len(historico)
+    return None
+
+
+class _MonitorNulo:
+    """Monitor que não mede nada (detector desligado ou operação aninhada)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _MonitorNulo()
+
+
+class _Monitor:
+    """Mede uma operação e, se ela passar do limiar, grava a captura"""
+
+    __slots__ = ('_detector', '_nome', '_args', '_kwargs', '_modo', '_inicio', '_perfil', '_pilhas')
+
+    def __init__(self, detector, nome, args, kwargs):
+        self._detector = detector
+        self._nome = nome
+        self._args = args
+        self._kwargs = kwargs
+        self._modo = detector.modo
+        self._perfil = None
+        self._pilhas = None
+
+    def __enter__(self):
+        self._detector._local.profundidade = 1
+        if self._modo == 'perfil':
+            self._perfil = cProfile.Profile()
+            try:
+                self._perfil.enable()
+            except ValueError:
+                # 3.12+: só um perfilador ativo por vez (outra thread já está perfilando)
+                self._perfil = None
+                self._modo = 'amostragem'
+        if self._modo == 'amostragem':
+            self._pilhas = self._detector._amostrador.registrar()
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        duracao = time.perf_counter_ns() - self._inicio
+        if self._perfil is not None:
+            self._perfil.disable()
+        elif self._pilhas is not None:
+            self._detector._amostrador.remover()
+        self._detector._local.profundidade = 0
+        limiar = self._detector.limiar_ns
+        if limiar is not None and duracao >= limiar:
+            self._detector._capturar(self, duracao, tipo_exc.__name__ if tipo_exc else None)
+        return False
+
+
+class _Amostrador:
+    """Thread que amostra as pilhas das threads com operação monitorada em andamento"""
+
+    def __init__(self, intervalo=0.005, profundidade=20):
+        self._intervalo = intervalo
+        self._profundidade = profundidade
+        self._ativas = {}  # id da thread -> Counter de pilhas
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def registrar(self):
+        pilhas = Counter()
+        with self._lock:
+            self._ativas[threading.get_ident()] = pilhas
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._laco, name="amostrador-lentas", daemon=True)
+                self._thread.start()
+        return pilhas
+
+    def remover(self):
+        with self._lock:
+            self._ativas.pop(threading.get_ident(), None)
+
+    def _laco(self):
+        while True:
+            time.sleep(self._intervalo)
+            with self._lock:
+                if not self._ativas:
+                    # Sem operações em andamento a thread termina; a próxima a recria
+                    self._thread = None
+                    return
+                ativas = dict(self._ativas)
+            quadros = sys._current_frames()
+            for identificador, pilhas in ativas.items():
+                quadro = quadros.get(identificador)
+                if quadro is None:
+                    continue
+                pilha = tuple(f"{os.path.basename(item.filename)}:{item.lineno} {item.name}"
+                              for item in traceback.extract_stack(quadro, limit=self._profundidade))
+                with self._lock:
+                    # A operação pode ter terminado enquanto a pilha era lida
+                    if self._ativas.get(identificador) is pilhas:
+                        pilhas[pilha] += 1
+
+
+class DetectorLentidao:
+    """Guarda capturas das operações que passam do limiar num diretório rotativo"""
+
+    def __init__(self, limiar_ms=None, modo='desligado', diretorio="capturas_lentas", maximo_capturas=50,
+                 registrar_metricas=True):
+        self._limiar_ns = None
+        self._modo = 'desligado'
+        self._diretorio = diretorio
+        self._maximo_capturas = maximo_capturas
+        self._capturas = None  # Arquivos do diretório, do mais antigo ao mais novo (lidos na 1ª captura)
+        self._total = 0
+        self._sequencia = itertools.count(1)
+        self._local = threading.local()
+        self._anterior = None  # (limiar_ns, modo) de antes do SIGUSR1 ligar o perfil
+        self._amostrador = _Amostrador()
+        self._escritor = None  # Thread única que formata e grava as capturas, criada na primeira
+        self._lock = threading.Lock()
+        self.configurar(limiar_ms, modo)
+        if registrar_metricas:
+            metricas.registro.medidor('operacoes_lentas_capturadas', lambda detector: detector._total,
+                                      "Operações que passaram do limiar de lentidão", dono=self)
+
+    @property
+    def limiar_ns(self):
+        return self._limiar_ns
+
+    @property
+    def limiar_ms(self):
+        return self._limiar_ns / 1e6 if self._limiar_ns is not None else None
+
+    @property
+    def modo(self):
+        return self._modo
+
+    @property
+    def diretorio(self):
+        return self._diretorio
+
+    @property
+    def total(self):
+        return self._total
+
+    def configurar(self, limiar_ms=None, modo=None, diretorio=None, maximo_capturas=None):
+        """Muda o limiar (None desliga o detector), o modo de captura e o destino, sem reiniciar"""
+        if modo is not None and modo not in MODOS:
+            raise ValueError(f"Modo inválido: {modo} (use {', '.join(MODOS)})")
+        with self._lock:
+            self._limiar_ns = int(limiar_ms * 1e6) if limiar_ms is not None else None
+            if modo is not None:
+                self._modo = modo
+            if diretorio is not None and diretorio != self._diretorio:
+                self._diretorio = diretorio
+                self._capturas = None
+            if maximo_capturas is not None:
+                self._maximo_capturas = maximo_capturas
+            self._anterior = None  # Configuração explícita: o próximo SIGUSR1 parte dela
+
+    def monitorar(self, nome, args=(), kwargs=None):
+        """Gerenciador de contexto que mede a operação; nulo se desligado ou aninhado"""
+        if self._limiar_ns is None or getattr(self._local, 'profundidade', 0):
+            return _NULO
+        return _Monitor(self, nome, args, kwargs or {})
+
+    def alternar_perfil(self, *_):
+        """Liga o modo perfil ou volta ao modo e limiar anteriores (também é o tratador do SIGUSR1)"""
+        # Sem o lock: o sinal pode chegar à thread principal enquanto ela o segura
+        if self._anterior is not None:
+            self._limiar_ns, self._modo = self._anterior
+            self._anterior = None
+            return
+        self._anterior = (self._limiar_ns, self._modo)
+        self._modo = 'perfil'
+        if self._limiar_ns is None:
+            self._limiar_ns = int(LIMIAR_SINAL_MS * 1e6)
+
+    # Capturas
+
+    def _capturar(self, monitor, duracao, erro):
+        # Na thread da operação só os dados baratos; o perfil e as pilhas vão crus para o escritor
+        captura = {
+            'operacao': monitor._nome,
+            'instante': datetime.now().isoformat(timespec='milliseconds'),
+            'duracao_ms': duracao / 1e6,
+            'limiar_ms': self.limiar_ms,
+            'thread': threading.current_thread().name,
+            'modo': monitor._modo,
+            'erro': erro,
+            'argumentos': [_descrever(valor) for valor in monitor._args],
+            'kwargs': {nome: _descrever(valor) for nome, valor in monitor._kwargs.items()},
+            'tamanho_historico': _tamanho_historico(monitor._args),
+        }
+        with self._lock:
+            self._total += 1
+            if self._escritor is None:
+                self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capturas-lentas')
+            escritor = self._escritor
+        escritor.submit(self._gravar, captura, monitor._perfil, monitor._pilhas, monitor._nome.replace('.', '_'))
+
+    def _gravar(self, captura, perfil, pilhas, nome):
+        """Formata e grava uma captura, na thread escritora (a única que mexe nos arquivos)"""
+        if perfil is not None:
+            saida = io.StringIO()
+            pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(25)
+            captura['perfil'] = saida.getvalue()
+        elif pilhas is not None:
+            captura['amostras'] = sum(pilhas.values())
+            captura['pilhas'] = [{'amostras': quantidade, 'pilha': list(pilha)}
+                                 for pilha, quantidade in pilhas.most_common(10)]
+
+        with self._lock:
+            diretorio, maximo = self._diretorio, self._maximo_capturas
+            if self._capturas is None:
+                os.makedirs(diretorio, exist_ok=True)
+                self._capturas = sorted(arquivo for arquivo in os.listdir(diretorio)
+                                        if arquivo.startswith(_PREFIXO))
+            capturas = self._capturas
+        arquivo = f"{_PREFIXO}{datetime.now():%Y%m%d-%H%M%S}_{next(self._sequencia):06d}_{nome}.json"
+        with open(os.path.join(diretorio, arquivo), 'w', encoding='utf-8') as saida:
+            json.dump(captura, saida, ensure_ascii=False, indent=1)
+        capturas.append(arquivo)
+        while len(capturas) > maximo:
+            antigo = capturas.pop(0)
+            try:
+                os.remove(os.path.join(diretorio, antigo))
+            except FileNotFoundError:
+                pass
+
+    def aguardar(self):
+        """Espera as capturas já entregues ao escritor serem gravadas"""
+        with self._lock:
+            escritor = self._escritor
+        if escritor is not None:
+            escritor.submit(lambda: None).result()
+
+    def capturas(self, limite=10):
+        """Resumo das capturas mais recentes: [(arquivo, operação, duração em ms)]"""
+        self.aguardar()
+        if not os.path.isdir(self._diretorio):
+            return []
+        arquivos = sorted(arquivo for arquivo in os.listdir(self._diretorio) if arquivo.startswith(_PREFIXO))
+        resultado = []
+        for arquivo in reversed(arquivos[-limite:]):
+            try:
+                with open(os.path.join(self._diretorio, arquivo), encoding='utf-8') as entrada:
+                    captura = json.load(entrada)
+            except (OSError, ValueError):
+                continue
+            resultado.append((arquivo, captura['operacao'], captura['duracao_ms']))
+        return resultado
+
+
+# Detector padrão, desligado até ser configurado
+detector = DetectorLentidao()
+
+
+def configurar_por_ambiente():
+    """Liga o detector se BANCO_LENTAS_LIMIAR_MS estiver definido; SIGUSR1 alterna o perfil"""
+    limiar = os.environ.get('BANCO_LENTAS_LIMIAR_MS')
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, detector.alternar_perfil)
+    if not limiar:
+        return False
+    detector.configurar(float(limiar), os.environ.get('BANCO_LENTAS_MODO', 'desligado'),
+                        os.environ.get('BANCO_LENTAS_DIRETORIO'))
+    return True
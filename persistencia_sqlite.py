@@ -0,0 +1,509 @@
+"""Persistência do sistema bancário em SQLite.
+
+Clientes, contas e histórico de transações ficam num banco SQLite local em
+modo WAL. Todas as escritas passam por uma única conexão e são confirmadas
+em lote (um commit a cada N operações, ou ao descarregar/fechar); dentro de
+transacao_unica() as escritas de uma thread não são divididas entre commits. As
+leituras usam um pequeno pool de conexões somente leitura, que no WAL não
+bloqueiam o escritor nem são bloqueadas por ele. Os comandos SQL são
+constantes do módulo, então cada conexão os prepara uma única vez e depois
+os reaproveita do seu cache de statements.
+
+O histórico de cada conta é gravado entrada a entrada; a janela recente
+continua em memória e o restante é lido do banco sob demanda, pelo mesmo
+mecanismo de camada fria do armazenamento_historico.
+"""
+
+from contextlib import contextmanager
+from datetime import date
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+from armazenamento_historico import SegmentoFrio, chave_data
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    cpf TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    data_nascimento TEXT NOT NULL,
+    endereco TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contas (
+    agencia TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    cpf TEXT NOT NULL,
+    limite REAL NOT NULL,
+    limite_saques INTEGER NOT NULL,
+    saldo REAL NOT NULL,
+    saques_realizados INTEGER NOT NULL,
+    ultimo_fechamento TEXT,
+    PRIMARY KEY (agencia, numero)
+);
+CREATE INDEX IF NOT EXISTS contas_numero ON contas (numero);
+CREATE INDEX IF NOT EXISTS contas_cpf ON contas (cpf);
+CREATE TABLE IF NOT EXISTS historico (
+    agencia TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    sequencia INTEGER NOT NULL,
+    instante TEXT NOT NULL,
+    data TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    valor REAL NOT NULL,
+    dados TEXT,
+    PRIMARY KEY (agencia, numero, sequencia)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS historico_instante ON historico (agencia, numero, instante);
+CREATE TABLE IF NOT EXISTS mudancas (
+    sequencia INTEGER PRIMARY KEY,
+    agencia TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    sequencia_conta INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursores_feed (
+    nome TEXT PRIMARY KEY,
+    posicao INTEGER NOT NULL
+);
+"""
+
+SQL_SALVAR_CLIENTE = "INSERT OR REPLACE INTO clientes VALUES (?, ?, ?, ?)"
+SQL_SALVAR_CONTA = "INSERT OR REPLACE INTO contas VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_ATUALIZAR_CONTA = ("UPDATE contas SET saldo = ?, saques_realizados = ?, ultimo_fechamento = ? "
+                       "WHERE agencia = ? AND numero = ?")
+SQL_INSERIR_ENTRADA = "INSERT INTO historico VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_CLIENTES = "SELECT cpf, nome, data_nascimento, endereco FROM clientes"
+SQL_CONTAS = ("SELECT agencia, numero, cpf, limite, limite_saques, saldo, saques_realizados, ultimo_fechamento "
+              "FROM contas ORDER BY agencia, numero")
+SQL_CONTA = ("SELECT agencia, numero, cpf, limite, limite_saques, saldo, saques_realizados, ultimo_fechamento "
+             "FROM contas WHERE agencia = ? AND numero = ?")
+SQL_CLIENTE = "SELECT nome, data_nascimento, cpf, endereco FROM clientes WHERE cpf = ?"
+SQL_CONTAS_DO_CLIENTE = "SELECT agencia, numero FROM contas WHERE cpf = ? ORDER BY rowid"
+SQL_PAGINA_CONTAS = "SELECT rowid, agencia, numero FROM contas WHERE rowid > ? ORDER BY rowid LIMIT ?"
+SQL_PAGINA_CLIENTES = "SELECT rowid, cpf FROM clientes WHERE rowid > ? ORDER BY rowid LIMIT ?"
+SQL_CONTA_NA_POSICAO = "SELECT agencia, numero FROM contas ORDER BY rowid LIMIT 1 OFFSET ?"
+SQL_CLIENTE_NA_POSICAO = "SELECT cpf FROM clientes ORDER BY rowid LIMIT 1 OFFSET ?"
+SQL_CONTAR_CONTAS = "SELECT COUNT(*) FROM contas"
+SQL_CONTAR_CLIENTES = "SELECT COUNT(*) FROM clientes"
+SQL_CONTAR_HISTORICO = "SELECT COUNT(*) FROM historico"
+SQL_MAIORES_NUMEROS = "SELECT agencia, MAX(numero) FROM contas GROUP BY agencia"
+SQL_RESUMOS = ("SELECT c.agencia, c.numero, cl.nome, c.saldo FROM contas c JOIN clientes cl ON cl.cpf = c.cpf "
+               "ORDER BY c.rowid")
+SQL_RESUMOS_AGENCIA = ("SELECT c.agencia, c.numero, cl.nome, c.saldo FROM contas c JOIN clientes cl ON cl.cpf = c.cpf "
+                       "WHERE c.agencia = ? ORDER BY c.numero")
+SQL_RESUMO_AGENCIAS = ("SELECT c.agencia, COUNT(*), SUM(c.saldo), "
+                       "(SELECT COUNT(*) FROM historico h WHERE h.agencia = c.agencia) "
+                       "FROM contas c GROUP BY c.agencia")
+SQL_QUANTIDADE_HISTORICO = ("SELECT COUNT(*), MIN(instante), MAX(instante) FROM historico "
+                            "WHERE agencia = ? AND numero = ?")
+SQL_ENTRADAS_SEQUENCIA = ("SELECT data, tipo, valor, dados FROM historico "
+                          "WHERE agencia = ? AND numero = ? AND sequencia BETWEEN ? AND ? ORDER BY sequencia")
+SQL_ENTRADAS_PERIODO = ("SELECT data, tipo, valor, dados FROM historico "
+                        "WHERE agencia = ? AND numero = ? AND sequencia <= ? AND instante BETWEEN ? AND ? "
+                        "ORDER BY sequencia")
+SQL_CONTAS_EXTRATO = ("SELECT c.agencia, c.numero, cl.nome, c.saldo, c.saques_realizados, c.limite_saques "
+                      "FROM contas c JOIN clientes cl ON cl.cpf = c.cpf ORDER BY c.agencia, c.numero")
+SQL_ENTRADAS_CONTA = ("SELECT data, tipo, valor, dados FROM historico "
+                      "WHERE agencia = ? AND numero = ? AND instante BETWEEN ? AND ? ORDER BY sequencia")
+# Mesma regra de sinal de sinal_transacao(): Deposito, Juros e créditos entram, o resto sai
+SQL_DIVERGENCIAS_SALDO = ("SELECT c.agencia, c.numero, c.saldo, COALESCE(SUM(CASE "
+                          "WHEN h.tipo IN ('Deposito', 'Juros') OR json_extract(h.dados, '$.direcao') = 'credito' "
+                          "THEN h.valor ELSE -h.valor END), 0) AS calculado FROM contas c "
+                          "LEFT JOIN historico h ON h.agencia = c.agencia AND h.numero = c.numero "
+                          "GROUP BY c.agencia, c.numero HAVING ABS(calculado - c.saldo) > ? "
+                          "ORDER BY c.agencia, c.numero")
+SQL_INSERIR_MUDANCA = "INSERT INTO mudancas VALUES (?, ?, ?, ?)"
+SQL_ULTIMA_MUDANCA = "SELECT COALESCE(MAX(sequencia), 0) FROM mudancas"
+SQL_MUDANCAS = ("SELECT m.sequencia, m.agencia, m.numero, m.sequencia_conta, h.data, h.tipo, h.valor, h.dados "
+                "FROM mudancas m JOIN historico h ON h.agencia = m.agencia AND h.numero = m.numero "
+                "AND h.sequencia = m.sequencia_conta WHERE m.sequencia >= ? AND m.sequencia < ? "
+                "ORDER BY m.sequencia LIMIT ?")
+SQL_SALVAR_CURSOR = "INSERT OR REPLACE INTO cursores_feed VALUES (?, ?)"
+SQL_CURSOR = "SELECT posicao FROM cursores_feed WHERE nome = ?"
+
+_CAMPOS_FIXOS = ('data', 'tipo', 'valor')
+_escopo = threading.local()  # Bancos escritos dentro do transacao_unica() aberto nesta thread
+# Limites das chaves de instante ('AAAAMMDDHH:MM:SS') para consultas sem início ou fim
+_INSTANTE_MINIMO = ''
+_INSTANTE_MAXIMO = '~'
+
+
+@contextmanager
+def transacao_unica():
+    """Agrupa as escritas desta thread numa só transação por banco, confirmada no fim.
+
+    Enquanto o escopo está aberto, nem o commit a cada N operações nem um
+    confirmar() de outra thread dividem as escritas; escopos aninhados são
+    absorvidos pelo mais externo.
+    """
+    if getattr(_escopo, 'bancos', None) is not None:
+        yield
+        return
+    _escopo.bancos = bancos = []
+    try:
+        yield
+    finally:
+        _escopo.bancos = None
+        for banco in bancos:
+            banco._fechar_escopo()
+
+
+def _linha_entrada(conta, sequencia, entrada):
+    dados = {chave: valor for chave, valor in entrada.items() if chave not in _CAMPOS_FIXOS}
+    return (conta.agencia, conta.numero, sequencia, chave_data(entrada['data']), entrada['data'],
+            entrada['tipo'], entrada['valor'], json.dumps(dados, ensure_ascii=False) if dados else None)
+
+
+def _entrada(linha):
+    data, tipo, valor, dados = linha
+    entrada = {'tipo': tipo, 'valor': valor, 'data': data}
+    if dados:
+        entrada.update(json.loads(dados))
+    return entrada
+
+
+def _data_fechamento(conta):
+    data = getattr(conta, 'ultimo_fechamento', None)
+    return data.isoformat() if data is not None else None
+
+
+def linha_conta(linha):
+    """Linha de contas com o último fechamento como date (ou None)"""
+    *campos, ultimo_fechamento = linha
+    return (*campos, date.fromisoformat(ultimo_fechamento) if ultimo_fechamento else None)
+
+
+def conectar_leitura(caminho):
+    """Conexão somente leitura, para processos que leem o banco por conta própria"""
+    return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, cached_statements=64)
+
+
+def entradas_conta(conexao, agencia, numero, inicio=None, fim=None):
+    """Histórico completo de uma conta (entre as chaves inicio e fim, se informadas)"""
+    cursor = conexao.execute(SQL_ENTRADAS_CONTA, (agencia, numero, inicio or _INSTANTE_MINIMO,
+                                                  fim or _INSTANTE_MAXIMO))
+    return [_entrada(linha) for linha in cursor]
+
+
+class SegmentoSQLite(SegmentoFrio):
+    """Faixa de sequências do histórico de uma conta já fora da memória"""
+
+    def __init__(self, primeira, ultima, inicio, fim):
+        super().__init__(None, inicio, fim, ultima - primeira + 1)
+        self.primeira = primeira
+        self.ultima = ultima
+
+
+class CamadaSQLite:
+    """Camada fria do Historico de uma conta apoiada na tabela historico"""
+
+    def __init__(self, banco, agencia, numero):
+        self._banco = banco
+        self._agencia = agencia
+        self._numero = numero
+        self._segmentos = []
+        with banco.leitor() as conexao:
+            quantidade, inicio, fim = conexao.execute(SQL_QUANTIDADE_HISTORICO, (agencia, numero)).fetchone()
+        # Entradas que já estavam no banco (conta restaurada) começam fora da memória
+        if quantidade:
+            self._segmentos = [SegmentoSQLite(1, quantidade, inicio, fim)]
+        self._gravadas = quantidade
+        self._descarregadas = quantidade
+
+    @property
+    def segmentos(self):
+        return self._segmentos
+
+    @property
+    def quantidade(self):
+        return self._descarregadas
+
+    def ouvintes(self, conta):
+        """(ouvinte, em_lote) do Historico que gravam cada entrada confirmada"""
+        def _ouvinte(historico, entrada):
+            self._gravadas += 1
+            self._banco.gravar_entrada(conta, self._gravadas, entrada)
+
+        def _em_lote(historico, entradas):
+            self._banco.gravar_entradas(conta, self._gravadas + 1, entradas)
+            self._gravadas += len(entradas)
+        return _ouvinte, _em_lote
+
+    def gravar(self, entradas):
+        """As entradas já estão no banco: confirma o lote e marca a faixa como fria"""
+        self._banco.confirmar()  # Os leitores só enxergam o que foi confirmado
+        chaves = [chave_data(entrada['data']) for entrada in entradas]
+        segmento = SegmentoSQLite(self._descarregadas + 1, self._descarregadas + len(entradas),
+                                  min(chaves), max(chaves))
+        self._segmentos = self._segmentos + [segmento]
+        self._descarregadas += len(entradas)
+        return segmento
+
+    def ler(self, segmento):
+        with self._banco.leitor() as conexao:
+            linhas = conexao.execute(SQL_ENTRADAS_SEQUENCIA,
+                                     (self._agencia, self._numero, segmento.primeira, segmento.ultima)).fetchall()
+        return [_entrada(linha) for linha in linhas]
+
+    def entradas(self, inicio=None, fim=None, segmentos=None):
+        """Entradas frias entre as chaves inicio e fim, pelo índice de instante"""
+        segmentos = self._segmentos if segmentos is None else segmentos
+        if not segmentos:
+            return
+        parametros = (self._agencia, self._numero, segmentos[-1].ultima,
+                      inicio or _INSTANTE_MINIMO, fim or _INSTANTE_MAXIMO)
+        with self._banco.leitor() as conexao:
+            cursor = conexao.execute(SQL_ENTRADAS_PERIODO, parametros)
+            while True:
+                linhas = cursor.fetchmany(500)
+                if not linhas:
+                    return
+                for linha in linhas:
+                    yield _entrada(linha)
+
+
+class BancoSQLite:
+    """Banco SQLite (WAL) com um escritor em lotes e um pool de leitores"""
+
+    def __init__(self, caminho, tamanho_lote=100, leitores=4, janela_quente=1000):
+        self._caminho = caminho
+        self._tamanho_lote = tamanho_lote
+        self._janela_quente = janela_quente
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self._sem_escopos = threading.Condition(self._lock)
+        self._escopos = 0  # Threads com transacao_unica() aberto e escritas neste banco
+
+        # isolation_level=None: as transações são abertas e confirmadas explicitamente, em lote
+        self._escritor = sqlite3.connect(caminho, isolation_level=None, check_same_thread=False,
+                                         cached_statements=64)
+        self._escritor.execute("PRAGMA journal_mode=WAL")
+        self._escritor.execute("PRAGMA synchronous=NORMAL")  # Seguro no WAL: fsync só no checkpoint
+        self._escritor.executescript(ESQUEMA)
+        colunas = {linha[1] for linha in self._escritor.execute("PRAGMA table_info(contas)")}
+        if 'ultimo_fechamento' not in colunas:  # Banco criado antes do fechamento ser gravado
+            self._escritor.execute("ALTER TABLE contas ADD COLUMN ultimo_fechamento TEXT")
+
+        self._leitores = queue.Queue()
+        for _ in range(leitores):
+            conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False,
+                                      cached_statements=64)
+            self._leitores.put(conexao)
+
+    @property
+    def caminho(self):
+        return self._caminho
+
+    @property
+    def janela_quente(self):
+        return self._janela_quente
+
+    @contextmanager
+    def leitor(self):
+        """Empresta uma conexão de leitura do pool"""
+        conexao = self._leitores.get()
+        try:
+            yield conexao
+        finally:
+            self._leitores.put(conexao)
+
+    @contextmanager
+    def _lote(self, operacoes=1):
+        """Entrega o escritor dentro da transação do lote corrente, confirmando-a a cada N operações"""
+        with self._lock:
+            bancos = getattr(_escopo, 'bancos', None)
+            if bancos is not None and self not in bancos:
+                bancos.append(self)
+                self._escopos += 1
+            if not self._escritor.in_transaction:
+                self._escritor.execute("BEGIN")
+            yield self._escritor
+            self._pendentes += operacoes
+            if self._pendentes >= self._tamanho_lote and not self._escopos:
+                self._confirmar()
+
+    def _confirmar(self):
+        if self._escritor.in_transaction:
+            self._escritor.execute("COMMIT")
+        self._pendentes = 0
+
+    def _fechar_escopo(self):
+        with self._lock:
+            self._escopos -= 1
+            if not self._escopos:
+                self._confirmar()
+                self._sem_escopos.notify_all()
+
+    def confirmar(self):
+        """Confirma o lote pendente (esperando os transacao_unica() de outras threads terminarem)"""
+        with self._lock:
+            if self in (getattr(_escopo, 'bancos', None) or ()):
+                return  # O escopo desta thread confirma ao fechar
+            self._sem_escopos.wait_for(lambda: not self._escopos)
+            self._confirmar()
+
+    # Escrita
+
+    def salvar_clientes(self, clientes):
+        linhas = [(cliente.cpf, cliente.nome, cliente.data_nascimento, cliente.endereco) for cliente in clientes]
+        if linhas:
+            with self._lote(len(linhas)) as escritor:
+                escritor.executemany(SQL_SALVAR_CLIENTE, linhas)
+
+    def salvar_conta(self, conta):
+        with self._lote() as escritor:
+            escritor.execute(SQL_SALVAR_CONTA, (
+                conta.agencia, conta.numero, conta.cliente.cpf, conta.limite, conta.limite_saques,
+                conta.saldo, conta.saques_realizados, _data_fechamento(conta),
+            ))
+
+    def atualizar_conta(self, conta, evento):
+        """Ouvinte da conta: grava o saldo, o contador de saques e o último fechamento a cada evento"""
+        with self._lote() as escritor:
+            escritor.execute(SQL_ATUALIZAR_CONTA, (
+                conta.saldo, getattr(conta, 'saques_realizados', 0), _data_fechamento(conta),
+                conta.agencia, conta.numero,
+            ))
+
+    def atualizar_conta_lote(self, conta, eventos):
+        """Ouvinte em lote da conta: um só UPDATE com o estado depois de todos os eventos"""
+        self.atualizar_conta(conta, eventos[-1] if eventos else None)
+
+    def gravar_entrada(self, conta, sequencia, entrada):
+        """Grava uma entrada do histórico da conta"""
+        with self._lote() as escritor:
+            escritor.execute(SQL_INSERIR_ENTRADA, _linha_entrada(conta, sequencia, entrada))
+
+    def gravar_entradas(self, conta, primeira, entradas):
+        """Grava entradas consecutivas do histórico da conta, a partir da sequência primeira"""
+        linhas = [_linha_entrada(conta, sequencia, entrada) for sequencia, entrada in enumerate(entradas, primeira)]
+        if linhas:
+            with self._lote(len(linhas)) as escritor:
+                escritor.executemany(SQL_INSERIR_ENTRADA, linhas)
+
+    def gravar_mudanca(self, sequencia, conta, sequencia_conta):
+        """Liga a posição do feed de mudanças à entrada do histórico que ela publica"""
+        with self._lote() as escritor:
+            escritor.execute(SQL_INSERIR_MUDANCA, (sequencia, conta.agencia, conta.numero, sequencia_conta))
+
+    def gravar_mudancas(self, primeira, conta, primeira_conta, quantidade):
+        """Mudanças consecutivas do feed para entradas consecutivas do histórico da conta"""
+        linhas = [(primeira + deslocamento, conta.agencia, conta.numero, primeira_conta + deslocamento)
+                  for deslocamento in range(quantidade)]
+        if linhas:
+            with self._lote(len(linhas)) as escritor:
+                escritor.executemany(SQL_INSERIR_MUDANCA, linhas)
+
+    def salvar_cursor(self, nome, posicao):
+        """Posição confirmada de um assinante do feed, para retomar depois de reiniciar"""
+        with self._lote() as escritor:
+            escritor.execute(SQL_SALVAR_CURSOR, (nome, posicao))
+
+    def camada(self, conta):
+        return CamadaSQLite(self, conta.agencia, conta.numero)
+
+    # Leitura: os leitores só veem o que foi confirmado; quem precisa ler as escritas
+    # desta sessão chama confirmar() antes, sem forçar um COMMIT a cada consulta
+
+    def _consultar(self, sql, parametros=()):
+        with self.leitor() as conexao:
+            return conexao.execute(sql, parametros).fetchall()
+
+    def _valor(self, sql, parametros=()):
+        linhas = self._consultar(sql, parametros)
+        return linhas[0] if linhas else None
+
+    def clientes(self):
+        """Linhas (cpf, nome, data_nascimento, endereco) de todos os clientes"""
+        return self._consultar(SQL_CLIENTES)
+
+    def contas(self):
+        """Linhas (agencia, numero, cpf, limite, limite_saques, saldo, saques_realizados, ultimo_fechamento)"""
+        return [linha_conta(linha) for linha in self._consultar(SQL_CONTAS)]
+
+    def conta(self, agencia, numero):
+        linha = self._valor(SQL_CONTA, (agencia, numero))
+        return linha_conta(linha) if linha else None
+
+    def cliente(self, cpf):
+        """(nome, data_nascimento, cpf, endereco) do cliente, ou None"""
+        return self._valor(SQL_CLIENTE, (cpf,))
+
+    def contas_do_cliente(self, cpf):
+        return self._consultar(SQL_CONTAS_DO_CLIENTE, (cpf,))
+
+    def pagina_contas(self, depois_de, limite):
+        """Linhas (rowid, agencia, numero) a partir de um rowid"""
+        return self._consultar(SQL_PAGINA_CONTAS, (depois_de, limite))
+
+    def pagina_clientes(self, depois_de, limite):
+        """Linhas (rowid, cpf) a partir de um rowid"""
+        return self._consultar(SQL_PAGINA_CLIENTES, (depois_de, limite))
+
+    def conta_na_posicao(self, posicao):
+        return self._valor(SQL_CONTA_NA_POSICAO, (posicao,))
+
+    def cliente_na_posicao(self, posicao):
+        return self._valor(SQL_CLIENTE_NA_POSICAO, (posicao,))
+
+    def contar_contas(self):
+        return self._valor(SQL_CONTAR_CONTAS)[0]
+
+    def contar_clientes(self):
+        return self._valor(SQL_CONTAR_CLIENTES)[0]
+
+    def contar_historico(self):
+        return self._valor(SQL_CONTAR_HISTORICO)[0]
+
+    def maiores_numeros(self):
+        """{agência: maior número de conta usado}"""
+        return dict(self._consultar(SQL_MAIORES_NUMEROS))
+
+    def ultima_mudanca(self):
+        return self._valor(SQL_ULTIMA_MUDANCA)[0]
+
+    def mudancas(self, desde, ate, limite):
+        """Mudanças com sequência em [desde, ate): [(sequência, agência, número, sequência na conta, entrada)]"""
+        return [(sequencia, agencia, numero, sequencia_conta, _entrada(linha))
+                for sequencia, agencia, numero, sequencia_conta, *linha
+                in self._consultar(SQL_MUDANCAS, (desde, ate, limite))]
+
+    def cursor(self, nome):
+        linha = self._valor(SQL_CURSOR, (nome,))
+        return linha[0] if linha else None
+
+    def contas_extrato(self):
+        """Linhas (agencia, numero, titular, saldo, saques_realizados, limite_saques) de todas as contas"""
+        return self._consultar(SQL_CONTAS_EXTRATO)
+
+    def divergencias_saldo(self, tolerancia):
+        """Linhas (agencia, numero, saldo, soma do histórico) das contas que não batem, somadas no banco"""
+        return self._consultar(SQL_DIVERGENCIAS_SALDO, (tolerancia,))
+
+    def resumo_agencias(self):
+        """{agência: resumo} com os mesmos campos de Agencia.resumo, somados no banco"""
+        return {agencia: {'agencia': agencia, 'contas': contas, 'saldo_total': saldo_total, 'transacoes': transacoes}
+                for agencia, contas, saldo_total, transacoes in self._consultar(SQL_RESUMO_AGENCIAS)}
+
+    def resumos(self, agencia=None):
+        """Resumos das contas (como os do ContaIterador) lidos direto do banco, sem carregar contas"""
+        linhas = self._consultar(SQL_RESUMOS_AGENCIA, (agencia,)) if agencia else self._consultar(SQL_RESUMOS)
+        for agencia_conta, numero, titular, saldo in linhas:
+            yield {'agencia': agencia_conta, 'numero': numero, 'titular': titular,
+                   'saldo': saldo, 'tipo': 'ContaCorrente'}
+
+    def fechar(self):
+        self.confirmar()
+        while not self._leitores.empty():
+            self._leitores.get_nowait().close()
+        self._escritor.close()
+
+
+def persistencia_por_ambiente():
+    """Banco SQLite em BANCO_SQLITE, se definido (lote de commit em BANCO_SQLITE_LOTE)"""
+    caminho = os.environ.get('BANCO_SQLITE')
+    if not caminho:
+        return None
+    return BancoSQLite(caminho, tamanho_lote=int(os.environ.get('BANCO_SQLITE_LOTE', '100')))
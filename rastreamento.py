@@ -0,0 +1,213 @@
+"""Rastreamento (tracing) leve das operações do sistema bancário.
+
+Spans aninhados propagados por contextvars, amostragem decidida no span raiz
+e exportação para arquivo no formato Chrome trace-event (JSON Array), que
+abre direto em chrome://tracing, Perfetto ou speedscope.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+import atexit
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+
+_span_atual = ContextVar('span_atual', default=None)
+_NAO_AMOSTRADO = object()
+_ids_span = itertools.count(1)
+
+
+class _SpanNulo:
+    """Span que não registra nada (rastreamento desligado)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def definir(self, chave, valor):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _RaizNaoAmostrada(_SpanNulo):
+    """Marca o contexto como não amostrado para que os filhos também sejam ignorados"""
+
+    __slots__ = ('_token',)
+
+    def __enter__(self):
+        self._token = _span_atual.set(_NAO_AMOSTRADO)
+        return self
+
+    def __exit__(self, *exc):
+        _span_atual.reset(self._token)
+        return False
+
+
+class Span:
+    """Trecho cronometrado de uma operação, filho do span ativo no contexto"""
+
+    __slots__ = ('nome', 'atributos', 'trace_id', 'span_id', 'pai_id',
+                 'inicio', 'duracao', 'thread', '_token', '_rastreador')
+
+    def __init__(self, rastreador, nome, atributos, trace_id, pai_id):
+        self.nome = nome
+        self.atributos = atributos
+        self.trace_id = trace_id
+        self.span_id = next(_ids_span)
+        self.pai_id = pai_id
+        self.inicio = 0
+        self.duracao = 0
+        self.thread = threading.get_ident()
+        self._token = None
+        self._rastreador = rastreador
+
+    def definir(self, chave, valor):
+        """Adiciona um atributo ao span"""
+        self.atributos[chave] = valor
+
+    def __enter__(self):
+        self._token = _span_atual.set(self)
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        self.duracao = time.perf_counter_ns() - self.inicio
+        _span_atual.reset(self._token)
+        if tipo_exc is not None:
+            self.atributos['erro'] = tipo_exc.__name__
+        self._rastreador.finalizar(self)
+        return False
+
+
+class ExportadorChromeTrace:
+    """Grava spans em arquivo no formato Chrome trace-event, em lotes"""
+
+    def __init__(self, caminho, tamanho_lote=1000):
+        self._caminho = caminho
+        self._tamanho_lote = tamanho_lote
+        self._pendentes = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # O formato JSON Array aceita o arquivo sem o "]" final, o que permite anexar
+        with open(self._caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('[\n')
+        self._primeiro = True
+        atexit.register(self.descarregar)
+
+    @property
+    def caminho(self):
+        return self._caminho
+
+    def exportar(self, span):
+        """Enfileira um span finalizado, gravando quando o lote enche"""
+        evento = {
+            'name': span.nome,
+            'cat': 'banco',
+            'ph': 'X',
+            'ts': span.inicio / 1000,
+            'dur': span.duracao / 1000,
+            'pid': self._pid,
+            'tid': span.thread,
+            'args': dict(span.atributos, trace_id=f"{span.trace_id:016x}",
+                         span_id=span.span_id, pai_id=span.pai_id),
+        }
+        with self._lock:
+            self._pendentes.append(evento)
+            cheio = len(self._pendentes) >= self._tamanho_lote
+        if cheio:
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava no arquivo todos os eventos pendentes"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+            if not pendentes:
+                return
+            linhas = []
+            for evento in pendentes:
+                prefixo = '' if self._primeiro else ',\n'
+                self._primeiro = False
+                linhas.append(prefixo + json.dumps(evento, ensure_ascii=False, default=str))
+            with open(self._caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(''.join(linhas))
+
+
+class Rastreador:
+    """Cria spans aninhados e aplica a amostragem no span raiz"""
+
+    def __init__(self, taxa_amostragem=0.0, exportador=None):
+        self._taxa = taxa_amostragem
+        self._exportador = exportador
+
+    @property
+    def ativo(self):
+        return self._taxa > 0 and self._exportador is not None
+
+    def configurar(self, taxa_amostragem, exportador):
+        """Define a taxa de amostragem (0 a 1) e o destino dos spans"""
+        if self._exportador is not None and self._exportador is not exportador:
+            self._exportador.descarregar()
+        self._exportador = exportador
+        self._taxa = taxa_amostragem if exportador is not None else 0.0
+
+    def span(self, nome, **atributos):
+        """Retorna um gerenciador de contexto para um novo span"""
+        pai = _span_atual.get()
+        if pai is None:
+            if self._taxa <= 0:
+                return _SPAN_NULO
+            if self._taxa < 1 and random.random() >= self._taxa:
+                return _RaizNaoAmostrada()
+            return Span(self, nome, atributos, random.getrandbits(64), None)
+        if pai is _NAO_AMOSTRADO:
+            return _SPAN_NULO
+        return Span(self, nome, atributos, pai.trace_id, pai.span_id)
+
+    def finalizar(self, span):
+        exportador = self._exportador
+        if exportador is not None:
+            exportador.exportar(span)
+
+    def descarregar(self):
+        if self._exportador is not None:
+            self._exportador.descarregar()
+
+
+# Rastreador padrão, desligado até ser configurado
+rastreador = Rastreador()
+
+
+def configurar(caminho, taxa_amostragem=1.0, tamanho_lote=1000):
+    """Liga o rastreamento gravando em caminho com a taxa de amostragem dada"""
+    rastreador.configurar(taxa_amostragem, ExportadorChromeTrace(caminho, tamanho_lote))
+
+
+def configurar_por_ambiente():
+    """Liga o rastreamento se BANCO_TRACE_ARQUIVO estiver definido"""
+    caminho = os.environ.get('BANCO_TRACE_ARQUIVO')
+    if not caminho:
+        return False
+    taxa = float(os.environ.get('BANCO_TRACE_AMOSTRAGEM', '1.0'))
+    configurar(caminho, taxa)
+    return True
+
+
+def rastrear(func):
+    """Decorador que envolve a função em um span com seu nome qualificado"""
+    nome = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with rastreador.span(nome):
+            return func(*args, **kwargs)
+    return wrapper
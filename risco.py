@@ -0,0 +1,209 @@
+"""Estágio de risco (fraude/velocidade) no caminho dos débitos.
+
+Antes de efetivar um saque ou uma transferência, a conta pergunta ao
+EstagioRisco se a operação pode seguir. Cada conta guarda uma janela
+deslizante em baldes de tempo fixos (contagem e soma debitada) e a média e
+variância exponenciais do valor típico, então a memória por conta é
+constante. As regras são plugáveis e cronometradas uma a uma; se o
+orçamento de latência estoura, as restantes são puladas (a operação segue)
+e o estouro é contabilizado.
+"""
+
+import math
+import threading
+import time
+
+import metricas
+
+
+PERMITIR = 'permitir'
+SINALIZAR = 'sinalizar'
+BLOQUEAR = 'bloquear'
+
+
+class EstatisticasConta:
+    """Janela deslizante em baldes e média/variância exponencial dos valores de uma conta"""
+
+    def __init__(self, janela=60.0, baldes=12, alfa=0.1):
+        self._largura = janela / baldes
+        self._indices = [-1] * baldes  # Índice absoluto do balde que ocupa cada posição
+        self._contagens = [0] * baldes
+        self._somas = [0.0] * baldes
+        self._alfa = alfa
+        self.media = 0.0
+        self.variancia = 0.0
+        self.amostras = 0
+
+    def janela(self, agora):
+        """Retorna (contagem, soma) dos débitos ainda dentro da janela"""
+        minimo = int(agora // self._largura) - len(self._indices) + 1
+        contagem = 0
+        soma = 0.0
+        for indice, quantidade, total in zip(self._indices, self._contagens, self._somas):
+            if indice >= minimo:
+                contagem += quantidade
+                soma += total
+        return contagem, soma
+
+    def estado(self):
+        """Cópia do estado, para voltar a ele com restaurar() (ponto de salvamento de um lote)"""
+        return (list(self._indices), list(self._contagens), list(self._somas),
+                self.media, self.variancia, self.amostras)
+
+    def restaurar(self, estado):
+        indices, contagens, somas, self.media, self.variancia, self.amostras = estado
+        self._indices[:] = indices
+        self._contagens[:] = contagens
+        self._somas[:] = somas
+
+    def registrar(self, agora, valor):
+        indice = int(agora // self._largura)
+        posicao = indice % len(self._indices)
+        if self._indices[posicao] != indice:
+            self._indices[posicao] = indice
+            self._contagens[posicao] = 0
+            self._somas[posicao] = 0.0
+        self._contagens[posicao] += 1
+        self._somas[posicao] += valor
+
+        if self.amostras == 0:
+            self.media = valor
+        else:
+            diferenca = valor - self.media
+            self.media += self._alfa * diferenca
+            self.variancia = (1 - self._alfa) * (self.variancia + self._alfa * diferenca * diferenca)
+        self.amostras += 1
+
+
+class LimiteVelocidade:
+    """Bloqueia quando o total debitado na janela passaria do limite"""
+
+    nome = 'velocidade'
+
+    def __init__(self, limite=3000.0):
+        self.limite = limite
+
+    def __call__(self, valor, contagem, soma, estatisticas):
+        return BLOQUEAR if soma + valor > self.limite else None
+
+
+class LimiteRajada:
+    """Bloqueia quando há débitos demais dentro da janela"""
+
+    nome = 'rajada'
+
+    def __init__(self, limite=5):
+        self.limite = limite
+
+    def __call__(self, valor, contagem, soma, estatisticas):
+        return BLOQUEAR if contagem + 1 > self.limite else None
+
+
+class DesvioValor:
+    """Sinaliza valores muito acima do típico da conta"""
+
+    nome = 'desvio_valor'
+
+    def __init__(self, desvios=4.0, minimo_amostras=5):
+        self.desvios = desvios
+        self.minimo_amostras = minimo_amostras
+
+    def __call__(self, valor, contagem, soma, estatisticas):
+        if estatisticas.amostras < self.minimo_amostras:
+            return None
+        # Piso no desvio: contas com valores sempre iguais não sinalizam qualquer centavo a mais
+        desvio = max(math.sqrt(estatisticas.variancia), 0.1 * estatisticas.media, 1.0)
+        return SINALIZAR if valor > estatisticas.media + self.desvios * desvio else None
+
+
+class Decisao:
+    """Resultado da avaliação: ação final e as regras que dispararam"""
+
+    def __init__(self):
+        self.acao = PERMITIR
+        self.motivos = []
+
+    @property
+    def bloqueada(self):
+        return self.acao == BLOQUEAR
+
+
+class EstagioRisco:
+    """Avalia cada débito contra as regras antes da efetivação"""
+
+    def __init__(self, regras=None, janela=60.0, baldes=12, orcamento_ns=50_000,
+                 relogio=time.monotonic, registrar_metricas=True):
+        self._regras = list(regras) if regras is not None else [LimiteVelocidade(), LimiteRajada(), DesvioValor()]
+        self._janela = janela
+        self._baldes = baldes
+        self._orcamento_ns = orcamento_ns
+        self._relogio = relogio
+        self._estatisticas = {}
+        self._custos = {}  # regra -> [avaliações, nanossegundos somados]
+        self._estouros = 0
+        self._lock = threading.Lock()
+        self._registrar_metricas = registrar_metricas
+
+        if registrar_metricas:
+            metricas.registro.medidor('risco_orcamento_estourado', lambda estagio: estagio._estouros,
+                                      "Avaliações de risco que passaram do orçamento de latência", dono=self)
+        for regra in self._regras:
+            self._acompanhar(regra)
+
+    @property
+    def regras(self):
+        return self._regras
+
+    def adicionar_regra(self, regra):
+        """Acrescenta uma regra regra(valor, contagem, soma, estatisticas) -> ação ou None"""
+        self._acompanhar(regra)
+        self._regras.append(regra)
+
+    def _acompanhar(self, regra):
+        custo = self._custos.setdefault(regra.nome, [0, 0])
+        if self._registrar_metricas:
+            metricas.registro.medidor(f'risco_{regra.nome}_ns_medio',
+                                      lambda estagio: custo[1] / custo[0] if custo[0] else 0.0,
+                                      f"Custo médio da regra de risco {regra.nome}", dono=self)
+
+    def custos(self):
+        """Custo médio em nanossegundos de cada regra"""
+        return {nome: (total / quantidade if quantidade else 0.0)
+                for nome, (quantidade, total) in self._custos.items()}
+
+    def estatisticas(self, conta):
+        chave = (conta.agencia, conta.numero)
+        estatisticas = self._estatisticas.get(chave)
+        if estatisticas is None:
+            estatisticas = self._estatisticas.setdefault(chave, EstatisticasConta(self._janela, self._baldes))
+        return estatisticas
+
+    def avaliar(self, conta, operacao, valor):
+        """Avalia o débito (chamar com a conta travada); se não for bloqueado, entra na janela"""
+        inicio = time.perf_counter_ns()
+        agora = self._relogio()
+        estatisticas = self.estatisticas(conta)
+        contagem, soma = estatisticas.janela(agora)
+
+        decisao = Decisao()
+        for regra in self._regras:
+            antes = time.perf_counter_ns()
+            acao = regra(valor, contagem, soma, estatisticas)
+            depois = time.perf_counter_ns()
+            # Somas sem trava: sob concorrência pode perder uma amostra, o que basta para uma média
+            custo = self._custos[regra.nome]
+            custo[0] += 1
+            custo[1] += depois - antes
+            if acao:
+                decisao.motivos.append(regra.nome)
+                if acao == BLOQUEAR or decisao.acao == PERMITIR:
+                    decisao.acao = acao
+            if depois - inicio > self._orcamento_ns:
+                with self._lock:
+                    self._estouros += 1
+                break
+
+        if not decisao.bloqueada:
+            estatisticas.registrar(agora, valor)
+        metricas.registro.observar(f"risco_{operacao}", time.perf_counter_ns() - inicio, decisao.acao)
+        return decisao
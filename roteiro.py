@@ -0,0 +1,428 @@
+"""Modo não interativo do sistema bancário: roteiros de comandos e gravação de sessões.
+
+Um roteiro tem um comando por linha, com os argumentos separados por espaço
+(aspas como no shell) e comentários iniciados por '#':
+
+    cliente "Maria Souza" 01/02/1990 52998224725 "Rua A, 10 - Centro - Recife/PE"
+    conta 52998224725 0001
+    deposito 0001/1 500
+    saque 0001/1 100
+    transferencia 0001/1 0001/2 50
+    transacoes 0001/1 deposito:500 saque:100 transferencia:50:0001/2 0001/2=saque:20
+    extrato 0001/1
+    relatorio 0001/1 Saque 01/01/2025-31/12/2025
+    contas 0001
+    buscar "maria so" 1
+    lote carga/clientes.csv - s
+    fechamento 31/12/2025
+    extratos saida/extratos todos 01/12/2025-31/12/2025
+    agendar transferencia 0001/1 100 "05/01/2026 08:00" 30 12 0001/2
+    cancelar_agendamento 3
+    executar_agendamentos "05/02/2026 09:00"
+    metricas
+    memoria
+    lentas 50 amostragem
+    conciliar
+    mudancas 1 100
+
+Contas são AGENCIA/NUMERO, ou só NUMERO na agência padrão.
+
+transacoes aplica os itens como um lote, tudo ou nada; CONTA= antes de um
+item o aplica em outra conta.
+
+agendar recebe, depois da data, o intervalo em dias ('-' para não repetir),
+o número de vezes ('-' para repetir até cancelar) e, nas transferências, a
+conta de destino.
+
+lentas recebe o limiar em ms (0 desliga o detector) e o modo de captura.
+
+mudancas lê o feed de mudanças a partir de uma sequência, com o máximo de
+mudanças opcional.
+
+Cada comando gera uma linha JSON com o resultado, as mensagens que a
+operação imprimiria e a duração; não há menu nem pausas. O GravadorSessao
+escreve neste mesmo formato as operações de uma sessão interativa, para
+reproduzi-la depois.
+"""
+
+from contextlib import redirect_stdout
+from datetime import datetime
+import inspect
+import io
+import json
+import shlex
+import sys
+import time
+
+import metricas
+import operacoes_lentas
+import tarefas
+import validacao
+
+
+TIPOS_RELATORIO = {'todos': None, 'Deposito': 'Deposito', 'Saque': 'Saque', 'Transferencia': 'Transferencia'}
+
+
+class ErroRoteiro(ValueError):
+    """Comando malformado ou que referencia algo inexistente"""
+
+
+def referencia_conta(conta):
+    """Texto AGENCIA/NUMERO usado pelos roteiros para identificar uma conta"""
+    return f"{conta.agencia}/{conta.numero}"
+
+
+class GravadorSessao:
+    """Grava as operações de uma sessão interativa como um roteiro reproduzível"""
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'a', encoding='utf-8')
+        self._arquivo.write(f"# Sessão gravada em {datetime.now():%d/%m/%Y %H:%M:%S}\n")
+        self._arquivo.flush()
+
+    def gravar(self, comando, *argumentos):
+        # Uma linha por operação, já descarregada: a gravação sobrevive a uma queda do processo
+        self._arquivo.write(shlex.join([comando, *(str(argumento) for argumento in argumentos)]) + "\n")
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class ExecutorRoteiro:
+    """Executa roteiros contra um SistemaBancario e escreve um resultado JSON por comando"""
+
+    def __init__(self, sistema, saida=None, parar_no_erro=False):
+        self._sistema = sistema
+        self._saida = saida or sys.stdout
+        self._parar_no_erro = parar_no_erro
+        self._comandos = {
+            'cliente': self._cliente,
+            'conta': self._conta,
+            'deposito': self._deposito,
+            'saque': self._saque,
+            'transferencia': self._transferencia,
+            'transacoes': self._transacoes,
+            'extrato': self._extrato,
+            'relatorio': self._relatorio,
+            'contas': self._contas,
+            'buscar': self._buscar,
+            'lote': self._lote,
+            'fechamento': self._fechamento,
+            'extratos': self._extratos,
+            'agendar': self._agendar,
+            'cancelar_agendamento': self._cancelar_agendamento,
+            'executar_agendamentos': self._executar_agendamentos,
+            'metricas': self._metricas,
+            'memoria': self._memoria,
+            'lentas': self._lentas,
+            'conciliar': self._conciliar,
+            'mudancas': self._mudancas,
+        }
+
+    def executar(self, linhas):
+        """Executa as linhas em ordem; retorna (comandos executados, comandos com erro).
+
+        Uma operação recusada pelo banco (saldo insuficiente, limite...) tem ok False
+        mas não é erro: erro é comando malformado, que referencia algo inexistente ou
+        que falhou com uma exceção inesperada.
+        """
+        executados = erros = 0
+        for numero_linha, linha in enumerate(linhas, 1):
+            try:
+                partes = shlex.split(linha, comments=True)
+            except ValueError as erro:
+                partes = None
+                resultado = {'linha': numero_linha, 'comando': linha.strip(), 'ok': False, 'erro': str(erro)}
+            else:
+                if not partes:
+                    continue
+                resultado = self.executar_comando(partes[0], partes[1:])
+                resultado['linha'] = numero_linha
+
+            executados += 1
+            self._saida.write(json.dumps(resultado, ensure_ascii=False, default=str) + "\n")
+            if 'erro' in resultado:
+                erros += 1
+                if self._parar_no_erro:
+                    break
+        self._saida.flush()
+        return executados, erros
+
+    def executar_comando(self, comando, argumentos):
+        """Executa um comando e retorna o dicionário de resultado"""
+        resultado = {'comando': comando, 'ok': False}
+        funcao = self._comandos.get(comando)
+        if funcao is None:
+            resultado['erro'] = f"comando desconhecido: {comando}"
+            return resultado
+        try:
+            inspect.signature(funcao).bind(*argumentos)
+        except TypeError:
+            resultado['erro'] = f"argumentos inválidos para {comando}"
+            return resultado
+
+        mensagens = io.StringIO()
+        inicio = time.perf_counter_ns()
+        try:
+            # As operações continuam imprimindo as mensagens de sempre: aqui viram parte do resultado
+            with redirect_stdout(mensagens):
+                ok, dados = funcao(*argumentos)
+        except ErroRoteiro as erro:
+            resultado['erro'] = str(erro)
+        except Exception as erro:  # Falha inesperada: vira a linha de erro do comando e o roteiro segue
+            resultado['erro'] = f"{type(erro).__name__}: {erro}"
+        else:
+            resultado['ok'] = bool(ok)
+            if dados is not None:
+                resultado['dados'] = dados
+        resultado['ms'] = round((time.perf_counter_ns() - inicio) / 1e6, 3)
+        texto = [linha for linha in mensagens.getvalue().splitlines() if linha.strip()]
+        if texto:
+            resultado['mensagens'] = texto
+        return resultado
+
+    # Argumentos
+
+    def _buscar_conta(self, referencia):
+        from sistema_bancario_POO_decoradores_relatorios_limites import AGENCIA_PADRAO
+
+        agencia, _, numero = referencia.rpartition('/')
+        try:
+            numero = int(numero)
+        except ValueError:
+            raise ErroRoteiro(f"conta inválida: {referencia}") from None
+        conta = self._sistema.buscar_conta(agencia or AGENCIA_PADRAO, numero)
+        if conta is None:
+            raise ErroRoteiro(f"conta não encontrada: {referencia}")
+        return conta
+
+    def _valor(self, texto):
+        try:
+            return float(texto.replace(',', '.'))
+        except ValueError:
+            raise ErroRoteiro(f"valor inválido: {texto}") from None
+
+    def _data(self, texto):
+        try:
+            return datetime.strptime(texto, '%d/%m/%Y')
+        except ValueError:
+            raise ErroRoteiro(f"data inválida: {texto}") from None
+
+    # Comandos: cada um retorna (ok, dados)
+
+    def _cliente(self, nome, data_nascimento, cpf, endereco):
+        from sistema_bancario_POO_decoradores_relatorios_limites import PessoaFisicaCliente
+
+        cpf = validacao.normalizar_cpf(cpf)
+        if not nome.strip() or not endereco.strip():
+            raise ErroRoteiro("nome e endereço são obrigatórios")
+        if not validacao.data_valida(data_nascimento):
+            raise ErroRoteiro(f"data inválida: {data_nascimento}")
+        if not validacao.cpf_valido(cpf):
+            raise ErroRoteiro(f"CPF inválido: {cpf}")
+        if self._sistema.buscar_cliente_por_cpf(cpf):
+            return False, {'motivo': 'cpf_duplicado'}
+        self._sistema.adicionar_cliente(PessoaFisicaCliente(nome, data_nascimento, cpf, endereco))
+        return True, {'cpf': cpf}
+
+    def _conta(self, cpf, agencia=None):
+        from sistema_bancario_POO_decoradores_relatorios_limites import AGENCIA_PADRAO
+
+        cliente = self._sistema.buscar_cliente_por_cpf(validacao.normalizar_cpf(cpf))
+        if cliente is None:
+            raise ErroRoteiro(f"cliente não encontrado: {cpf}")
+        if cliente.contas:
+            return False, {'motivo': 'cliente_ja_possui_conta'}
+        agencia = agencia or AGENCIA_PADRAO
+        if agencia not in self._sistema.agencias:
+            raise ErroRoteiro(f"agência não encontrada: {agencia}")
+        conta = self._sistema.abrir_conta_corrente(cliente, agencia)
+        return True, {'conta': referencia_conta(conta)}
+
+    def _deposito(self, referencia, valor):
+        from sistema_bancario_POO_decoradores_relatorios_limites import Deposito
+
+        conta = self._buscar_conta(referencia)
+        ok = conta.cliente.realizar_transacao(conta, Deposito(self._valor(valor)))
+        return ok, {'saldo': conta.saldo}
+
+    def _saque(self, referencia, valor):
+        from sistema_bancario_POO_decoradores_relatorios_limites import Saque
+
+        conta = self._buscar_conta(referencia)
+        ok = conta.cliente.realizar_transacao(conta, Saque(self._valor(valor)))
+        return ok, {'saldo': conta.saldo}
+
+    def _transferencia(self, origem, destino, valor):
+        from sistema_bancario_POO_decoradores_relatorios_limites import Transferencia
+
+        conta_origem = self._buscar_conta(origem)
+        conta_destino = self._buscar_conta(destino)
+        ok = conta_origem.cliente.realizar_transacao(conta_origem, Transferencia(self._valor(valor), conta_destino))
+        return ok, {'saldo': conta_origem.saldo, 'saldo_destino': conta_destino.saldo}
+
+    def _transacoes(self, referencia, item, *itens):
+        from sistema_bancario_POO_decoradores_relatorios_limites import (Deposito, LoteTransacoes, Saque,
+                                                                         Transferencia)
+
+        conta = self._buscar_conta(referencia)
+        lote = []
+        for texto in (item,) + itens:
+            alvo, _, operacao = texto.rpartition('=')
+            tipo, _, argumentos = operacao.partition(':')
+            argumentos = argumentos.split(':')
+            if tipo in ('deposito', 'saque') and len(argumentos) == 1:
+                transacao = (Deposito if tipo == 'deposito' else Saque)(self._valor(argumentos[0]))
+            elif tipo == 'transferencia' and len(argumentos) == 2:
+                transacao = Transferencia(self._valor(argumentos[0]), self._buscar_conta(argumentos[1]))
+            else:
+                raise ErroRoteiro(f"item de lote inválido: {texto}")
+            lote.append((self._buscar_conta(alvo), transacao) if alvo else transacao)
+
+        transacoes = LoteTransacoes(lote)
+        ok = conta.cliente.realizar_transacao(conta, transacoes)
+        dados = {'itens': len(lote), 'saldo': conta.saldo}
+        if transacoes.recusa is not None:
+            indice, motivo = transacoes.recusa
+            dados['recusa'] = {'item': indice + 1, 'motivo': motivo}
+        return ok, dados
+
+    def _extrato(self, referencia):
+        saldo, saques_realizados, historico = self._sistema.dados_extrato(self._buscar_conta(referencia))
+        return True, {'saldo': saldo, 'saques_realizados': saques_realizados,
+                      'transacoes': [dict(transacao) for transacao in historico]}
+
+    def _relatorio(self, referencia, tipo='todos', periodo=None):
+        conta = self._buscar_conta(referencia)
+        if tipo not in TIPOS_RELATORIO:
+            raise ErroRoteiro(f"tipo de relatório inválido: {tipo}")
+        inicio = fim = None
+        if periodo:
+            inicio, _, fim = periodo.partition('-')
+            inicio, fim = self._data(inicio), self._data(fim).replace(hour=23, minute=59, second=59)
+        relatorio = self._sistema.relatorio_transacoes(conta, TIPOS_RELATORIO[tipo], inicio, fim)
+        return True, {'transacoes': [dict(transacao) for transacao in relatorio]}
+
+    def _contas(self, agencia=None):
+        particao = None
+        if agencia is not None:
+            particao = self._sistema.agencias.get(agencia)
+            if particao is None:
+                raise ErroRoteiro(f"agência não encontrada: {agencia}")
+        return True, {'contas': [dict(resumo) for resumo in self._sistema.resumos_contas(particao, modelo_leitura=True)]}
+
+    def _buscar(self, consulta, pagina='1'):
+        if not pagina.isdigit() or int(pagina) < 1:
+            raise ErroRoteiro(f"página inválida: {pagina}")
+        return True, self._sistema.indice_contas.buscar(consulta, int(pagina), sistema=self._sistema)
+
+    def _lote(self, caminho, caminho_rejeicoes='-', abrir_contas='n'):
+        from cadastro_lote import CadastroLote
+
+        try:
+            estatisticas = CadastroLote(self._sistema, abrir_contas=abrir_contas.lower() == 's').executar(
+                [caminho], None if caminho_rejeicoes == '-' else caminho_rejeicoes)
+        except OSError as erro:
+            raise ErroRoteiro(f"não foi possível ler o arquivo: {erro}") from None
+        return True, estatisticas
+
+    def _fechamento(self, data=None):
+        from fechamento_diario import FechamentoDiario, diretorio_por_ambiente
+
+        data_referencia = self._data(data).date() if data else None
+        return True, FechamentoDiario(self._sistema, data_referencia=data_referencia,
+                                      diretorio_checkpoint=diretorio_por_ambiente()).executar_paralelo()
+
+    def _extratos(self, diretorio, tipo='todos', periodo=None):
+        from extratos_lote import ExtratosLote
+
+        if tipo not in TIPOS_RELATORIO:
+            raise ErroRoteiro(f"tipo de relatório inválido: {tipo}")
+        inicio = fim = None
+        if periodo:
+            texto_inicio, _, texto_fim = periodo.partition('-')
+            inicio = self._data(texto_inicio)
+            fim = self._data(texto_fim).replace(hour=23, minute=59, second=59)
+        extratos = ExtratosLote(self._sistema, diretorio, tipo=TIPOS_RELATORIO[tipo], inicio=inicio, fim=fim,
+                                progresso=lambda feitas, total, vazao: None)
+        return True, extratos.executar()
+
+    def _instante(self, texto):
+        try:
+            return datetime.strptime(texto, '%d/%m/%Y %H:%M')
+        except ValueError:
+            raise ErroRoteiro(f"data e hora inválidas: {texto}") from None
+
+    def _agendar(self, tipo, referencia, valor, quando, dias='-', vezes='-', destino=None):
+        if not (dias == '-' or dias.isdigit()) or not (vezes == '-' or vezes.isdigit()):
+            raise ErroRoteiro("intervalo e vezes devem ser números ou '-'")
+        conta = self._buscar_conta(referencia)
+        conta_destino = self._buscar_conta(destino) if destino else None
+        try:
+            identificador = self._sistema.agendador.agendar(
+                conta, tipo, self._valor(valor), self._instante(quando).timestamp(),
+                int(dias) * 86400 if dias != '-' else None, int(vezes) if vezes != '-' else None, conta_destino)
+        except ValueError as erro:
+            raise ErroRoteiro(str(erro)) from None
+        return True, {'id': identificador}
+
+    def _cancelar_agendamento(self, identificador):
+        if not identificador.isdigit():
+            raise ErroRoteiro(f"agendamento inválido: {identificador}")
+        return self._sistema.agendador.cancelar(int(identificador)), None
+
+    def _executar_agendamentos(self, quando=None):
+        agora = self._instante(quando).timestamp() if quando else None
+        return True, self._sistema.agendador.executar_vencidos(agora)
+
+    def _metricas(self):
+        resumo = metricas.registro.resumo()
+        return True, {
+            'latencias': {operacao: {'contagem': dados['contagem'], 'maximo_ns': dados['maximo_ns'],
+                                     'quantis_ns': {str(q): valor for q, valor in dados['quantis_ns'].items()}}
+                          for operacao, dados in resumo['latencias'].items()},
+            'operacoes': {f"{operacao}[{resultado}]": total
+                          for (operacao, resultado), total in resumo['operacoes'].items()},
+            'rejeicoes': resumo['rejeicoes'],
+            'medidores': resumo['medidores'],
+        }
+
+    def _memoria(self):
+        import memoria
+
+        return True, {'pegada': memoria.pegada_por_tipo(self._sistema)}
+
+    def _lentas(self, limiar_ms, modo=None):
+        detector = operacoes_lentas.detector
+        limiar = self._valor(limiar_ms)
+        if modo is not None and modo not in operacoes_lentas.MODOS:
+            raise ErroRoteiro(f"modo inválido: {modo}")
+        detector.configurar(limiar or None, modo)
+        return True, {'limiar_ms': detector.limiar_ms, 'modo': detector.modo, 'capturas': detector.total}
+
+    def _conciliar(self):
+        # No roteiro a conciliação roda na hora, como tarefa avulsa (sem o pool do menu)
+        resultado = tarefas.conciliar_saldos(tarefas.Tarefa(0, 'conciliacao'), self._sistema)
+        return not resultado['divergencias'], resultado
+
+    def _mudancas(self, desde, maximo='100'):
+        feed = self._sistema.feed_transacoes
+        if feed is None:
+            raise ErroRoteiro("feed de mudanças desligado (defina BANCO_FEED)")
+        try:
+            lote, proxima = feed.ler_desde(int(desde), int(maximo))
+        except ValueError:
+            raise ErroRoteiro(f"posição inválida: {desde} {maximo}") from None
+        return True, {'mudancas': [mudanca.registro() for mudanca in lote], 'proxima': proxima}
+
+
+def executar_roteiro(sistema, caminho, saida=None, parar_no_erro=False):
+    """Executa o roteiro do arquivo ('-' para a entrada padrão); retorna True se não houve erro"""
+    executor = ExecutorRoteiro(sistema, saida, parar_no_erro)
+    if caminho == '-':
+        _, erros = executor.executar(sys.stdin)
+    else:
+        with open(caminho, encoding='utf-8') as arquivo:
+            _, erros = executor.executar(arquivo)
+    return erros == 0
@@ -1,7 +1,35 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import wait
+from contextlib import contextmanager
 from datetime import datetime
-import re
+import itertools
+import os
+import threading
+import time
 from functools import wraps
+import weakref
+from types import MappingProxyType
+
+import eventos
+import metricas
+from agendamentos import Agendador, limite_atrasadas_por_ambiente
+import rastreamento
+import tarefas
+import validacao
+from busca_contas import IndiceContas
+from feed_transacoes import feed_por_ambiente
+from armazenamento_historico import (aguardar_descargas, armazenamento_por_ambiente, chave_data, chave_datetime,
+                                     descarregar_em_segundo_plano)
+from modelo_leitura import ModeloLeitura
+import operacoes_lentas
+from persistencia_sqlite import persistencia_por_ambiente, transacao_unica
+from risco import EstagioRisco
+
+
+AGENCIA_PADRAO = "0001"
+CONTAS_POR_PAGINA = 20  # Resultados por página na busca de contas
+LIMIAR_SEGUNDO_PLANO = 5000  # Listagens e relatórios acima disso podem rodar como tarefa
+TIPOS_FORA_DO_LIMITE = frozenset(('Juros', 'Tarifa'))  # Lançamentos do banco, não do cliente
 
 
 # DECORADOR DE LOG
@@ -11,12 +39,64 @@ def log_operacao(func):
     def wrapper(*args, **kwargs):
         data_hora = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         print(f"📝 [LOG] {data_hora} - Executando: {func.__name__}")
-        resultado = func(*args, **kwargs)
+        inicio = time.perf_counter_ns()
+        try:
+            with rastreamento.rastreador.span(func.__qualname__), \
+                    operacoes_lentas.detector.monitorar(func.__qualname__, args, kwargs):
+                resultado = func(*args, **kwargs)
+        except Exception:
+            metricas.registro.observar(func.__name__, time.perf_counter_ns() - inicio, 'erro')
+            raise
+        metricas.registro.observar(func.__name__, time.perf_counter_ns() - inicio,
+                                   'rejeitado' if resultado is False else 'sucesso')
         print(f"📝 [LOG] {data_hora} - Finalizado: {func.__name__}")
         return resultado
     return wrapper
 
 
+_travas = threading.local()  # Quantos travar_contas a thread corrente tem abertos
+
+
+@contextmanager
+def travar_contas(*contas, entradas=1):
+    """Adquire os locks das contas sempre na mesma ordem (agência, número), evitando deadlock.
+    
+    Antes do primeiro lock da thread, chama as esperas inscritas nas contas (a backpressure
+    do feed) para as entradas que a operação vai gerar: quem espera não segura conta nenhuma.
+    """
+    # Pela chave, não pela identidade: um proxy e a conta que ele carregou são a mesma conta
+    unicas = {(conta.agencia, conta.numero): conta for conta in contas}.values()
+    ordenadas = sorted(unicas, key=lambda conta: (conta.agencia, conta.numero))
+    profundidade = getattr(_travas, 'profundidade', 0)
+    if not profundidade:
+        for espera in {espera for conta in ordenadas for espera in conta.esperas}:
+            espera(entradas)
+    # Sem ExitStack: um lote trava milhares de contas e o callback por lock pesa
+    travados = []
+    _travas.profundidade = profundidade + 1
+    try:
+        for conta in ordenadas:
+            conta.lock.acquire()
+            travados.append(conta.lock)
+        yield
+    finally:
+        for lock in reversed(travados):
+            lock.release()
+        _travas.profundidade = profundidade
+
+
+def conta_real(conta):
+    """A conta por trás de um proxy de conta preguiçosa (carregando-a), ou a própria conta"""
+    return conta._real() if hasattr(type(conta), '_real') else conta
+
+
+def sinal_transacao(transacao):
+    """Retorna o sinal de uma entrada do histórico ('+' entra na conta, '-' sai)"""
+    if transacao['tipo'] in ('Deposito', 'Juros') or transacao.get('direcao') == 'credito':
+        return '+'
+    return '-'
+
+
 class Transacao(ABC):
     """Interface para transações bancárias"""
     
@@ -36,11 +116,14 @@ class Deposito(Transacao):
     def valor(self):
         return self._valor
     
+    @rastreamento.rastrear
     def registrar(self, conta):
         """Registra o depósito na conta"""
-        sucesso = conta.depositar(self._valor)
-        if sucesso:
-            conta.historico.adicionar_transacao(self)
+        with travar_contas(conta):
+            sucesso = conta.depositar(self._valor)
+            if sucesso:
+                conta.historico.adicionar_transacao(self)
+        return sucesso
 
 
 class Saque(Transacao):
@@ -53,53 +136,528 @@ class Saque(Transacao):
     def valor(self):
         return self._valor
     
+    @rastreamento.rastrear
     def registrar(self, conta):
         """Registra o saque na conta"""
-        sucesso = conta.sacar(self._valor)
-        if sucesso:
-            conta.historico.adicionar_transacao(self)
+        with travar_contas(conta):
+            sucesso = conta.sacar(self._valor)
+            if sucesso:
+                conta.historico.adicionar_transacao(self)
+        return sucesso
 
 
-class Historico:
-    """Classe para armazenar o histórico de transações"""
+class Transferencia(Transacao):
+    """Classe para transferências atômicas entre duas contas"""
+    
+    _sequencia = itertools.count(1)
+    
+    def __init__(self, valor, conta_destino, quantidade=1):
+        self._valor = valor
+        self._conta_destino = conta_destino
+        self._quantidade = quantidade  # Transferências agrupadas por uma liquidação
+        self._id = next(Transferencia._sequencia)
+    
+    @property
+    def valor(self):
+        return self._valor
+    
+    @property
+    def conta_destino(self):
+        return self._conta_destino
+    
+    @property
+    def quantidade(self):
+        return self._quantidade
+    
+    @property
+    def id(self):
+        return self._id
+    
+    @rastreamento.rastrear
+    def registrar(self, conta):
+        """Debita a origem, credita o destino e registra as duas pontas de uma só vez"""
+        with travar_contas(conta, self._conta_destino, entradas=2):
+            sucesso = conta.transferir(self._valor, self._conta_destino)
+            if sucesso:
+                conta.historico.adicionar_transferencia(self, 'debito', self._conta_destino)
+                self._conta_destino.historico.adicionar_transferencia(self, 'credito', conta)
+        return sucesso
+
+
+class _ContaNoLote:
+    """Ponto de salvamento e alterações pendentes de uma conta durante um lote"""
+    
+    __slots__ = ('conta', 'saldo', 'saques', 'risco', 'hoje', 'eventos', 'entradas')
+    
+    def __init__(self, conta, agora):
+        self.conta = conta
+        self.saldo = conta._saldo
+        self.saques = getattr(conta, '_saques_realizados', None)
+        # A janela de risco também volta: débitos de um lote recusado não contam para os próximos
+        estagio = conta.estagio_risco
+        if estagio is not None:
+            estatisticas = estagio.estatisticas(conta)
+            self.risco = (estatisticas, estatisticas.estado())
+        else:
+            self.risco = None
+        visao = conta.historico.visao()
+        self.hoje = visao.contar_do_dia(agora) if len(visao) else 0
+        self.eventos = []
+        self.entradas = []
+    
+    def aplicar(self, tipo, valor, entrada, **dados):
+        evento = eventos.Evento(tipo, self.conta.agencia, self.conta.numero, valor, dados)
+        eventos.aplicar_evento(self.conta, evento)
+        self.eventos.append(evento)
+        self.entradas.append(entrada)
+        self.hoje += 1
+    
+    def desfazer(self):
+        """Volta ao ponto de salvamento: estado de antes do lote, nada pendente"""
+        self.conta._saldo = self.saldo
+        if self.saques is not None:
+            self.conta._saques_realizados = self.saques
+        if self.risco is not None:
+            estatisticas, estado = self.risco
+            estatisticas.restaurar(estado)
+        self.eventos.clear()
+        self.entradas.clear()
+    
+    def publicar(self):
+        self.conta._publicar_eventos(self.eventos)
+        if self.entradas:
+            self.conta.historico.estender(self.entradas)
+
+
+class LoteTransacoes(Transacao):
+    """Depósitos, saques e transferências de uma ou mais contas aplicados como uma só transação.
+    
+    Os itens são transações (na conta passada a registrar) ou pares (conta, transação).
+    Com todas as contas travadas, uma única passada valida cada item e o aplica ao
+    estado em memória; a primeira recusa volta todas as contas ao ponto de salvamento
+    e nada é gravado. Aprovado o lote, os eventos são publicados e cada histórico
+    recebe as suas entradas num único estender, tudo numa só transação do banco
+    (se houver), e os ouvintes com caminho em lote gravam cada conta de uma vez. O estágio de risco avalia os débitos
+    durante a passada; numa recusa, a janela de risco de cada conta também volta ao ponto de salvamento.
+    """
+    
+    def __init__(self, itens):
+        self._itens = list(itens)
+        self._recusa = None  # (índice do item, motivo) da última recusa
+    
+    @property
+    def itens(self):
+        return self._itens
+    
+    @property
+    def recusa(self):
+        return self._recusa
+    
+    @property
+    def valor(self):
+        return sum((item[1] if isinstance(item, tuple) else item).valor for item in self._itens)
+    
+    def _resolver(self, conta):
+        itens = []
+        for item in self._itens:
+            conta_item, transacao = item if isinstance(item, tuple) else (conta, item)
+            if not isinstance(transacao, (Deposito, Saque, Transferencia)):
+                raise TypeError(f"Transação não suportada em lote: {transacao.__class__.__name__}")
+            itens.append((conta_item, transacao))
+        return itens
+    
+    @rastreamento.rastrear
+    def registrar(self, conta):
+        """Aplica todos os itens ou nenhum; retorna False (e guarda a recusa) se algum for recusado"""
+        itens = self._resolver(conta)
+        contas = [conta_item for conta_item, _ in itens]
+        contas += [transacao.conta_destino for _, transacao in itens if isinstance(transacao, Transferencia)]
+        self._recusa = None
+        
+        entradas = len(itens) + sum(isinstance(transacao, Transferencia) for _, transacao in itens)
+        with travar_contas(*contas, entradas=entradas):
+            pendentes = {}
+            agora = datetime.now()
+            data = agora.strftime('%d/%m/%Y %H:%M:%S')
+            try:
+                for indice, (conta_item, transacao) in enumerate(itens):
+                    motivo = self._aplicar_item(pendentes, conta_item, transacao, agora, data)
+                    if motivo is not None:
+                        for pendente in pendentes.values():
+                            pendente.desfazer()
+                        self._recusa = (indice, motivo)
+                        print(f"❌ Lote recusado no item {indice + 1} ({transacao.__class__.__name__} "
+                              f"de R$ {transacao.valor:.2f}): {motivo}. Nenhuma transação foi aplicada.")
+                        return False
+            except BaseException:
+                for pendente in pendentes.values():
+                    pendente.desfazer()
+                raise
+            
+            # Uma só transação no banco: o commit a cada N operações não divide o lote
+            with transacao_unica():
+                for pendente in pendentes.values():
+                    pendente.publicar()
+        print(f"✅ Lote de {len(itens)} transações aplicado em {len(pendentes)} contas")
+        return True
+    
+    @staticmethod
+    def _pendente(pendentes, conta, agora):
+        chave = (conta.agencia, conta.numero)
+        pendente = pendentes.get(chave)
+        if pendente is None:
+            # Um proxy de conta preguiçosa é alterado através da conta que ele carregou
+            pendente = pendentes[chave] = _ContaNoLote(conta_real(conta), agora)
+        return pendente
+    
+    def _aplicar_item(self, pendentes, conta, transacao, agora, data):
+        """Valida e aplica um item ao estado em memória; retorna o motivo da recusa, se houver"""
+        origem = self._pendente(pendentes, conta, agora)
+        conta = origem.conta
+        operacao = transacao.__class__.__name__
+        valor = transacao.valor
+        
+        if isinstance(transacao, Transferencia):
+            destino = transacao.conta_destino
+            if (destino.agencia, destino.numero) == (conta.agencia, conta.numero):
+                conta._rejeitar('mesma_conta', operacao, valor)
+                return 'mesma_conta'
+        motivo = conta._validar_lote(operacao, valor, origem.hoje)
+        if motivo is not None:
+            conta._rejeitar(motivo, operacao, valor)
+            return motivo
+        if not isinstance(transacao, Deposito) and not conta._avaliar_risco(operacao, valor):
+            return 'risco'
+        
+        if isinstance(transacao, Deposito):
+            origem.aplicar(eventos.DEPOSITO, valor, Historico.entrada_transacao(transacao, data))
+        elif isinstance(transacao, Saque):
+            origem.aplicar(eventos.SAQUE, valor, Historico.entrada_transacao(transacao, data))
+        else:
+            destino = self._pendente(pendentes, transacao.conta_destino, agora)
+            origem.aplicar(eventos.TRANSFERENCIA_ENVIADA, valor,
+                           Historico.entrada_transferencia(transacao, 'debito', destino.conta, data),
+                           contrapartida=f"{destino.conta.agencia}/{destino.conta.numero}")
+            destino.aplicar(eventos.TRANSFERENCIA_RECEBIDA, valor,
+                            Historico.entrada_transferencia(transacao, 'credito', conta, data),
+                            contrapartida=f"{conta.agencia}/{conta.numero}")
+        return None
+
+
+class LiquidacaoTransferencias:
+    """Acumula transferências e liquida apenas o valor líquido entre cada par de contas"""
     
     def __init__(self):
-        self._transacoes = []
+        self._pendentes = {}
+        self._lock = threading.Lock()
     
     @property
-    def transacoes(self):
-        return self._transacoes
+    def pendentes(self):
+        return len(self._pendentes)
     
-    def adicionar_transacao(self, transacao):
-        """Adiciona uma transação ao histórico"""
-        self._transacoes.append({
-            'tipo': transacao.__class__.__name__,
-            'valor': transacao.valor,
-            'data': datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-        })
+    def adicionar(self, conta_origem, conta_destino, valor):
+        """Agenda uma transferência para a próxima liquidação"""
+        if conta_origem is conta_destino:
+            print("❌ A conta de destino deve ser diferente da conta de origem.")
+            return False
+        
+        if valor <= 0:
+            print("❌ Valor inválido! O valor deve ser positivo.")
+            return False
+        
+        # O par é sempre guardado na ordem (agência, número) para somar os dois sentidos
+        if (conta_origem.agencia, conta_origem.numero) <= (conta_destino.agencia, conta_destino.numero):
+            par, sinal = (conta_origem, conta_destino), 1
+        else:
+            par, sinal = (conta_destino, conta_origem), -1
+        
+        with self._lock:
+            liquido, quantidade = self._pendentes.get(par, (0.0, 0))
+            self._pendentes[par] = (liquido + sinal * valor, quantidade + 1)
+        return True
     
-    def contar_transacoes_hoje(self):
-        """Conta quantas transações foram feitas hoje"""
-        hoje = datetime.now().strftime('%d/%m/%Y')
+    def liquidar(self):
+        """Aplica uma transferência líquida por par, com todas as contas travadas"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        
+        contas = [conta for par in pendentes for conta in par]
+        resultados = []
+        with travar_contas(*contas, entradas=len(contas)):
+            for (conta_a, conta_b), (liquido, quantidade) in pendentes.items():
+                liquido = round(liquido, 2)
+                if liquido == 0:
+                    resultados.append({'origem': conta_a, 'destino': conta_b, 'valor': 0.0,
+                                       'quantidade': quantidade, 'sucesso': True})
+                    continue
+                
+                origem, destino = (conta_a, conta_b) if liquido > 0 else (conta_b, conta_a)
+                transferencia = Transferencia(abs(liquido), destino, quantidade)
+                sucesso = origem.cliente.realizar_transacao(origem, transferencia)
+                resultados.append({'origem': origem, 'destino': destino, 'valor': abs(liquido),
+                                   'quantidade': quantidade, 'sucesso': bool(sucesso)})
+        return resultados
+
+
+class VisaoHistorico:
+    """Visão somente leitura do histórico num instante (MVCC).
+    
+    Guarda as referências à versão corrente (segmentos frios e lista quente) e
+    o comprimento da lista quente no momento da criação. A lista só cresce e o
+    descarregamento troca a lista em vez de alterá-la, então a visão continua
+    consistente sem copiar nada e sem travar quem escreve.
+    """
+    
+    def __init__(self, segmentos, quentes, camada_fria=None):
+        self._segmentos = segmentos
+        self._quentes = quentes
+        self._tamanho_quente = len(quentes)
+        self._camada_fria = camada_fria
+        self._frias = sum(segmento.quantidade for segmento in segmentos)
+    
+    @property
+    def versao(self):
+        """Quantidade de entradas confirmadas quando a visão foi criada"""
+        return self._frias + self._tamanho_quente
+    
+    def __len__(self):
+        return self.versao
+    
+    def __iter__(self):
+        return self.periodo()
+    
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return list(self)[indice]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice fora da visão do histórico")
+        if indice >= self._frias:
+            return MappingProxyType(self._quentes[indice - self._frias])
+        for segmento in self._segmentos:
+            if indice < segmento.quantidade:
+                return MappingProxyType(self._camada_fria.ler(segmento)[indice])
+            indice -= segmento.quantidade
+    
+    def _quentes_visiveis(self):
+        return itertools.islice(self._quentes, self._tamanho_quente)
+    
+    def periodo(self, inicio=None, fim=None):
+        """Gerador das entradas entre inicio e fim (datetime), abrindo só os segmentos frios do intervalo"""
+        inicio = chave_datetime(inicio) if inicio else None
+        fim = chave_datetime(fim) if fim else None
+        if self._segmentos:
+            yield from map(MappingProxyType, self._camada_fria.entradas(inicio, fim, self._segmentos))
+        for transacao in self._quentes_visiveis():
+            if inicio is not None or fim is not None:
+                chave = chave_data(transacao['data'])
+                if (inicio is not None and chave < inicio) or (fim is not None and chave > fim):
+                    continue
+            yield MappingProxyType(transacao)
+    
+    def contar_do_dia(self, dia):
+        """Conta as transações do dia (datetime) na visão; juros e tarifas do fechamento não entram"""
+        prefixo = dia.strftime('%d/%m/%Y')
         count = 0
-        for transacao in self._transacoes:
-            if transacao['data'].startswith(hoje):
+        if self._segmentos:
+            inicio = dia.replace(hour=0, minute=0, second=0, microsecond=0)
+            fim = inicio.replace(hour=23, minute=59, second=59)
+            count += sum(1 for transacao in self._camada_fria.entradas(chave_datetime(inicio), chave_datetime(fim),
+                                                                      self._segmentos)
+                         if transacao['tipo'] not in TIPOS_FORA_DO_LIMITE)
+        for transacao in self._quentes_visiveis():
+            if transacao['data'].startswith(prefixo) and transacao['tipo'] not in TIPOS_FORA_DO_LIMITE:
                 count += 1
         return count
     
-    def gerar_relatorio(self, tipo_filtro=None):
-        """Gerador que filtra transações por tipo"""
-        for transacao in self._transacoes:
+    def gerar_relatorio(self, tipo_filtro=None, inicio=None, fim=None):
+        """Gerador que filtra transações por tipo e, opcionalmente, por período"""
+        for transacao in self.periodo(inicio, fim):
             if tipo_filtro is None or transacao['tipo'] == tipo_filtro:
                 yield transacao
 
 
+class Historico:
+    """Classe para armazenar o histórico de transações"""
+    
+    def __init__(self):
+        # Versão corrente: (segmentos frios, lista quente), trocada de uma só vez ao descarregar
+        self._camadas = ([], [])
+        self._ouvintes = []
+        self._camada_fria = None  # Entradas antigas descarregadas em disco, se configurado
+        self._janela_quente = None
+        self._descarga = None  # (quantidade, Future do segmento) da descarga em segundo plano
+    
+    @property
+    def transacoes(self):
+        """Visão somente leitura e consistente de todas as entradas"""
+        return self.visao()
+    
+    @property
+    def camada_fria(self):
+        return self._camada_fria
+    
+    def visao(self):
+        """Retorna uma VisaoHistorico do instante atual (barata: não copia entradas)"""
+        segmentos, quentes = self._camadas
+        return VisaoHistorico(segmentos, quentes, self._camada_fria)
+    
+    def __len__(self):
+        return len(self.visao())
+    
+    def usar_camada_fria(self, camada, janela_quente=1000):
+        """Mantém em memória só as últimas janela_quente entradas; as demais vão para a camada"""
+        self._camada_fria = camada
+        self._janela_quente = janela_quente
+        segmentos, quentes = self._camadas
+        # A camada pode já trazer entradas gravadas antes (conta restaurada do banco)
+        self._camadas = (list(camada.segmentos) + segmentos, quentes)
+        self._descarregar_se_cheio()
+    
+    def descarregar(self):
+        """Move para a camada fria, já, tudo o que passa da janela quente (espera a descarga pendente)"""
+        if self._descarga is not None:
+            wait([self._descarga[1]])
+            self._trocar_descarga()
+        segmentos, quentes = self._camadas
+        excedente = len(quentes) - (self._janela_quente or 0)
+        if self._camada_fria is None or excedente <= 0:
+            return 0
+        segmento = self._camada_fria.gravar(quentes[:excedente])
+        # Nova versão; visões já criadas continuam lendo a lista e os segmentos antigos
+        self._camadas = (segmentos + [segmento], quentes[excedente:])
+        return excedente
+    
+    def _trocar_descarga(self):
+        """Troca para a versão com o segmento gravado em segundo plano, se já ficou pronto"""
+        quantidade, futuro = self._descarga
+        if not futuro.done():
+            return
+        self._descarga = None
+        try:
+            segmento = futuro.result()
+        except Exception as erro:  # As entradas continuam quentes; a próxima descarga tenta de novo
+            print(f"⚠️ Falha ao descarregar o histórico: {erro}")
+            return
+        # Só houve acréscimos desde o agendamento: as quantidade primeiras quentes são as gravadas
+        segmentos, quentes = self._camadas
+        self._camadas = (segmentos + [segmento], quentes[quantidade:])
+    
+    def _descarregar_se_cheio(self):
+        # Descarrega quando a memória chega ao dobro da janela: um segmento por janela, gravado
+        # em segundo plano para que a compressão e a escrita não fiquem sob o lock da conta
+        if self._descarga is not None:
+            self._trocar_descarga()
+        if (self._camada_fria is not None and self._descarga is None
+                and len(self._camadas[1]) >= 2 * self._janela_quente):
+            quentes = self._camadas[1]
+            quantidade = len(quentes) - self._janela_quente
+            self._descarga = (quantidade, descarregar_em_segundo_plano(self._camada_fria.gravar,
+                                                                       quentes[:quantidade]))
+    
+    def inscrever(self, ouvinte, em_lote=None):
+        """Inscreve ouvinte(historico, entrada), chamado a cada entrada confirmada.
+        
+        em_lote(historico, entradas), se informado, recebe de uma vez as entradas de um estender.
+        """
+        self._ouvintes.append((ouvinte, em_lote))
+    
+    def _confirmar(self, entrada):
+        self._camadas[1].append(entrada)
+        for ouvinte, _ in self._ouvintes:
+            ouvinte(self, entrada)
+        self._descarregar_se_cheio()
+    
+    def estender(self, entradas):
+        """Adiciona várias entradas já montadas de uma só vez"""
+        self._camadas[1].extend(entradas)
+        for ouvinte, em_lote in self._ouvintes:
+            if em_lote is not None:
+                em_lote(self, entradas)
+                continue
+            for entrada in entradas:
+                ouvinte(self, entrada)
+        self._descarregar_se_cheio()
+    
+    @staticmethod
+    def entrada_transacao(transacao, data):
+        """Monta a entrada de um depósito ou saque (data já formatada)"""
+        return {'tipo': transacao.__class__.__name__, 'valor': transacao.valor, 'data': data}
+    
+    @staticmethod
+    def entrada_transferencia(transferencia, direcao, conta_contrapartida, data):
+        """Monta a entrada de uma ponta de transferência (data já formatada)"""
+        return {
+            'tipo': transferencia.__class__.__name__,
+            'valor': transferencia.valor,
+            'data': data,
+            'id_transferencia': transferencia.id,
+            'direcao': direcao,
+            'contrapartida': f"{conta_contrapartida.agencia}/{conta_contrapartida.numero}",
+            'quantidade': transferencia.quantidade
+        }
+    
+    @rastreamento.rastrear
+    def adicionar_transacao(self, transacao, data=None):
+        """Adiciona uma transação ao histórico (data padrão: agora)"""
+        self._confirmar(self.entrada_transacao(transacao, (data or datetime.now()).strftime('%d/%m/%Y %H:%M:%S')))
+    
+    @rastreamento.rastrear
+    def adicionar_transferencia(self, transferencia, direcao, conta_contrapartida, data=None):
+        """Adiciona uma ponta de transferência, ligada à outra pelo id"""
+        self._confirmar(self.entrada_transferencia(transferencia, direcao, conta_contrapartida,
+                                                   (data or datetime.now()).strftime('%d/%m/%Y %H:%M:%S')))
+    
+    def transacoes_periodo(self, inicio=None, fim=None):
+        """Gerador das entradas entre inicio e fim (datetime), nas duas camadas"""
+        return self.visao().periodo(inicio, fim)
+    
+    def contar_transacoes_hoje(self):
+        """Conta quantas transações foram feitas hoje"""
+        return self.visao().contar_do_dia(datetime.now())
+    
+    def gerar_relatorio(self, tipo_filtro=None, inicio=None, fim=None):
+        """Gerador que filtra transações por tipo e, opcionalmente, por período"""
+        return self.visao().gerar_relatorio(tipo_filtro, inicio, fim)
+
+
+class CacheResumos:
+    """Resumos das contas guardados com a versão da conta: só as contas alteradas são refeitas"""
+    
+    def __init__(self):
+        self._linhas = {}  # (agência, número) -> (versão, resumo)
+        self._refeitos = 0
+    
+    @property
+    def refeitos(self):
+        return self._refeitos
+    
+    def resumo(self, conta):
+        """Resumo somente leitura da conta, refeito apenas se a versão mudou"""
+        chave = (conta.agencia, conta.numero)
+        versao = conta.versao
+        linha = self._linhas.get(chave)
+        if linha is None or linha[0] != versao:
+            linha = (versao, MappingProxyType({
+                'agencia': conta.agencia,
+                'numero': conta.numero,
+                'titular': conta.cliente.nome,
+                'saldo': conta.saldo,
+                'tipo': conta_real(conta).__class__.__name__
+            }))
+            self._linhas[chave] = linha  # Troca da tupla inteira: leitores concorrentes veem a antiga ou a nova
+            self._refeitos += 1
+        return linha[1]
+
+
 class ContaIterador:
     """Iterador personalizado para contas"""
     
-    def __init__(self, contas):
+    def __init__(self, contas, cache=None):
         self._contas = contas
         self._index = 0
+        self._cache = cache
     
     def __iter__(self):
         return self
@@ -110,6 +668,8 @@ class ContaIterador:
         
         conta = self._contas[self._index]
         self._index += 1
+        if self._cache is not None:
+            return self._cache.resumo(conta)
         
         # Retorna informações básicas da conta
         return {
@@ -117,24 +677,41 @@ class ContaIterador:
             'numero': conta.numero,
             'titular': conta.cliente.nome,
             'saldo': conta.saldo,
-            'tipo': conta.__class__.__name__
+            'tipo': conta_real(conta).__class__.__name__
         }
 
 
 class Conta:
     """Classe base para contas bancárias"""
     
-    def __init__(self, numero, cliente):
+    def __init__(self, numero, cliente, loja_eventos=None, agencia=AGENCIA_PADRAO, estagio_risco=None):
         self._saldo = 0.0
         self._numero = numero
-        self._agencia = "0001"
+        self._agencia = agencia
         self._cliente = cliente
         self._historico = Historico()
+        self._lock = threading.RLock()
+        self._loja_eventos = loja_eventos  # Modo event-sourced quando informada
+        self._estagio_risco = estagio_risco  # Análise de risco dos débitos, se configurada
+        self._ouvintes = []
+        self._esperas = []
+        self._versao = 0  # Muda a cada alteração de estado (invalida os resumos em cache)
+        if loja_eventos is not None:
+            self._aplicar_evento(eventos.CONTA_ABERTA, cpf=getattr(cliente, 'cpf', None))
     
     @classmethod
-    def nova_conta(cls, cliente, numero):
+    def nova_conta(cls, cliente, numero, **kwargs):
         """Método de classe para criar nova conta"""
-        return cls(numero, cliente)
+        return cls(numero, cliente, **kwargs)
+    
+    @classmethod
+    def restaurada(cls, cliente, numero, saldo, saques_realizados=0, ultimo_fechamento=None,
+                   loja_eventos=None, **kwargs):
+        """Recria uma conta gravada pela persistência sem emitir eventos (a abertura já aconteceu)"""
+        conta = cls(numero, cliente, **kwargs)
+        conta._loja_eventos = loja_eventos
+        conta._restaurar(saldo, saques_realizados, ultimo_fechamento)
+        return conta
     
     @property
     def saldo(self):
@@ -156,19 +733,121 @@ class Conta:
     def historico(self):
         return self._historico
     
+    @property
+    def lock(self):
+        return self._lock
+    
+    @property
+    def loja_eventos(self):
+        return self._loja_eventos
+    
+    @property
+    def estagio_risco(self):
+        return self._estagio_risco
+    
+    @property
+    def versao(self):
+        return self._versao
+    
+    def inscrever(self, ouvinte, em_lote=None):
+        """Inscreve ouvinte(conta, evento), chamado a cada mudança de estado da conta.
+        
+        em_lote(conta, eventos), se informado, recebe de uma vez os eventos de um lote aprovado.
+        """
+        self._ouvintes.append((ouvinte, em_lote))
+    
+    @property
+    def esperas(self):
+        return self._esperas
+    
+    def inscrever_espera(self, espera):
+        """Inscreve espera(entradas), chamada por travar_contas antes de travar a conta"""
+        self._esperas.append(espera)
+    
+    def _restaurar(self, saldo, saques_realizados=0, ultimo_fechamento=None):
+        """Recoloca o estado gravado pela persistência (só na carga, antes de qualquer operação)"""
+        self._saldo = saldo
+        if hasattr(self, '_saques_realizados'):
+            self._saques_realizados = saques_realizados
+        if hasattr(self, '_ultimo_fechamento'):
+            self._ultimo_fechamento = ultimo_fechamento
+        if self._loja_eventos is not None:
+            self._loja_eventos.restaurar(self._agencia, self._numero, saldo,
+                                         getattr(self, '_saques_realizados', 0))
+        self._versao += 1
+    
+    def _aplicar_evento(self, tipo, valor=0.0, **dados):
+        """Aplica um evento de domínio ao estado, gravando-o antes no modo event-sourced"""
+        evento = eventos.Evento(tipo, self._agencia, self._numero, valor, dados)
+        if self._loja_eventos is not None:
+            self._loja_eventos.registrar(evento)
+        eventos.aplicar_evento(self, evento)
+        self._versao += 1
+        for ouvinte, _ in self._ouvintes:
+            ouvinte(self, evento)
+        return evento
+    
+    def _publicar_eventos(self, eventos_aplicados):
+        """Registra e notifica eventos já aplicados ao estado (lote de transações aprovado)"""
+        if self._loja_eventos is not None:
+            for evento in eventos_aplicados:
+                self._loja_eventos.registrar(evento)
+        self._versao += len(eventos_aplicados)
+        for ouvinte, em_lote in self._ouvintes:
+            if em_lote is not None:
+                em_lote(self, eventos_aplicados)
+                continue
+            for evento in eventos_aplicados:
+                ouvinte(self, evento)
+    
+    def _validar_lote(self, operacao, valor, transacoes_hoje):
+        """Motivo da recusa de um item de lote (None se aceito), com as regras das operações avulsas"""
+        if valor <= 0:
+            return 'valor_invalido'
+        if operacao != 'Deposito' and valor > self._saldo:
+            return 'saldo_insuficiente'
+        return None
+    
+    def _rejeitar(self, motivo, operacao, valor):
+        """Contabiliza uma operação recusada (e grava o evento no modo event-sourced)"""
+        metricas.registro.rejeicao(motivo)
+        if self._loja_eventos is not None:
+            self._loja_eventos.registrar(eventos.Evento(
+                eventos.REJEICAO, self._agencia, self._numero, valor,
+                {'operacao': operacao, 'motivo': motivo}
+            ))
+    
+    def _avaliar_risco(self, operacao, valor):
+        """Passa o débito pelo estágio de risco; retorna False se ele foi bloqueado"""
+        if self._estagio_risco is None:
+            return True
+        decisao = self._estagio_risco.avaliar(self, operacao, valor)
+        if decisao.bloqueada:
+            print(f"❌ Operação bloqueada pela análise de risco ({', '.join(decisao.motivos)}).")
+            self._rejeitar(f"risco_{decisao.motivos[0]}", operacao, valor)
+            return False
+        if decisao.motivos:
+            print(f"⚠️  Operação sinalizada pela análise de risco ({', '.join(decisao.motivos)}).")
+        return True
+    
     @log_operacao
     def sacar(self, valor):
         """Realiza saque da conta"""
         if valor <= 0:
             print("❌ Valor inválido! O valor deve ser positivo.")
+            self._rejeitar('valor_invalido', 'Saque', valor)
             return False
         
         if valor > self._saldo:
             print("❌ Saldo insuficiente para realizar o saque.")
             print(f"Seu saldo atual é de R$ {self._saldo:.2f}")
+            self._rejeitar('saldo_insuficiente', 'Saque', valor)
             return False
         
-        self._saldo -= valor
+        if not self._avaliar_risco('Saque', valor):
+            return False
+        
+        self._aplicar_evento(eventos.SAQUE, valor)
         print("✅ Saque realizado com sucesso!")
         print(f"Valor sacado: R$ {valor:.2f}")
         print(f"Saldo atual: R$ {self._saldo:.2f}")
@@ -179,24 +858,59 @@ class Conta:
         """Realiza depósito na conta"""
         if valor <= 0:
             print("❌ Valor inválido! O valor deve ser positivo.")
+            self._rejeitar('valor_invalido', 'Deposito', valor)
             return False
         
-        self._saldo += valor
+        self._aplicar_evento(eventos.DEPOSITO, valor)
         print("✅ Depósito realizado com sucesso!")
         print(f"Valor depositado: R$ {valor:.2f}")
         print(f"Saldo atual: R$ {self._saldo:.2f}")
         return True
+    
+    @log_operacao
+    def transferir(self, valor, conta_destino):
+        """Debita esta conta e credita a conta de destino (chamar com as duas travadas)"""
+        if (conta_destino.agencia, conta_destino.numero) == (self._agencia, self._numero):
+            print("❌ A conta de destino deve ser diferente da conta de origem.")
+            self._rejeitar('mesma_conta', 'Transferencia', valor)
+            return False
+        
+        if valor <= 0:
+            print("❌ Valor inválido! O valor deve ser positivo.")
+            self._rejeitar('valor_invalido', 'Transferencia', valor)
+            return False
+        
+        if valor > self._saldo:
+            print("❌ Saldo insuficiente para realizar a transferência.")
+            print(f"Seu saldo atual é de R$ {self._saldo:.2f}")
+            self._rejeitar('saldo_insuficiente', 'Transferencia', valor)
+            return False
+        
+        if not self._avaliar_risco('Transferencia', valor):
+            return False
+        
+        contrapartida = f"{conta_destino.agencia}/{conta_destino.numero}"
+        self._aplicar_evento(eventos.TRANSFERENCIA_ENVIADA, valor, contrapartida=contrapartida)
+        conta_destino._aplicar_evento(eventos.TRANSFERENCIA_RECEBIDA, valor,
+                                      contrapartida=f"{self.agencia}/{self.numero}")
+        print("✅ Transferência realizada com sucesso!")
+        print(f"Valor transferido: R$ {valor:.2f}")
+        print(f"Destino: Ag {conta_destino.agencia} - Conta {conta_destino.numero}")
+        print(f"Saldo atual: R$ {self._saldo:.2f}")
+        return True
 
 
 class ContaCorrente(Conta):
     """Classe para conta corrente com limite de saque"""
     
-    def __init__(self, numero, cliente, limite=500, limite_saques=3):
-        super().__init__(numero, cliente)
+    def __init__(self, numero, cliente, limite=500, limite_saques=3, loja_eventos=None, agencia=AGENCIA_PADRAO,
+                 estagio_risco=None):
         self._limite = limite
         self._limite_saques = limite_saques
         self._saques_realizados = 0
+        super().__init__(numero, cliente, loja_eventos, agencia, estagio_risco)
         self._limite_transacoes_diarias = 10  # Novo limite diário
+        self._ultimo_fechamento = None
     
     @property
     def limite(self):
@@ -214,6 +928,56 @@ class ContaCorrente(Conta):
     def limite_transacoes_diarias(self):
         return self._limite_transacoes_diarias
     
+    @property
+    def ultimo_fechamento(self):
+        return self._ultimo_fechamento
+    
+    def reiniciar_limites_diarios(self):
+        """Zera o contador de saques do dia"""
+        with self.lock:
+            self._aplicar_evento(eventos.LIMITES_REINICIADOS)
+    
+    def aplicar_fechamento(self, data_referencia, juros, tarifa, data_lancamento, saldo_calculo=None,
+                           recalcular=None):
+        """Aplica juros, tarifa e reinício de limites do fechamento diário (uma vez por data).
+        
+        juros e tarifa foram calculados sobre saldo_calculo; se o saldo já não é esse quando a
+        conta é travada, recalcular(saldo) dá os valores certos. Retorna (juros, tarifa)
+        aplicados, ou None se a data já estava fechada.
+        """
+        with travar_contas(self, entradas=2):
+            if self._ultimo_fechamento is not None and self._ultimo_fechamento >= data_referencia:
+                return None
+            if recalcular is not None and self._saldo != saldo_calculo:
+                juros, tarifa = recalcular(self._saldo)
+            
+            # A marca vem antes dos lançamentos e é gravada com a conta: depois de reiniciar ou
+            # descarregar, a mesma data é reconhecida (no máximo uma vez, como os agendamentos)
+            self._aplicar_evento(eventos.FECHAMENTO, data=data_referencia)
+            entradas = []
+            data = data_lancamento.strftime('%d/%m/%Y %H:%M:%S')
+            if juros:
+                self._aplicar_evento(eventos.JUROS, juros)
+                entradas.append({'tipo': 'Juros', 'valor': juros, 'data': data})
+            if tarifa:
+                self._aplicar_evento(eventos.TARIFA, tarifa)
+                entradas.append({'tipo': 'Tarifa', 'valor': tarifa, 'data': data})
+            if self._saques_realizados:
+                self._aplicar_evento(eventos.LIMITES_REINICIADOS)
+            if entradas:
+                self.historico.estender(entradas)
+            return juros, tarifa
+    
+    def _validar_lote(self, operacao, valor, transacoes_hoje):
+        if transacoes_hoje >= self._limite_transacoes_diarias:
+            return 'limite_diario'
+        if operacao == 'Saque':
+            if self._saques_realizados >= self._limite_saques:
+                return 'limite_saques'
+            if valor > self._limite:
+                return 'limite_valor'
+        return super()._validar_lote(operacao, valor, transacoes_hoje)
+    
     def _verificar_limite_transacoes(self):
         """Verifica se o limite de transações diárias foi atingido"""
         transacoes_hoje = self.historico.contar_transacoes_hoje()
@@ -228,29 +992,36 @@ class ContaCorrente(Conta):
             print(f"❌ Limite de transações diárias atingido!")
             print(f"Você já realizou {transacoes_hoje} transações hoje.")
             print(f"Limite diário: {self._limite_transacoes_diarias} transações")
+            self._rejeitar('limite_diario', 'Saque', valor)
             return False
         
         if self._saques_realizados >= self._limite_saques:
             print("❌ Limite de saques diários atingido!")
             print(f"Você já realizou {self._saques_realizados} saques hoje.")
+            self._rejeitar('limite_saques', 'Saque', valor)
             return False
         
         if valor > self._limite:
             print(f"❌ Valor excede o limite de saque de R$ {self._limite:.2f}")
+            self._rejeitar('limite_valor', 'Saque', valor)
             return False
         
         # Chama o método da classe pai sem o decorador para evitar log duplo
         if valor <= 0:
             print("❌ Valor inválido! O valor deve ser positivo.")
+            self._rejeitar('valor_invalido', 'Saque', valor)
             return False
         
         if valor > self._saldo:
             print("❌ Saldo insuficiente para realizar o saque.")
             print(f"Seu saldo atual é de R$ {self._saldo:.2f}")
+            self._rejeitar('saldo_insuficiente', 'Saque', valor)
+            return False
+        
+        if not self._avaliar_risco('Saque', valor):
             return False
         
-        self._saldo -= valor
-        self._saques_realizados += 1
+        self._aplicar_evento(eventos.SAQUE, valor)  # Debita e conta o saque do dia
         print("✅ Saque realizado com sucesso!")
         print(f"Valor sacado: R$ {valor:.2f}")
         print(f"Saldo atual: R$ {self._saldo:.2f}")
@@ -266,19 +1037,35 @@ class ContaCorrente(Conta):
             print(f"❌ Limite de transações diárias atingido!")
             print(f"Você já realizou {transacoes_hoje} transações hoje.")
             print(f"Limite diário: {self._limite_transacoes_diarias} transações")
+            self._rejeitar('limite_diario', 'Deposito', valor)
             return False
         
         # Chama o método da classe pai sem o decorador para evitar log duplo
         if valor <= 0:
             print("❌ Valor inválido! O valor deve ser positivo.")
+            self._rejeitar('valor_invalido', 'Deposito', valor)
             return False
         
-        self._saldo += valor
+        self._aplicar_evento(eventos.DEPOSITO, valor)
         print("✅ Depósito realizado com sucesso!")
         print(f"Valor depositado: R$ {valor:.2f}")
         print(f"Saldo atual: R$ {self._saldo:.2f}")
         return True
     
+    @log_operacao
+    def transferir(self, valor, conta_destino):
+        """Sobrescreve o método transferir com validação de limite de transações"""
+        if not self._verificar_limite_transacoes():
+            transacoes_hoje = self.historico.contar_transacoes_hoje()
+            print(f"❌ Limite de transações diárias atingido!")
+            print(f"Você já realizou {transacoes_hoje} transações hoje.")
+            print(f"Limite diário: {self._limite_transacoes_diarias} transações")
+            self._rejeitar('limite_diario', 'Transferencia', valor)
+            return False
+        
+        # Chama o método da classe pai sem o decorador para evitar log duplo
+        return Conta.transferir.__wrapped__(self, valor, conta_destino)
+    
     def __str__(self):
         transacoes_hoje = self.historico.contar_transacoes_hoje()
         return f"""
@@ -336,7 +1123,7 @@ class Cliente:
     @log_operacao
     def realizar_transacao(self, conta, transacao):
         """Realiza uma transação em uma conta específica"""
-        transacao.registrar(conta)
+        return transacao.registrar(conta)
     
     def adicionar_conta(self, conta):
         """Adiciona uma conta ao cliente"""
@@ -351,24 +1138,350 @@ class PessoaFisicaCliente(PessoaFisica, Cliente):
         Cliente.__init__(self, endereco)
 
 
+class AlocadorNumeros:
+    """Distribui números de conta em blocos, um bloco por thread, sem disputar um contador único"""
+    
+    def __init__(self, inicio=1, tamanho_bloco=1000):
+        self._proximo_bloco = inicio
+        self._tamanho_bloco = tamanho_bloco
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _reservar_bloco(self):
+        """Reserva o próximo bloco livre (único ponto com lock)"""
+        with self._lock:
+            inicio = self._proximo_bloco
+            self._proximo_bloco += self._tamanho_bloco
+        return inicio
+    
+    def proximo(self):
+        """Retorna o próximo número do bloco da thread atual"""
+        local = self._local
+        numero = getattr(local, 'proximo', None)
+        if numero is None or numero >= local.fim:
+            numero = self._reservar_bloco()
+            local.fim = numero + self._tamanho_bloco
+        local.proximo = numero + 1
+        return numero
+    
+    def reservar_ate(self, numero):
+        """Garante que os próximos blocos comecem depois de um número já usado"""
+        with self._lock:
+            self._proximo_bloco = max(self._proximo_bloco, numero + 1)
+
+
+class Agencia:
+    """Partição de contas de uma agência, com registro e alocador de números próprios"""
+    
+    def __init__(self, codigo, tamanho_bloco=1000):
+        self._codigo = codigo
+        self._contas = []
+        self._contas_por_numero = {}
+        self._alocador = AlocadorNumeros(tamanho_bloco=tamanho_bloco)
+        self._lock = threading.Lock()
+    
+    @property
+    def codigo(self):
+        return self._codigo
+    
+    @property
+    def contas(self):
+        return self._contas
+    
+    def nova_conta(self, classe, cliente, **kwargs):
+        """Cria uma conta com um número desta agência, sem guardá-la na partição (ela fica no banco)"""
+        return classe.nova_conta(cliente, self._alocador.proximo(), agencia=self._codigo, **kwargs)
+    
+    def abrir_conta(self, classe, cliente, **kwargs):
+        """Cria uma conta da classe informada com um número desta agência"""
+        conta = self.nova_conta(classe, cliente, **kwargs)
+        with self._lock:
+            self._contas.append(conta)
+            self._contas_por_numero[conta.numero] = conta
+        return conta
+    
+    def reservar_ate(self, numero):
+        """Reserva os números até numero, já usados por contas que continuam no banco"""
+        self._alocador.reservar_ate(numero)
+    
+    def restaurar_conta(self, conta):
+        """Registra uma conta já numerada (vinda da persistência) na partição"""
+        self._alocador.reservar_ate(conta.numero)
+        with self._lock:
+            self._contas.append(conta)
+            self._contas_por_numero[conta.numero] = conta
+        return conta
+    
+    def buscar_conta(self, numero):
+        """Busca uma conta da agência pelo número"""
+        return self._contas_por_numero.get(numero)
+    
+    def resumo(self):
+        """Totais da agência, calculados apenas sobre a sua partição"""
+        return {
+            'agencia': self._codigo,
+            'contas': len(self._contas),
+            'saldo_total': sum(conta.saldo for conta in self._contas),
+            'transacoes': sum(len(conta.historico) for conta in self._contas),
+        }
+
+
 class SistemaBancario:
     """Classe principal do sistema bancário"""
     
-    def __init__(self):
+    def __init__(self, loja_eventos=None, modelo_leitura=None, agencias=(AGENCIA_PADRAO,),
+                 armazenamento_historico=None, estagio_risco=None, persistencia=None, gravador_sessao=None,
+                 diario_agendamentos=None, feed_transacoes=None, limite_atrasadas=1, registrar_metricas=True):
         self._clientes = []
+        self._clientes_por_cpf = {}
         self._contas = []
-        self._numero_conta_sequencial = 1
+        self._agencias = {codigo: Agencia(codigo) for codigo in agencias}
+        self._lock_agencias = threading.Lock()
+        self._loja_eventos = loja_eventos
+        self._modelo_leitura = modelo_leitura  # Extratos e listagens leem daqui, se houver
+        self._armazenamento_historico = armazenamento_historico  # Camada fria dos históricos
+        self._estagio_risco = estagio_risco  # Compartilhado por todas as contas abertas aqui
+        self._persistencia = persistencia  # Banco onde clientes, contas e históricos são gravados
+        self._feed_transacoes = feed_transacoes  # Publica cada entrada confirmada para assinantes (CDC)
+        self._registro = None  # RegistroPreguicoso, quando a persistência é carregada sob demanda
+        self._gravador_sessao = gravador_sessao  # Grava as operações do menu como roteiro (roteiro.py)
+        self._cache_resumos = CacheResumos()  # Listagens só refazem as contas alteradas desde a anterior
+        self._indice_contas = IndiceContas()  # Busca por número, CPF e nome em selecionar_conta
+        # Transações programadas e recorrentes
+        self._agendador = Agendador(self, diario_agendamentos, limite_atrasadas=limite_atrasadas,
+                                    registrar_metricas=registrar_metricas)
+        # Relatórios e exportações longos, fora do laço do menu
+        self._tarefas = tarefas.GerenciadorTarefas(registrar_metricas=registrar_metricas)
+        self._servidor_metricas = None
+        
+        # Bancos auxiliares (medições de memória) não publicam medidores: eles ficariam presos ao registro global
+        if not registrar_metricas:
+            return
+        # Medidores calculados apenas quando as métricas são lidas; o registro guarda o sistema só
+        # por referência fraca e fechar() os retira
+        metricas.registro.medidor('clientes', lambda sistema: len(sistema._clientes), "Clientes cadastrados",
+                                  dono=self)
+        metricas.registro.medidor('contas', lambda sistema: len(sistema._contas), "Contas abertas", dono=self)
+        metricas.registro.medidor('resumos_refeitos', lambda sistema: sistema._cache_resumos.refeitos,
+                                  "Resumos de conta refeitos pelo cache das listagens", dono=self)
+        metricas.registro.medidor(
+            'historico_transacoes',
+            lambda sistema: sistema._persistencia.contar_historico() if sistema._registro is not None
+            else sum(len(conta.historico) for conta in sistema._contas),
+            "Entradas somadas de todos os históricos",
+            dono=self
+        )
+    
+    @property
+    def clientes(self):
+        return self._clientes
+    
+    @property
+    def contas(self):
+        return self._contas
+    
+    @property
+    def agencias(self):
+        return self._agencias
+    
+    @property
+    def loja_eventos(self):
+        return self._loja_eventos
+    
+    def criar_agencia(self, codigo):
+        """Cria a agência (ou retorna a existente)"""
+        with self._lock_agencias:
+            if codigo not in self._agencias:
+                self._agencias[codigo] = Agencia(codigo)
+            return self._agencias[codigo]
+    
+    @property
+    def modelo_leitura(self):
+        return self._modelo_leitura
+    
+    @property
+    def persistencia(self):
+        return self._persistencia
+    
+    @property
+    def estagio_risco(self):
+        return self._estagio_risco
+    
+    @property
+    def feed_transacoes(self):
+        return self._feed_transacoes
+    
+    @property
+    def registro(self):
+        return self._registro
+    
+    @property
+    def indice_contas(self):
+        return self._indice_contas
+    
+    @property
+    def agendador(self):
+        return self._agendador
+    
+    @property
+    def tarefas(self):
+        return self._tarefas
+    
+    def fechar(self):
+        """Encerra tarefas, agendador, gravador de sessão, modelo de leitura e persistência"""
+        metricas.registro.remover_medidores(self)
+        self._tarefas.fechar()
+        self._agendador.fechar()
+        if self._gravador_sessao is not None:
+            self._gravador_sessao.fechar()
+        if self._modelo_leitura is not None:
+            self._modelo_leitura.fechar()
+        aguardar_descargas()  # Segmentos ainda sendo gravados no banco ou em disco
+        if self._persistencia is not None:
+            self._persistencia.fechar()
+    
+    def dados_extrato(self, conta):
+        """Retorna (saldo, saques realizados, transações) do modelo de leitura ou da conta viva"""
+        if self._modelo_leitura is not None:
+            resumo, transacoes = self._modelo_leitura.extrato(conta)
+            if resumo is not None:
+                return resumo['saldo'], resumo['saques_realizados'], transacoes
+        return conta.saldo, getattr(conta, 'saques_realizados', 0), conta.historico.transacoes
+    
+    def _gravar(self, comando, *argumentos):
+        """Registra a operação no roteiro da sessão, se ela estiver sendo gravada"""
+        if self._gravador_sessao is not None:
+            self._gravador_sessao.gravar(comando, *argumentos)
     
     def validar_cpf(self, cpf):
-        """Valida se o CPF tem formato correto"""
-        return cpf.isdigit() and len(cpf) == 11
+        """Valida o CPF, incluindo os dígitos verificadores"""
+        return validacao.cpf_valido(cpf)
     
     def buscar_cliente_por_cpf(self, cpf):
         """Busca um cliente pelo CPF"""
-        for cliente in self._clientes:
-            if hasattr(cliente, 'cpf') and cliente.cpf == cpf:
-                return cliente
-        return None
+        cliente = self._clientes_por_cpf.get(cpf)
+        if cliente is None and self._registro is not None:
+            cliente = self._registro.cliente(cpf)
+        return cliente
+    
+    def buscar_conta(self, agencia, numero):
+        """Busca uma conta pela agência e número"""
+        if self._registro is not None:
+            return self._registro.buscar(agencia, numero)
+        particao = self._agencias.get(agencia)
+        return particao.buscar_conta(numero) if particao else None
+    
+    def adicionar_cliente(self, cliente):
+        """Cadastra um cliente já validado"""
+        self._clientes.append(cliente)
+        self._clientes_por_cpf[cliente.cpf] = cliente
+        if self._persistencia is not None:
+            self._persistencia.salvar_clientes([cliente])
+        return cliente
+    
+    def adicionar_clientes(self, clientes):
+        """Cadastra em lote clientes já validados e sem CPF repetido"""
+        self._clientes.extend(clientes)
+        self._clientes_por_cpf.update((cliente.cpf, cliente) for cliente in clientes)
+        if self._persistencia is not None:
+            self._persistencia.salvar_clientes(clientes)
+        return len(clientes)
+    
+    def abrir_conta_corrente(self, cliente, agencia=AGENCIA_PADRAO, **kwargs):
+        """Abre uma conta corrente para o cliente com o próximo número da agência"""
+        if agencia not in self._agencias:
+            raise ValueError(f"Agência {agencia} não existe")
+        kwargs.setdefault('loja_eventos', self._loja_eventos)
+        kwargs.setdefault('estagio_risco', self._estagio_risco)
+        if self._registro is not None:
+            # Carga preguiçosa: a partição não guarda contas, só o proxy devolvido por _registrar_conta
+            conta = self._agencias[agencia].nova_conta(ContaCorrente, cliente, **kwargs)
+        else:
+            conta = self._agencias[agencia].abrir_conta(ContaCorrente, cliente, **kwargs)
+        if self._persistencia is not None:
+            self._persistencia.salvar_conta(conta)
+        return self._registrar_conta(conta, nova=True)
+    
+    def _registrar_conta(self, conta, nova=False):
+        """Acrescenta a conta à lista do sistema e à do cliente; retorna a conta (ou o seu proxy)"""
+        if self._registro is not None:
+            conta = self._registro.adotar(conta)
+            self.ligar_conta(conta._real(), nova)
+        else:
+            self.ligar_conta(conta, nova)
+        self._contas.append(conta)
+        conta.cliente.adicionar_conta(conta)
+        self._indice_contas.adicionar(conta.agencia, conta.numero, conta.cliente.nome)
+        return conta
+    
+    def ligar_conta(self, conta, nova=False):
+        """Liga uma conta carregada à camada fria do histórico, à persistência e ao modelo de leitura.
+        
+        nova indica uma conta recém-aberta, cujo histórico começa vazio.
+        """
+        if self._persistencia is not None:
+            # Com banco, o histórico antigo fica nele em vez dos segmentos gzip
+            camada = self._persistencia.camada(conta)
+            conta.historico.usar_camada_fria(camada, self._persistencia.janela_quente)
+            conta.historico.inscrever(*camada.ouvintes(conta))
+            conta.inscrever(self._persistencia.atualizar_conta, self._persistencia.atualizar_conta_lote)
+        elif self._armazenamento_historico is not None:
+            # Sem banco as contas não sobrevivem ao reinício: uma conta aberta agora descarta os
+            # segmentos deixados no diretório por outra com o mesmo número
+            conta.historico.usar_camada_fria(self._armazenamento_historico.camada(conta, nova),
+                                             self._armazenamento_historico.janela_quente)
+        if self._modelo_leitura is not None:
+            # Conta restaurada: as entradas já gravadas são lidas do próprio histórico
+            self._modelo_leitura.registrar_conta(conta)
+            conta.historico.inscrever(self._modelo_leitura.ouvinte(conta))
+            conta.inscrever(self._modelo_leitura.ouvinte_eventos(conta))
+        if self._feed_transacoes is not None:
+            # Depois da persistência: a mudança gravada aponta para a entrada já gravada
+            conta.historico.inscrever(*self._feed_transacoes.ouvintes(conta))
+            conta.inscrever_espera(self._feed_transacoes.aguardar_espaco)
+    
+    def desligar_conta(self, conta):
+        """Desfaz o que ligar_conta guardou fora da conta (a conta vai ser descarregada da memória)"""
+        if self._modelo_leitura is not None:
+            self._modelo_leitura.descartar_conta(conta)
+    
+    def carregar_persistencia(self, preguicoso=False, capacidade=10000):
+        """Restaura clientes e contas do banco; os históricos são lidos de lá sob demanda.
+        
+        Com preguicoso, nada é materializado agora: contas e clientes viram sequências
+        apoiadas no banco e cada conta carrega no primeiro acesso, com no máximo
+        capacidade contas carregadas ao mesmo tempo.
+        """
+        if self._persistencia is None:
+            return 0
+        if preguicoso:
+            from contas_preguicosas import RegistroPreguicoso
+            
+            # Clientes só enquanto referenciados (por uma conta carregada, por exemplo): o banco tem os demais
+            self._clientes_por_cpf = weakref.WeakValueDictionary(self._clientes_por_cpf)
+            self._registro = RegistroPreguicoso(self, self._persistencia, self._clientes_por_cpf, capacidade)
+            self._contas = self._registro.contas
+            self._clientes = self._registro.clientes
+            # O índice de busca é montado do banco na primeira busca, sem carregar as contas
+            self._indice_contas = IndiceContas(carga=lambda: (
+                (resumo['agencia'], resumo['numero'], resumo['titular']) for resumo in self._persistencia.resumos()))
+            for agencia, maior in self._persistencia.maiores_numeros().items():
+                self.criar_agencia(agencia).reservar_ate(maior)
+            return len(self._contas)
+        clientes = [PessoaFisicaCliente(nome, data_nascimento, cpf, endereco)
+                    for cpf, nome, data_nascimento, endereco in self._persistencia.clientes()]
+        self._clientes.extend(clientes)
+        self._clientes_por_cpf.update((cliente.cpf, cliente) for cliente in clientes)
+        
+        contas = self._persistencia.contas()
+        for agencia, numero, cpf, limite, limite_saques, saldo, saques_realizados, ultimo_fechamento in contas:
+            conta = ContaCorrente.restaurada(self._clientes_por_cpf[cpf], numero, saldo, saques_realizados,
+                                             ultimo_fechamento, limite=limite, limite_saques=limite_saques,
+                                             loja_eventos=self._loja_eventos, agencia=agencia,
+                                             estagio_risco=self._estagio_risco)
+            self.criar_agencia(agencia).restaurar_conta(conta)
+            self._registrar_conta(conta)
+        return len(contas)
     
     @log_operacao
     def criar_cliente(self):
@@ -382,13 +1495,13 @@ class SistemaBancario:
             return
         
         data_nascimento = input("Digite a data de nascimento (DD/MM/AAAA): ").strip()
-        if not re.match(r'\d{2}/\d{2}/\d{4}', data_nascimento):
-            print("❌ Formato de data inválido! Use DD/MM/AAAA")
+        if not validacao.data_valida(data_nascimento):
+            print("❌ Data inválida! Use DD/MM/AAAA com uma data existente")
             return
         
         cpf = input("Digite o CPF (apenas números): ").strip()
         if not self.validar_cpf(cpf):
-            print("❌ CPF inválido! Digite apenas 11 números.")
+            print("❌ CPF inválido! Confira os 11 números e os dígitos verificadores.")
             return
         
         if self.buscar_cliente_por_cpf(cpf):
@@ -403,15 +1516,20 @@ class SistemaBancario:
         cidade = input("Cidade: ").strip()
         sigla_estado = input("Sigla do Estado (ex: SP): ").strip().upper()
         
-        if not all([logradouro, numero, bairro, cidade, sigla_estado]):
+        motivo = validacao.motivo_endereco_invalido(logradouro, numero, bairro, cidade, sigla_estado)
+        if motivo == "endereco_incompleto":
             print("❌ Todos os campos do endereço são obrigatórios!")
             return
+        if motivo == "uf_invalida":
+            print("❌ Sigla do estado inválida!")
+            return
         
         endereco = f"{logradouro}, {numero} - {bairro} - {cidade}/{sigla_estado}"
         
         # Cria o cliente
+        self._gravar('cliente', nome, data_nascimento, cpf, endereco)
         cliente = PessoaFisicaCliente(nome, data_nascimento, cpf, endereco)
-        self._clientes.append(cliente)
+        self.adicionar_cliente(cliente)
         
         print("✅ Cliente criado com sucesso!")
         print(f"Nome: {nome}")
@@ -429,7 +1547,7 @@ class SistemaBancario:
         
         cpf = input("Digite o CPF do cliente: ").strip()
         if not self.validar_cpf(cpf):
-            print("❌ CPF inválido! Digite apenas 11 números.")
+            print("❌ CPF inválido! Confira os 11 números e os dígitos verificadores.")
             return
         
         cliente = self.buscar_cliente_por_cpf(cpf)
@@ -442,11 +1560,18 @@ class SistemaBancario:
             print("❌ Este cliente já possui uma conta corrente!")
             return
         
+        agencias = sorted(self._agencias)
+        agencia = AGENCIA_PADRAO
+        if len(agencias) > 1:
+            agencia = input(f"Agência ({', '.join(agencias)}; Enter para {AGENCIA_PADRAO}): ").strip() \
+                or AGENCIA_PADRAO
+            if agencia not in self._agencias:
+                print("❌ Agência não encontrada!")
+                return
+        
         # Cria a conta
-        conta = ContaCorrente.nova_conta(cliente, self._numero_conta_sequencial)
-        self._contas.append(conta)
-        cliente.adicionar_conta(conta)
-        self._numero_conta_sequencial += 1
+        self._gravar('conta', cpf, agencia)
+        conta = self.abrir_conta_corrente(cliente, agencia)
         
         print("✅ Conta corrente criada com sucesso!")
         print(f"Agência: {conta.agencia}")
@@ -459,21 +1584,37 @@ class SistemaBancario:
             print("❌ Nenhuma conta cadastrada!")
             return None
         
-        print("\n📋 CONTAS DISPONÍVEIS:")
-        print("-" * 40)
-        for i, conta in enumerate(self._contas):
-            print(f"{i+1}. Ag: {conta.agencia} - Conta: {conta.numero} - {conta.cliente.nome}")
-        
-        try:
-            escolha = int(input("\nSelecione o número da conta: ")) - 1
-            if 0 <= escolha < len(self._contas):
-                return self._contas[escolha]
+        consulta = input("\n🔎 Buscar conta (número, AG/número, CPF ou nome; Enter lista todas): ").strip()
+        pagina = 1
+        while True:
+            resultado = self._indice_contas.buscar(consulta, pagina, CONTAS_POR_PAGINA, sistema=self)
+            itens = resultado['itens']
+            if not itens:
+                print("❌ Nenhuma conta encontrada!")
+                return None
+            if resultado['total'] == 1 and resultado['modo'] in ('numero', 'cpf'):
+                item = itens[0]  # Busca exata com uma única conta: já está escolhida
+                print(f"Conta: Ag {item['agencia']} - {item['numero']} - {item['titular']}")
+                return self.buscar_conta(item['agencia'], item['numero'])
+            
+            print(f"\n📋 CONTAS ENCONTRADAS ({resultado['total']}, página {pagina}/{resultado['paginas']}):")
+            print("-" * 40)
+            if resultado['modo'] == 'aproximada':
+                print("Nenhum nome começa assim; mostrando os mais parecidos.")
+            for i, item in enumerate(itens, 1):
+                print(f"{i}. Ag: {item['agencia']} - Conta: {item['numero']} - {item['titular']}")
+            
+            escolha = input("\nSelecione a conta (+ próxima página, - anterior): ").strip()
+            if escolha == '+' and pagina < resultado['paginas']:
+                pagina += 1
+            elif escolha == '-' and pagina > 1:
+                pagina -= 1
+            elif escolha.isdigit() and 1 <= int(escolha) <= len(itens):
+                item = itens[int(escolha) - 1]
+                return self.buscar_conta(item['agencia'], item['numero'])
             else:
                 print("❌ Conta inválida!")
                 return None
-        except ValueError:
-            print("❌ Entrada inválida!")
-            return None
     
     def realizar_saque(self):
         """Realiza operação de saque"""
@@ -490,6 +1631,7 @@ class SistemaBancario:
             print("❌ Valor inválido! Digite um número válido.")
             return
         
+        self._gravar('saque', f"{conta.agencia}/{conta.numero}", valor)
         transacao = Saque(valor)
         conta.cliente.realizar_transacao(conta, transacao)
     
@@ -508,19 +1650,47 @@ class SistemaBancario:
             print("❌ Valor inválido! Digite um número válido.")
             return
         
+        self._gravar('deposito', f"{conta.agencia}/{conta.numero}", valor)
         transacao = Deposito(valor)
         conta.cliente.realizar_transacao(conta, transacao)
     
+    def realizar_transferencia(self):
+        """Realiza transferência entre duas contas"""
+        print("\n🔁 OPERAÇÃO DE TRANSFERÊNCIA")
+        print("-" * 30)
+        
+        print("Conta de origem:")
+        conta_origem = self.selecionar_conta()
+        if not conta_origem:
+            return
+        
+        print("Conta de destino:")
+        conta_destino = self.selecionar_conta()
+        if not conta_destino:
+            return
+        
+        try:
+            valor = float(input("Digite o valor da transferência: R$ "))
+        except ValueError:
+            print("❌ Valor inválido! Digite um número válido.")
+            return
+        
+        self._gravar('transferencia', f"{conta_origem.agencia}/{conta_origem.numero}",
+                     f"{conta_destino.agencia}/{conta_destino.numero}", valor)
+        transacao = Transferencia(valor, conta_destino)
+        conta_origem.cliente.realizar_transacao(conta_origem, transacao)
+    
     def exibir_extrato(self):
         """Exibe o extrato de uma conta"""
         conta = self.selecionar_conta()
         if not conta:
             return
         
+        self._gravar('extrato', f"{conta.agencia}/{conta.numero}")
         print("\n📋 EXTRATO BANCÁRIO")
         print("=" * 35)
         
-        historico = conta.historico.transacoes
+        saldo, saques_realizados, historico = self.dados_extrato(conta)
         if not historico:
             print("Nenhuma transação foi realizada ainda.")
         else:
@@ -530,14 +1700,17 @@ class SistemaBancario:
                 tipo = transacao['tipo']
                 valor = transacao['valor']
                 data = transacao['data']
-                sinal = '+' if tipo == 'Deposito' else '-'
+                sinal = sinal_transacao(transacao)
                 print(f"{i:2d}. {tipo}: {sinal}R$ {valor:.2f} - {data}")
         
         print("-" * 35)
-        print(f"Saldo atual: R$ {conta.saldo:.2f}")
-        if isinstance(conta, ContaCorrente):
-            print(f"Saques realizados hoje: {conta.saques_realizados}/{conta.limite_saques}")
-            transacoes_hoje = conta.historico.contar_transacoes_hoje()
+        print(f"Saldo atual: R$ {saldo:.2f}")
+        # O proxy de uma conta preguiçosa não é um ContaCorrente: o tipo é o da conta carregada
+        if isinstance(conta_real(conta), ContaCorrente):
+            print(f"Saques realizados hoje: {saques_realizados}/{conta.limite_saques}")
+            hoje = datetime.now().strftime('%d/%m/%Y')
+            transacoes_hoje = sum(1 for transacao in historico
+                                  if transacao['data'].startswith(hoje) and transacao['tipo'] not in TIPOS_FORA_DO_LIMITE)
             print(f"Transações realizadas hoje: {transacoes_hoje}/{conta.limite_transacoes_diarias}")
         print("=" * 35)
     
@@ -552,6 +1725,7 @@ class SistemaBancario:
         print("1 - Todos os tipos")
         print("2 - Apenas depósitos")
         print("3 - Apenas saques")
+        print("4 - Apenas transferências")
         
         try:
             opcao = int(input("Escolha o tipo de relatório: "))
@@ -564,22 +1738,45 @@ class SistemaBancario:
             tipo_filtro = "Deposito"
         elif opcao == 3:
             tipo_filtro = "Saque"
+        elif opcao == 4:
+            tipo_filtro = "Transferencia"
         elif opcao != 1:
             print("❌ Opção inválida!")
             return
         
+        periodo = input("Período DD/MM/AAAA-DD/MM/AAAA (Enter para todo o histórico): ").strip()
+        try:
+            inicio, fim = ((datetime.strptime(data.strip(), '%d/%m/%Y') for data in periodo.split('-'))
+                           if periodo else (None, None))
+        except ValueError:
+            print("❌ Período inválido!")
+            return
+        
+        self._gravar('relatorio', f"{conta.agencia}/{conta.numero}", tipo_filtro or 'todos',
+                     *([f"{inicio:%d/%m/%Y}-{fim:%d/%m/%Y}"] if periodo else []))
+        fim = fim.replace(hour=23, minute=59, second=59) if periodo else None
+        tamanho = len(conta.historico)
+        if tamanho > LIMIAR_SEGUNDO_PLANO and self._oferecer_segundo_plano(tamanho, "transações"):
+            caminho = (input(f"Arquivo (Enter para 'relatorio_{conta.agencia}_{conta.numero}.txt'): ").strip()
+                       or f"relatorio_{conta.agencia}_{conta.numero}.txt")
+            self._submeter_tarefa('relatorio_transacoes', tarefas.exportar_relatorio, self, conta, caminho,
+                                  tipo_filtro, inicio, fim)
+            return
+        
         print(f"\n📋 RELATÓRIO DE TRANSAÇÕES")
         if tipo_filtro:
             print(f"Filtro: {tipo_filtro}")
+        if periodo:
+            print(f"Período: {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}")
         print("=" * 35)
         
         count = 0
-        for transacao in conta.historico.gerar_relatorio(tipo_filtro):
+        for transacao in self.relatorio_transacoes(conta, tipo_filtro, inicio, fim):
             count += 1
             tipo = transacao['tipo']
             valor = transacao['valor']
             data = transacao['data']
-            sinal = '+' if tipo == 'Deposito' else '-'
+            sinal = sinal_transacao(transacao)
             print(f"{count:2d}. {tipo}: {sinal}R$ {valor:.2f} - {data}")
         
         if count == 0:
@@ -588,6 +1785,29 @@ class SistemaBancario:
             print(f"\nTotal de transações: {count}")
         print("=" * 35)
     
+    def relatorio_transacoes(self, conta, tipo_filtro=None, inicio=None, fim=None):
+        """Gerador das transações do relatório (menu e roteiro), monitorado pelo detector de lentidão"""
+        # Só a geração é monitorada: a espera pelas respostas do menu não conta como lentidão
+        with operacoes_lentas.detector.monitorar('SistemaBancario.gerar_relatorio_transacoes', (conta,),
+                                                 {'tipo_filtro': tipo_filtro, 'inicio': inicio, 'fim': fim}):
+            if inicio is not None or fim is not None:
+                # Consulta por período vai às camadas do histórico: só abre os segmentos frios do intervalo
+                yield from conta.historico.gerar_relatorio(tipo_filtro, inicio, fim)
+                return
+            _, _, historico = self.dados_extrato(conta)
+            yield from (transacao for transacao in historico
+                        if tipo_filtro is None or transacao['tipo'] == tipo_filtro)
+    
+    def resumos_contas(self, agencia=None, modelo_leitura=False):
+        """Resumos das contas (de uma agência, se informada), sem carregar contas preguiçosas"""
+        codigo = agencia.codigo if agencia is not None else None
+        if self._registro is not None:
+            self._persistencia.confirmar()  # O relatório inclui as escritas desta sessão
+            return self._persistencia.resumos(agencia=codigo)
+        if modelo_leitura and self._modelo_leitura is not None:
+            return self._modelo_leitura.listar_contas(agencia=codigo)
+        return ContaIterador(agencia.contas if agencia is not None else self._contas, self._cache_resumos)
+    
     def listar_contas(self):
         """Lista todas as contas usando iterador personalizado"""
         print("\n📋 LISTA DE CONTAS (Iterador Personalizado)")
@@ -595,8 +1815,13 @@ class SistemaBancario:
         
         if not self._contas:
             print("Nenhuma conta cadastrada.")
+        elif len(self._contas) > LIMIAR_SEGUNDO_PLANO and self._oferecer_segundo_plano(len(self._contas), "contas"):
+            self._gravar('contas')
+            caminho = input("Arquivo CSV (Enter para 'contas.csv'): ").strip() or 'contas.csv'
+            self._submeter_tarefa('exportar_contas', tarefas.exportar_contas, self, caminho)
         else:
-            iterador = ContaIterador(self._contas)
+            self._gravar('contas')
+            iterador = self.resumos_contas(modelo_leitura=True)
             count = 0
             for info_conta in iterador:
                 count += 1
@@ -608,6 +1833,355 @@ class SistemaBancario:
             print(f"\nTotal de contas: {count}")
         print("=" * 60)
     
+    def listar_contas_agencia(self):
+        """Resumo por agência e listagem das contas de uma única agência"""
+        print("\n🏢 CONTAS POR AGÊNCIA")
+        print("=" * 60)
+        resumos = {}
+        if self._registro is not None:
+            self._persistencia.confirmar()
+            resumos = self._persistencia.resumo_agencias()
+        for codigo in sorted(self._agencias):
+            resumo = resumos.get(codigo) or self._agencias[codigo].resumo()
+            print(f"Agência {codigo}: {resumo['contas']} contas | "
+                  f"Saldo total: R$ {resumo['saldo_total']:.2f} | "
+                  f"Transações: {resumo['transacoes']}")
+        print("-" * 60)
+        
+        codigo = input("Agência para listar (Enter para voltar): ").strip()
+        if not codigo:
+            return
+        agencia = self._agencias.get(codigo)
+        if not agencia:
+            print("❌ Agência não encontrada!")
+            return
+        
+        self._gravar('contas', codigo)
+        iterador = self.resumos_contas(agencia=agencia, modelo_leitura=True)
+        count = 0
+        for info_conta in iterador:
+            count += 1
+            print(f"{count}. Conta: {info_conta['numero']} | "
+                  f"Titular: {info_conta['titular']} | "
+                  f"Saldo: R$ {info_conta['saldo']:.2f}")
+        print(f"\nTotal de contas na agência {codigo}: {count}")
+        print("=" * 60)
+    
+    def cadastrar_clientes_lote(self):
+        """Cadastra clientes a partir de um arquivo CSV, validando em paralelo"""
+        from cadastro_lote import CadastroLote, exibir_estatisticas
+        
+        print("\n📥 CADASTRO DE CLIENTES EM LOTE")
+        print("-" * 40)
+        caminho = input("Arquivo CSV de clientes: ").strip()
+        if not caminho:
+            print("❌ Informe o caminho do arquivo!")
+            return
+        
+        caminho_rejeicoes = input("Arquivo para as rejeições (Enter para não gravar): ").strip() or None
+        abrir_contas = input("Abrir conta corrente para cada cliente? (s/N): ").strip().lower() == 's'
+        self._gravar('lote', caminho, caminho_rejeicoes or '-', 's' if abrir_contas else 'n')
+        try:
+            estatisticas = CadastroLote(self, abrir_contas=abrir_contas).executar([caminho], caminho_rejeicoes)
+        except OSError as erro:
+            print(f"❌ Não foi possível ler o arquivo: {erro}")
+            return
+        exibir_estatisticas(estatisticas)
+    
+    def executar_fechamento_diario(self):
+        """Aplica juros, tarifas e reinício de limites em todas as contas correntes"""
+        from fechamento_diario import FechamentoDiario, diretorio_por_ambiente
+        
+        print("\n🌙 FECHAMENTO DIÁRIO")
+        print("-" * 40)
+        data = input("Data de referência (DD/MM/AAAA, Enter para hoje): ").strip()
+        try:
+            data_referencia = datetime.strptime(data, '%d/%m/%Y').date() if data else None
+        except ValueError:
+            print("❌ Data inválida! Use o formato DD/MM/AAAA.")
+            return
+        
+        self._gravar('fechamento', *([f"{data_referencia:%d/%m/%Y}"] if data_referencia else []))
+        resultado = FechamentoDiario(self, data_referencia=data_referencia,
+                                     diretorio_checkpoint=diretorio_por_ambiente()).executar_paralelo()
+        print(f"✅ Fechamento de {resultado['data']}: {resultado['processadas']} contas processadas, "
+              f"{resultado['ignoradas']} já fechadas")
+        print(f"   Juros creditados: R$ {resultado['juros']:.2f}")
+        print(f"   Tarifas cobradas: R$ {resultado['tarifas']:.2f}")
+    
+    def gerar_extratos_lote(self):
+        """Gera os extratos de todas as contas num pool de processos, um arquivo por partição"""
+        from extratos_lote import ExtratosLote, exibir_estatisticas
+        
+        print("\n🗂️  EXTRATOS EM LOTE")
+        print("-" * 40)
+        if not self._contas:
+            print("❌ Nenhuma conta cadastrada!")
+            return
+        diretorio = input("Diretório de saída (Enter para 'extratos'): ").strip() or 'extratos'
+        periodo = input("Período DD/MM/AAAA-DD/MM/AAAA (Enter para todo o histórico): ").strip()
+        try:
+            inicio, fim = ((datetime.strptime(data.strip(), '%d/%m/%Y') for data in periodo.split('-'))
+                           if periodo else (None, None))
+        except ValueError:
+            print("❌ Período inválido!")
+            return
+        
+        self._gravar('extratos', diretorio, 'todos', *([f"{inicio:%d/%m/%Y}-{fim:%d/%m/%Y}"] if periodo else []))
+        fim = fim.replace(hour=23, minute=59, second=59) if fim else None
+        if input("Gerar em segundo plano? (s/N): ").strip().lower() == 's':
+            self._submeter_tarefa('extratos_lote', tarefas.gerar_extratos, self, diretorio, inicio, fim)
+            return
+        estatisticas = ExtratosLote(self, diretorio, inicio=inicio, fim=fim).executar()
+        exibir_estatisticas(estatisticas)
+    
+    def gerenciar_agendamentos(self):
+        """Agenda, lista e cancela transações programadas e recorrentes"""
+        from agendamentos import DEPOSITO, SAQUE, TRANSFERENCIA
+        
+        print("\n⏰ AGENDAMENTOS")
+        print("=" * 45)
+        print("1 - Agendar transação")
+        print("2 - Próximos agendamentos")
+        print("3 - Cancelar agendamento")
+        
+        try:
+            opcao = int(input("Escolha uma opção: "))
+        except ValueError:
+            print("❌ Opção inválida!")
+            return
+        
+        if opcao == 2:
+            pendentes = self._agendador.pendentes()
+            if not pendentes:
+                print("Nenhum agendamento pendente.")
+            for agendamento in pendentes:
+                repeticao = ""
+                if agendamento.intervalo:
+                    vezes = f", mais {agendamento.restantes - 1}x" if agendamento.restantes else ""
+                    repeticao = f" (a cada {agendamento.intervalo // 86400} dia(s){vezes})"
+                destino = f" -> Ag {agendamento.destino[0]} - Conta {agendamento.destino[1]}" if agendamento.destino else ""
+                print(f"#{agendamento.id} {datetime.fromtimestamp(agendamento.instante):%d/%m/%Y %H:%M} - "
+                      f"{agendamento.tipo} de R$ {agendamento.valor:.2f} - Ag {agendamento.agencia} - "
+                      f"Conta {agendamento.numero}{destino}{repeticao}")
+            return
+        if opcao == 3:
+            try:
+                identificador = int(input("Número do agendamento: ").strip().lstrip('#'))
+            except ValueError:
+                print("❌ Agendamento inválido!")
+                return
+            if self._agendador.cancelar(identificador):
+                self._gravar('cancelar_agendamento', identificador)
+                print("✅ Agendamento cancelado!")
+            else:
+                print("❌ Agendamento não encontrado!")
+            return
+        if opcao != 1:
+            print("❌ Opção inválida!")
+            return
+        
+        tipos = {'1': DEPOSITO, '2': SAQUE, '3': TRANSFERENCIA}
+        tipo = tipos.get(input("Tipo (1 - Depósito, 2 - Saque, 3 - Transferência): ").strip())
+        if tipo is None:
+            print("❌ Tipo inválido!")
+            return
+        print("Conta de origem:" if tipo == TRANSFERENCIA else "Conta:")
+        conta = self.selecionar_conta()
+        if not conta:
+            return
+        destino = None
+        if tipo == TRANSFERENCIA:
+            print("Conta de destino:")
+            destino = self.selecionar_conta()
+            if not destino:
+                return
+        try:
+            valor = float(input("Valor: R$ "))
+            quando = datetime.strptime(input("Data e hora (DD/MM/AAAA HH:MM): ").strip(), '%d/%m/%Y %H:%M')
+            dias = int(input("Repetir a cada quantos dias (Enter para não repetir): ").strip() or 0)
+            vezes = int(input("Quantas vezes (Enter para até cancelar): ").strip() or 0) if dias else 0
+        except ValueError:
+            print("❌ Valor, data ou repetição inválidos!")
+            return
+        if valor <= 0 or dias < 0 or vezes < 0:
+            print("❌ Valor e repetição devem ser positivos!")
+            return
+        
+        self._gravar('agendar', tipo, f"{conta.agencia}/{conta.numero}", valor, f"{quando:%d/%m/%Y %H:%M}",
+                     dias or '-', vezes or '-', *([f"{destino.agencia}/{destino.numero}"] if destino else []))
+        identificador = self._agendador.agendar(conta, tipo, valor, quando.timestamp(), dias * 86400 or None,
+                                                vezes or None, destino)
+        print(f"✅ Agendamento #{identificador} criado para {quando:%d/%m/%Y %H:%M}")
+    
+    def executar_agendamentos(self):
+        """Executa os agendamentos vencidos e informa o resultado, inclusive o da thread do agendador"""
+        resultado = self._agendador.executar_vencidos()
+        for chave, quantidade in self._agendador.resultado_em_segundo_plano().items():
+            resultado[chave] += quantidade
+        if any(resultado.values()):
+            print(f"⏰ Agendamentos: {resultado['executados']} executados, {resultado['recusados']} recusados, "
+                  f"{resultado['falhas']} com conta inexistente")
+        # O que a thread imprimiria durante o menu só aparece aqui, quando pedido
+        for mensagem in self._agendador.mensagens_em_segundo_plano():
+            print(f"   {mensagem}")
+        return resultado
+    
+    def exibir_metricas(self):
+        """Exibe as métricas de operação ou inicia o endpoint HTTP"""
+        print("\n📈 MÉTRICAS DE OPERAÇÃO")
+        print("=" * 60)
+        print("1 - Exibir resumo")
+        print("2 - Iniciar endpoint Prometheus (/metrics)")
+        print("3 - Pegada de memória")
+        print("4 - Detector de operações lentas")
+        
+        try:
+            opcao = int(input("Escolha uma opção: "))
+        except ValueError:
+            print("❌ Opção inválida!")
+            return
+        
+        if opcao == 2:
+            if self._servidor_metricas:
+                host, porta = self._servidor_metricas.server_address[:2]
+                print(f"ℹ️  Endpoint já ativo em http://{host}:{porta}/metrics")
+                return
+            try:
+                porta = int(input("Porta (Enter para 9100): ") or 9100)
+                self._servidor_metricas = metricas.iniciar_servidor(porta=porta)
+            except (ValueError, OSError) as erro:
+                print(f"❌ Não foi possível iniciar o endpoint: {erro}")
+                return
+            print(f"✅ Endpoint ativo em http://127.0.0.1:{porta}/metrics")
+            return
+        elif opcao == 3:
+            import memoria
+            
+            self._gravar('memoria')
+            print("\n🔬 Pegada por tipo (amostra de até 1000 objetos)")
+            memoria.exibir_pegada(memoria.pegada_por_tipo(self))
+            if input("Rodar o modelo de capacidade? (s/N): ").strip().lower() == 's':
+                print("⏳ Medindo bancos de 1000 a 8000 contas...")
+                memoria.exibir_modelo(memoria.modelo_capacidade())
+            return
+        elif opcao == 4:
+            self.configurar_detector_lentas()
+            return
+        elif opcao != 1:
+            print("❌ Opção inválida!")
+            return
+        
+        self._gravar('metricas')
+        resumo = metricas.registro.resumo()
+        print(f"{'Operação':<28}{'Qtd':>8}{'p50 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+        print("-" * 60)
+        for operacao, dados in resumo['latencias'].items():
+            quantis = dados['quantis_ns']
+            print(f"{operacao:<28}{dados['contagem']:>8}"
+                  f"{quantis[0.5] / 1e6:>9.3f}{quantis[0.99] / 1e6:>9.3f}{dados['maximo_ns'] / 1e6:>9.3f}")
+        
+        print("-" * 60)
+        for (operacao, resultado), total in sorted(resumo['operacoes'].items()):
+            print(f"{operacao} [{resultado}]: {total}")
+        for motivo, total in sorted(resumo['rejeicoes'].items()):
+            print(f"Rejeições por {motivo}: {total}")
+        for nome, valor in resumo['medidores'].items():
+            print(f"{nome}: {valor}")
+        print("=" * 60)
+    
+    def configurar_detector_lentas(self):
+        """Ajusta limiar e modo de captura do detector de operações lentas, sem reiniciar"""
+        detector = operacoes_lentas.detector
+        limiar = f"{detector.limiar_ms:g} ms" if detector.limiar_ms is not None else "desligado"
+        print(f"\n🐢 Limiar: {limiar} | Modo: {detector.modo} | "
+              f"Capturas: {detector.total} em {detector.diretorio}/")
+        for arquivo, operacao, duracao in detector.capturas(5):
+            print(f"   {operacao}: {duracao:.1f} ms ({arquivo})")
+        
+        entrada = input("Novo limiar em ms (Enter mantém, 0 desliga): ").strip()
+        modo = input(f"Modo ({'/'.join(operacoes_lentas.MODOS)}, Enter mantém): ").strip() or None
+        try:
+            novo_limiar = float(entrada) if entrada else detector.limiar_ms
+            detector.configurar(novo_limiar or None, modo)
+        except ValueError as erro:
+            print(f"❌ {erro}")
+            return
+        self._gravar('lentas', f"{detector.limiar_ms:g}" if detector.limiar_ms is not None else '0', detector.modo)
+        print(f"✅ Detector: limiar {detector.limiar_ms} ms, modo {detector.modo}")
+    
+    def _oferecer_segundo_plano(self, quantidade, itens):
+        resposta = input(f"São {quantidade} {itens}: gerar em segundo plano, num arquivo? (S/n): ")
+        return resposta.strip().lower() != 'n'
+    
+    def _submeter_tarefa(self, nome, funcao, *args):
+        tarefa = self._tarefas.submeter(nome, funcao, *args)
+        print(f"⚙️  Tarefa #{tarefa.id} ({nome}) em segundo plano; acompanhe em '15 - Tarefas'")
+        return tarefa
+    
+    def _exibir_tarefa(self, tarefa, detalhes=False):
+        percentual = f" {tarefa.percentual:.0f}%" if tarefa.percentual is not None else ""
+        total = f"/{tarefa.total}" if tarefa.total is not None else ""
+        print(f"#{tarefa.id} {tarefa.nome} [{tarefa.estado}]{percentual} "
+              f"({tarefa.feitos}{total}) {tarefa.duracao:.1f}s")
+        if detalhes and tarefa.erro:
+            print(f"   ❌ {tarefa.erro}")
+        elif detalhes and tarefa.resultado is not None:
+            for chave, valor in tarefa.resultado.items():
+                if isinstance(valor, list):
+                    print(f"   {chave}: {len(valor)}")
+                    for item in valor[:10]:
+                        print(f"      {item}")
+                else:
+                    print(f"   {chave}: {valor}")
+    
+    def gerenciar_tarefas(self):
+        """Acompanha, submete e cancela tarefas em segundo plano"""
+        print("\n⚙️  TAREFAS EM SEGUNDO PLANO")
+        print("=" * 60)
+        lista = self._tarefas.tarefas()
+        if not lista:
+            print("Nenhuma tarefa submetida.")
+        for tarefa in lista:
+            self._exibir_tarefa(tarefa)
+        print("-" * 60)
+        print("1 - Exportar contas (CSV)")
+        print("2 - Conciliação de saldos")
+        print("3 - Detalhes de uma tarefa")
+        print("4 - Cancelar tarefa")
+        
+        opcao = input("Escolha uma opção (Enter para voltar): ").strip()
+        if not opcao:
+            return
+        if opcao == '1':
+            caminho = input("Arquivo CSV (Enter para 'contas.csv'): ").strip() or 'contas.csv'
+            agencia = input("Agência (Enter para todas): ").strip() or None
+            if agencia is not None and agencia not in self._agencias:
+                print("❌ Agência não encontrada!")
+                return
+            self._gravar('contas', *([agencia] if agencia else []))
+            self._submeter_tarefa('exportar_contas', tarefas.exportar_contas, self, caminho, agencia)
+        elif opcao == '2':
+            self._gravar('conciliar')
+            self._submeter_tarefa('conciliacao', tarefas.conciliar_saldos, self)
+        elif opcao in ('3', '4'):
+            try:
+                identificador = int(input("Número da tarefa: "))
+            except ValueError:
+                print("❌ Número inválido!")
+                return
+            tarefa = self._tarefas.tarefa(identificador)
+            if tarefa is None:
+                print("❌ Tarefa não encontrada!")
+            elif opcao == '3':
+                self._exibir_tarefa(tarefa, detalhes=True)
+            elif self._tarefas.cancelar(identificador):
+                print(f"✅ Cancelamento da tarefa #{identificador} solicitado")
+            else:
+                print("❌ A tarefa já terminou!")
+        else:
+            print("❌ Opção inválida!")
+    
     def executar(self):
         """Executa o sistema bancário"""
         print("=" * 50)
@@ -615,6 +2189,7 @@ class SistemaBancario:
         print("=" * 50)
         
         while True:
+            self.executar_agendamentos()
             print("\n" + "=" * 45)
             print("         MENU PRINCIPAL")
             print("=" * 45)
@@ -625,6 +2200,14 @@ class SistemaBancario:
             print("5 - Extrato")
             print("6 - Listar contas (Iterador)")
             print("7 - Relatório de transações (Gerador)")
+            print("8 - Transferência")
+            print("9 - Métricas")
+            print("10 - Contas por agência")
+            print("11 - Cadastro de clientes em lote")
+            print("12 - Fechamento diário")
+            print("13 - Extratos em lote")
+            print("14 - Agendamentos")
+            print("15 - Tarefas em segundo plano")
             print("0 - Sair")
             print("=" * 45)
             
@@ -648,7 +2231,24 @@ class SistemaBancario:
                 self.listar_contas()
             elif opcao == 7:
                 self.gerar_relatorio_transacoes()
+            elif opcao == 8:
+                self.realizar_transferencia()
+            elif opcao == 9:
+                self.exibir_metricas()
+            elif opcao == 10:
+                self.listar_contas_agencia()
+            elif opcao == 11:
+                self.cadastrar_clientes_lote()
+            elif opcao == 12:
+                self.executar_fechamento_diario()
+            elif opcao == 13:
+                self.gerar_extratos_lote()
+            elif opcao == 14:
+                self.gerenciar_agendamentos()
+            elif opcao == 15:
+                self.gerenciar_tarefas()
             elif opcao == 0:
+                self.fechar()
                 print("\n👋 Saindo do sistema bancário...")
                 print("Obrigado por usar nossos serviços!")
                 print("Até logo!")
@@ -661,5 +2261,34 @@ class SistemaBancario:
 
 # Execução do programa
 if __name__ == "__main__":
-    sistema = SistemaBancario()
+    import argparse
+    import sys
+    from roteiro import GravadorSessao, executar_roteiro
+    
+    parser = argparse.ArgumentParser(description="Sistema bancário POO")
+    parser.add_argument("--roteiro", metavar="ARQUIVO",
+                        help="executa os comandos do arquivo ('-' para a entrada padrão) sem menu, "
+                             "com um resultado JSON por linha")
+    parser.add_argument("--parar-no-erro", action="store_true", help="interrompe o roteiro no primeiro erro")
+    parser.add_argument("--gravar", metavar="ARQUIVO", help="grava as operações da sessão interativa como roteiro")
+    args = parser.parse_args()
+    
+    rastreamento.configurar_por_ambiente()
+    operacoes_lentas.configurar_por_ambiente()
+    persistencia = persistencia_por_ambiente()
+    sistema = SistemaBancario(modelo_leitura=ModeloLeitura(),
+                              armazenamento_historico=armazenamento_por_ambiente(),
+                              estagio_risco=EstagioRisco(),
+                              persistencia=persistencia,
+                              feed_transacoes=feed_por_ambiente(persistencia),
+                              gravador_sessao=GravadorSessao(args.gravar) if args.gravar else None,
+                              diario_agendamentos=os.environ.get('BANCO_AGENDAMENTOS'),
+                              limite_atrasadas=limite_atrasadas_por_ambiente())
+    sistema.carregar_persistencia(preguicoso=bool(os.environ.get('BANCO_SQLITE_PREGUICOSO')))
+    if args.roteiro:
+        sucesso = executar_roteiro(sistema, args.roteiro, parar_no_erro=args.parar_no_erro)
+        sistema.fechar()
+        sys.exit(0 if sucesso else 1)
+    # No menu os vencimentos não esperam a próxima opção: a thread do agendador os executa na hora
+    sistema.agendador.iniciar()
     sistema.executar()
\ No newline at end of file
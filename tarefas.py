@@ -0,0 +1,260 @@
+"""Tarefas em segundo plano do sistema bancário.
+
+Relatórios, exportações e conciliações longas rodam num pool de threads
+enquanto o menu continua atendendo saques e depósitos. Cada tarefa tem
+estado, progresso e cancelamento cooperativo: a função da tarefa chama
+tarefa.informar() a cada bloco, e é ali que um pedido de cancelamento a
+interrompe. As tarefas escrevem em arquivo, nunca no terminal, para não se
+misturar ao menu; o resultado fica na tarefa.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import itertools
+import threading
+import time
+
+import metricas
+
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluída'
+FALHOU = 'falhou'
+CANCELADA = 'cancelada'
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+PASSO_PROGRESSO = 500  # Itens entre duas chamadas a informar() nas tarefas deste módulo
+
+
+class TarefaCancelada(Exception):
+    """Levantada em tarefa.informar() quando o cancelamento foi pedido"""
+
+
+class Tarefa:
+    """Uma tarefa submetida ao gerenciador: estado, progresso e resultado"""
+
+    def __init__(self, id, nome):
+        self.id = id
+        self.nome = nome
+        self.estado = PENDENTE
+        self.feitos = 0
+        self.total = None
+        self.resultado = None
+        self.erro = None
+        self.criada = time.time()
+        self.inicio = None
+        self.fim = None
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelar.is_set()
+
+    @property
+    def percentual(self):
+        return 100.0 * self.feitos / self.total if self.total else None
+
+    @property
+    def duracao(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fim or time.time()) - self.inicio
+
+    def informar(self, feitos, total=None):
+        """Atualiza o progresso; levanta TarefaCancelada se o cancelamento foi pedido"""
+        self.feitos = feitos
+        if total is not None:
+            self.total = total
+        if self._cancelar.is_set():
+            raise TarefaCancelada()
+
+
+class GerenciadorTarefas:
+    """Pool de threads para as tarefas longas, com a lista das tarefas recentes"""
+
+    def __init__(self, trabalhadores=2, historico=50, registrar_metricas=True):
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="tarefa")
+        self._historico = historico  # Tarefas terminadas mantidas na lista
+        self._tarefas = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        if registrar_metricas:
+            metricas.registro.medidor('tarefas_ativas', lambda gerenciador: len(gerenciador.tarefas(ativas=True)),
+                                      "Tarefas em segundo plano pendentes ou em execução", dono=self)
+
+    def submeter(self, nome, funcao, *args, **kwargs):
+        """Agenda funcao(tarefa, *args, **kwargs) no pool; retorna a Tarefa"""
+        with self._lock:
+            tarefa = Tarefa(next(self._ids), nome)
+            self._tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+        tarefa._futuro = self._executor.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        if tarefa.cancelamento_pedido:
+            tarefa.estado = CANCELADA
+            return
+        tarefa.inicio = time.time()
+        tarefa.estado = EXECUTANDO
+        inicio = time.perf_counter_ns()
+        try:
+            tarefa.resultado = funcao(tarefa, *args, **kwargs)
+            tarefa.estado = CONCLUIDA
+        except TarefaCancelada:
+            tarefa.estado = CANCELADA
+        except Exception as erro:
+            tarefa.erro = f"{type(erro).__name__}: {erro}"
+            tarefa.estado = FALHOU
+        finally:
+            tarefa.fim = time.time()
+        resultado = {CONCLUIDA: 'sucesso', CANCELADA: 'rejeitado'}.get(tarefa.estado, 'erro')
+        metricas.registro.observar(f"tarefa_{tarefa.nome}", time.perf_counter_ns() - inicio, resultado)
+
+    def _descartar_antigas(self):
+        terminadas = [tarefa for tarefa in self._tarefas.values() if tarefa.estado not in ATIVOS]
+        for tarefa in terminadas[:max(0, len(terminadas) - self._historico)]:
+            del self._tarefas[tarefa.id]
+
+    def tarefa(self, identificador):
+        with self._lock:
+            return self._tarefas.get(identificador)
+
+    def tarefas(self, ativas=False):
+        """Tarefas recentes, da mais antiga à mais nova (só as pendentes e em execução, se ativas)"""
+        with self._lock:
+            return [tarefa for tarefa in self._tarefas.values() if not ativas or tarefa.estado in ATIVOS]
+
+    def cancelar(self, identificador):
+        """Pede o cancelamento; retorna False se a tarefa não existe ou já terminou"""
+        tarefa = self.tarefa(identificador)
+        if tarefa is None or tarefa.estado not in ATIVOS:
+            return False
+        tarefa._cancelar.set()
+        if tarefa._futuro is not None and tarefa._futuro.cancel():
+            tarefa.estado = CANCELADA  # Nem chegou a começar
+        return True
+
+    def fechar(self, cancelar=True):
+        """Encerra o pool; com cancelar, interrompe as tarefas em andamento no próximo informar()"""
+        metricas.registro.remover_medidores(self)
+        if cancelar:
+            for tarefa in self.tarefas(ativas=True):
+                self.cancelar(tarefa.id)
+        self._executor.shutdown(wait=True)
+
+
+# Tarefas
+
+def exportar_contas(tarefa, sistema, caminho, agencia=None):
+    """Grava os resumos das contas (de uma agência, se informada) em CSV"""
+    particao = sistema.agencias.get(agencia) if agencia else None
+    total = len(particao.contas) if particao is not None else len(sistema.contas)
+    tarefa.informar(0, total)
+    quantidade = 0
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['agencia', 'numero', 'titular', 'saldo', 'tipo'])
+        for resumo in sistema.resumos_contas(particao, modelo_leitura=True):
+            escritor.writerow([resumo['agencia'], resumo['numero'], resumo['titular'],
+                               f"{resumo['saldo']:.2f}", resumo['tipo']])
+            quantidade += 1
+            if quantidade % PASSO_PROGRESSO == 0:
+                tarefa.informar(quantidade)
+    tarefa.informar(quantidade)
+    return {'arquivo': caminho, 'contas': quantidade}
+
+
+def exportar_relatorio(tarefa, sistema, conta, caminho, tipo_filtro=None, inicio=None, fim=None):
+    """Grava o relatório de transações da conta (filtro e período opcionais) num arquivo texto"""
+    from sistema_bancario_POO_decoradores_relatorios_limites import sinal_transacao
+
+    if inicio is not None or fim is not None:
+        relatorio = conta.historico.gerar_relatorio(tipo_filtro, inicio, fim)
+        tarefa.informar(0)
+    else:
+        _, _, historico = sistema.dados_extrato(conta)
+        relatorio = (transacao for transacao in historico
+                     if tipo_filtro is None or transacao['tipo'] == tipo_filtro)
+        # Com filtro o total de linhas só se conhece no fim
+        tarefa.informar(0, len(historico) if tipo_filtro is None else None)
+    quantidade = 0
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(f"RELATÓRIO DE TRANSAÇÕES - Ag {conta.agencia} - Conta {conta.numero}\n")
+        if tipo_filtro:
+            arquivo.write(f"Filtro: {tipo_filtro}\n")
+        for transacao in relatorio:
+            quantidade += 1
+            arquivo.write(f"{quantidade:2d}. {transacao['tipo']}: {sinal_transacao(transacao)}R$ "
+                          f"{transacao['valor']:.2f} - {transacao['data']}\n")
+            if quantidade % PASSO_PROGRESSO == 0:
+                tarefa.informar(quantidade)
+        arquivo.write(f"Total de transações: {quantidade}\n")
+    tarefa.informar(quantidade)
+    return {'arquivo': caminho, 'transacoes': quantidade}
+
+
+def gerar_extratos(tarefa, sistema, diretorio, inicio=None, fim=None):
+    """Extratos em lote (extratos_lote.py) com o progresso da tarefa no lugar do terminal"""
+    from extratos_lote import ExtratosLote
+
+    # O cancelamento interrompe a distribuição de partições; as já enviadas terminam
+    estatisticas = ExtratosLote(sistema, diretorio, inicio=inicio, fim=fim,
+                                progresso=lambda feitas, total, _: tarefa.informar(feitas, total)).executar()
+    return {'arquivos': len(estatisticas['arquivos']), 'contas': estatisticas['contas'],
+            'transacoes': estatisticas['transacoes']}
+
+
+def _divergencia(conta, tolerancia, sinal_transacao):
+    # Saldo e visão do histórico no mesmo instante; a soma é feita fora do lock
+    with conta.lock:
+        saldo = conta.saldo
+        historico = conta.historico.visao()
+    calculado = sum(transacao['valor'] if sinal_transacao(transacao) == '+' else -transacao['valor']
+                    for transacao in historico)
+    if abs(calculado - saldo) > tolerancia:
+        return {'agencia': conta.agencia, 'numero': conta.numero, 'saldo': saldo, 'historico': round(calculado, 2)}
+    return None
+
+
+def conciliar_saldos(tarefa, sistema, tolerancia=0.005):
+    """Confere o saldo de cada conta com a soma do seu histórico; retorna as divergências"""
+    from sistema_bancario_POO_decoradores_relatorios_limites import sinal_transacao
+
+    if sistema.persistencia is not None:
+        return _conciliar_no_banco(tarefa, sistema, tolerancia, sinal_transacao)
+
+    contas = sistema.contas
+    tarefa.informar(0, len(contas))
+    divergencias = []
+    for indice, conta in enumerate(contas, 1):
+        divergencia = _divergencia(conta, tolerancia, sinal_transacao)
+        if divergencia is not None:
+            divergencias.append(divergencia)
+        if indice % PASSO_PROGRESSO == 0:
+            tarefa.informar(indice)
+    tarefa.informar(len(contas))
+    return {'contas': len(contas), 'divergencias': divergencias}
+
+
+def _conciliar_no_banco(tarefa, sistema, tolerancia, sinal_transacao):
+    """Soma os históricos no banco e só carrega as contas suspeitas, sem percorrer sistema.contas"""
+    persistencia = sistema.persistencia
+    persistencia.confirmar()  # A soma inclui as escritas desta sessão
+    total = persistencia.contar_contas()
+    tarefa.informar(0, total)
+    suspeitas = persistencia.divergencias_saldo(tolerancia)
+    divergencias = []
+    for indice, (agencia, numero, _saldo, _calculado) in enumerate(suspeitas, 1):
+        # Uma operação entre a gravação do saldo e a do histórico pode parecer divergência:
+        # a conta suspeita é conferida de novo na memória, sob o seu lock
+        conta = sistema.buscar_conta(agencia, numero)
+        divergencia = _divergencia(conta, tolerancia, sinal_transacao) if conta is not None else None
+        if divergencia is not None:
+            divergencias.append(divergencia)
+        if indice % PASSO_PROGRESSO == 0:
+            tarefa.informar(indice)
+    tarefa.informar(total)
+    return {'contas': total, 'divergencias': divergencias}
@@ -0,0 +1,53 @@
+"""Fixtures compartilhadas: clientes com CPF válido e sistemas sem métricas globais."""
+
+import pytest
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+import validacao
+
+
+def criar_cliente(indice):
+    base = f"{indice:09d}"
+    return banco.PessoaFisicaCliente(f"Cliente {indice}", "01/01/1990",
+                                     base + validacao.digitos_verificadores_cpf(base),
+                                     "Rua A, 1 - Centro - Recife/PE")
+
+
+@pytest.fixture
+def novo_sistema():
+    """Fábrica de SistemaBancario; os sistemas ainda abertos são fechados no fim do teste.
+
+    novo_sistema.encerrar(sistema) fecha um sistema no meio do teste (para simular um reinício).
+    """
+    criados = []
+
+    def fabricar(**kwargs):
+        sistema = banco.SistemaBancario(registrar_metricas=False, **kwargs)
+        criados.append(sistema)
+        return sistema
+
+    def encerrar(sistema):
+        criados.remove(sistema)
+        sistema.fechar()
+
+    fabricar.encerrar = encerrar
+    yield fabricar
+    for sistema in criados:
+        sistema.fechar()
+
+
+@pytest.fixture
+def abrir_contas():
+    """Cadastra um cliente por conta e abre as contas com o saldo inicial informado"""
+    def abrir(sistema, quantidade, saldo=0.0, inicio=1):
+        clientes = [criar_cliente(indice) for indice in range(inicio, inicio + quantidade)]
+        sistema.adicionar_clientes(clientes)
+        contas = []
+        for cliente in clientes:
+            conta = sistema.abrir_conta_corrente(cliente)
+            if saldo:
+                cliente.realizar_transacao(conta, banco.Deposito(saldo))
+            contas.append(conta)
+        return contas
+
+    return abrir
@@ -0,0 +1,61 @@
+"""Agências: partições de contas com numeração própria, alocada em blocos por thread."""
+
+import threading
+
+import pytest
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from tests.conftest import criar_cliente
+
+
+def test_cada_agencia_numera_e_guarda_as_proprias_contas(novo_sistema):
+    sistema = novo_sistema(agencias=('0001', '0002'))
+    clientes = [criar_cliente(indice) for indice in range(1, 4)]
+    sistema.adicionar_clientes(clientes)
+
+    primeira = sistema.abrir_conta_corrente(clientes[0], agencia='0001')
+    outra = sistema.abrir_conta_corrente(clientes[1], agencia='0002')
+    segunda = sistema.abrir_conta_corrente(clientes[2], agencia='0001')
+    clientes[2].realizar_transacao(segunda, banco.Deposito(40))
+
+    assert [(conta.agencia, conta.numero) for conta in (primeira, outra, segunda)] == \
+        [('0001', 1), ('0002', 1), ('0001', 2)]
+    assert sistema.buscar_conta('0002', 1) is outra
+    assert sistema.buscar_conta('0003', 1) is None
+    assert sistema.agencias['0001'].resumo() == {'agencia': '0001', 'contas': 2, 'saldo_total': 40,
+                                                 'transacoes': 1}
+    with pytest.raises(ValueError):
+        sistema.abrir_conta_corrente(clientes[0], agencia='0003')
+
+
+def test_alocador_nao_repete_numeros_entre_threads():
+    alocador = banco.AlocadorNumeros(tamanho_bloco=8)
+    numeros = []
+    lock = threading.Lock()
+
+    def alocar():
+        locais = [alocador.proximo() for _ in range(50)]
+        with lock:
+            numeros.extend(locais)
+
+    threads = [threading.Thread(target=alocar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(numeros)) == 200
+
+
+def test_reserva_empurra_os_blocos_seguintes():
+    alocador = banco.AlocadorNumeros(tamanho_bloco=8)
+    assert alocador.proximo() == 1
+
+    alocador.reservar_ate(50)
+    numeros = []
+    thread = threading.Thread(target=lambda: numeros.append(alocador.proximo()))
+    thread.start()
+    thread.join()
+
+    assert numeros == [51]
+    assert alocador.proximo() == 2
@@ -0,0 +1,79 @@
+"""Agendamentos: diário entre reinícios, recuperação de atrasados e a thread em segundo plano."""
+
+import time
+
+from agendamentos import DEPOSITO, Agendador
+
+INICIO = 1_700_000_000.0
+DIA = 86400.0
+
+
+def _agendador(sistema, **kwargs):
+    kwargs.setdefault('registrar_metricas', False)
+    return Agendador(sistema, **kwargs)
+
+
+def test_diario_preserva_o_avanco_entre_reinicios(novo_sistema, abrir_contas, tmp_path):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1)
+    diario = str(tmp_path / "agendamentos.jsonl")
+    agendador = _agendador(sistema, diario=diario)
+    identificador = agendador.agendar(conta, DEPOSITO, 10, INICIO, intervalo=DIA, repeticoes=3)
+    assert agendador.executar_vencidos(INICIO)['executados'] == 1
+    agendador.fechar()
+
+    reiniciado = _agendador(sistema, diario=diario)
+
+    agendamento, = reiniciado.pendentes()
+    assert (agendamento.id, agendamento.instante, agendamento.restantes) == (identificador, INICIO + DIA, 2)
+    assert reiniciado.executar_vencidos(INICIO)['executados'] == 0  # No máximo uma vez por ocorrência
+    assert reiniciado.agendar(conta, DEPOSITO, 5, INICIO) == identificador + 1
+    reiniciado.fechar()
+    assert conta.saldo == 10
+
+
+def test_recorrente_atrasado_executa_no_maximo_limite_atrasadas_vezes(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1)
+    agrupado = _agendador(sistema)
+    agrupado.agendar(conta, DEPOSITO, 1, INICIO, intervalo=10)
+    todas = _agendador(sistema, limite_atrasadas=None)
+    todas.agendar(conta, DEPOSITO, 100, INICIO, intervalo=10)
+
+    assert agrupado.executar_vencidos(INICIO + 35)['executados'] == 1
+    assert todas.executar_vencidos(INICIO + 35)['executados'] == 4
+    assert agrupado.pendentes()[0].instante == INICIO + 40
+    assert conta.saldo == 401
+
+
+def test_thread_sobrevive_a_uma_falha_e_nao_imprime_no_terminal(novo_sistema, abrir_contas, capsys):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1)
+    capsys.readouterr()
+    agendador = _agendador(sistema, relogio=lambda: INICIO)
+    original = agendador.executar_vencidos
+    chamadas = []
+
+    def falhar_na_primeira(agora=None):
+        chamadas.append(agora)
+        if len(chamadas) == 1:
+            raise RuntimeError("banco indisponível")
+        return original(agora)
+
+    agendador.executar_vencidos = falhar_na_primeira
+    agendador.agendar(conta, DEPOSITO, 25, INICIO)
+    agendador.iniciar(espera_maxima=0.01)
+    try:
+        executados = 0
+        limite = time.monotonic() + 5
+        while not executados and time.monotonic() < limite:
+            executados = agendador.resultado_em_segundo_plano()['executados']
+            time.sleep(0.01)
+    finally:
+        agendador.fechar()
+
+    assert executados == 1 and conta.saldo == 25
+    mensagens = agendador.mensagens_em_segundo_plano()
+    assert mensagens[0] == "⚠️ Falha ao executar agendamentos: RuntimeError: banco indisponível"
+    assert "✅ Depósito realizado com sucesso!" in mensagens
+    assert "Depósito" not in capsys.readouterr().out
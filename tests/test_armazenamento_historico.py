@@ -0,0 +1,54 @@
+"""Camada fria do histórico: descarga em segmentos gzip e índice reconstruído ao reiniciar."""
+
+from types import SimpleNamespace
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from armazenamento_historico import ArmazenamentoHistorico
+
+
+def _entrada(valor, dia):
+    return {'tipo': 'Deposito', 'valor': valor, 'data': f"{dia:02d}/01/2024 10:00:00"}
+
+
+def test_entradas_antigas_vao_para_segmentos_e_continuam_no_extrato(tmp_path, novo_sistema, abrir_contas):
+    sistema = novo_sistema(armazenamento_historico=ArmazenamentoHistorico(str(tmp_path), janela_quente=2))
+    conta, = abrir_contas(sistema, 1)
+    for valor in range(1, 7):
+        conta.cliente.realizar_transacao(conta, banco.Deposito(valor))
+
+    conta.historico.descarregar()
+
+    camada = conta.historico.camada_fria
+    assert camada.quantidade == 4
+    assert all(segmento.caminho.startswith(str(tmp_path)) for segmento in camada.segmentos)
+    assert [transacao['valor'] for transacao in conta.historico.gerar_relatorio()] == [1, 2, 3, 4, 5, 6]
+    assert conta.saldo == 21
+
+
+def test_segmentos_em_disco_voltam_ao_indice_depois_do_reinicio(tmp_path):
+    conta = SimpleNamespace(agencia='0001', numero=7)
+    ArmazenamentoHistorico(str(tmp_path)).camada(conta).gravar([_entrada(1, 3), _entrada(2, 5)])
+
+    camada = ArmazenamentoHistorico(str(tmp_path)).camada(conta)
+
+    segmento, = camada.segmentos
+    assert (segmento.inicio, segmento.fim, segmento.quantidade) == ('2024010310:00:00', '2024010510:00:00', 2)
+    assert [entrada['valor'] for entrada in camada.entradas('2024010400:00:00')] == [2]
+    novo = camada.gravar([_entrada(3, 6)])
+    assert novo.caminho.endswith('0001_7_000002.jsonl.gz')
+    assert camada.quantidade == 3
+
+
+def test_conta_aberta_de_novo_apaga_segmentos_da_execucao_anterior(tmp_path, novo_sistema, abrir_contas):
+    anterior = novo_sistema(armazenamento_historico=ArmazenamentoHistorico(str(tmp_path), janela_quente=1))
+    conta, = abrir_contas(anterior, 1, saldo=50)
+    conta.cliente.realizar_transacao(conta, banco.Deposito(25))
+    conta.historico.descarregar()
+    novo_sistema.encerrar(anterior)
+    assert list(tmp_path.iterdir())
+
+    sistema = novo_sistema(armazenamento_historico=ArmazenamentoHistorico(str(tmp_path), janela_quente=1))
+    conta, = abrir_contas(sistema, 1, saldo=10)
+
+    assert [transacao['valor'] for transacao in conta.historico.gerar_relatorio()] == [10]
+    assert not list(tmp_path.iterdir())
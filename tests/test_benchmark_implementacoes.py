@@ -0,0 +1,27 @@
+"""Benchmark diferencial: todas as gerações concordam com o modelo de referência."""
+
+import pytest
+
+import benchmark_implementacoes as benchmark
+
+
+@pytest.mark.parametrize('implementacao', benchmark.IMPLEMENTACOES, ids=lambda implementacao: implementacao.nome)
+def test_implementacao_confere_com_a_referencia(implementacao):
+    roteiro = benchmark.gerar_roteiro(40, semente=3)
+    modos = ['entrada'] + (['direto'] if implementacao.nome in benchmark.DIRETOS else [])
+
+    for modo in modos:
+        linha = benchmark.medir(implementacao, roteiro, modo)
+        assert linha['resultado'] == "OK", (modo, linha['resultado'])
+        assert linha['ops_por_segundo'] > 0
+
+
+def test_referencia_aplica_limites_de_saque_e_do_dia():
+    roteiro = [('saque', 600), ('saque', 100), ('deposito', -5), ('saque', 100), ('saque', 100), ('saque', 100),
+               ('deposito', 50)]
+
+    saldo, extrato = benchmark.simular_referencia(roteiro)
+    assert saldo == 750 and len(extrato) == 5
+
+    saldo, extrato = benchmark.simular_referencia(roteiro, limite_transacoes_diarias=3)
+    assert saldo == 800 and len(extrato) == 3
@@ -0,0 +1,56 @@
+"""Busca de contas: número, CPF, prefixo do nome e busca aproximada por trigramas."""
+
+from busca_contas import IndiceContas, normalizar_nome
+from tests.conftest import criar_cliente
+
+
+def _indice():
+    indice = IndiceContas()
+    for numero, titular in enumerate(['João Lima', 'Joana Souza', 'Maria Lima', 'Joao Lima', 'Pedro Alves'], 1):
+        indice.adicionar('0001', numero, titular)
+    indice.adicionar('0002', 1, 'Ana Costa')
+    return indice
+
+
+def _numeros(resultado):
+    return [(item['agencia'], item['numero']) for item in resultado['itens']]
+
+
+def test_nome_normalizado_ignora_acentos_caixa_e_espacos():
+    assert normalizar_nome('  JOÃO   Lima ') == 'joao lima'
+
+
+def test_prefixo_ignora_acentos_e_pagina_em_ordem_alfabetica():
+    indice = _indice()
+
+    primeira = indice.buscar('jo', por_pagina=2)
+    segunda = indice.buscar('JO', pagina=2, por_pagina=2)
+
+    assert (primeira['modo'], primeira['total'], primeira['paginas']) == ('prefixo', 3, 2)
+    assert _numeros(primeira) + _numeros(segunda) == [('0001', 2), ('0001', 1), ('0001', 4)]
+
+
+def test_numero_com_e_sem_agencia():
+    indice = _indice()
+
+    assert _numeros(indice.buscar('1')) == [('0001', 1), ('0002', 1)]
+    assert _numeros(indice.buscar('0002/1')) == [('0002', 1)]
+
+
+def test_erro_de_digitacao_cai_na_busca_aproximada():
+    resultado = _indice().buscar('pedor alves')
+
+    assert resultado['modo'] == 'aproximada'
+    assert _numeros(resultado) == [('0001', 5)]
+
+
+def test_sistema_indexa_contas_abertas_e_busca_por_cpf(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, outra = abrir_contas(sistema, 2)
+    sistema.abrir_conta_corrente(conta.cliente)
+
+    resultado = sistema.indice_contas.buscar(criar_cliente(1).cpf, sistema=sistema)
+
+    assert resultado['modo'] == 'cpf'
+    assert _numeros(resultado) == [(conta.agencia, conta.numero), (conta.agencia, 3)]
+    assert _numeros(sistema.indice_contas.buscar('Cliente 2')) == [(outra.agencia, outra.numero)]
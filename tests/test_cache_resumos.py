@@ -0,0 +1,31 @@
+"""Cache de resumos das listagens: só as contas com versão nova são refeitas."""
+
+import pytest
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+
+
+def test_so_a_conta_alterada_e_refeita(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, outra, terceira = abrir_contas(sistema, 3, saldo=100)
+    cache = banco.CacheResumos()
+    primeira = [cache.resumo(c) for c in sistema.contas]
+
+    conta.cliente.realizar_transacao(conta, banco.Saque(30))
+    segunda = [cache.resumo(c) for c in sistema.contas]
+
+    assert cache.refeitos == 4
+    assert segunda[1] is primeira[1] and segunda[2] is primeira[2]
+    assert (primeira[0]['saldo'], segunda[0]['saldo']) == (100, 70)
+
+
+def test_resumo_em_cache_e_somente_leitura(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1, saldo=100)
+    resumo = banco.CacheResumos().resumo(conta)
+
+    with pytest.raises(TypeError):
+        resumo['saldo'] = 0
+
+    assert dict(resumo) == {'agencia': conta.agencia, 'numero': conta.numero, 'titular': conta.cliente.nome,
+                            'saldo': 100, 'tipo': 'ContaCorrente'}
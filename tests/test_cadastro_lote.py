@@ -0,0 +1,65 @@
+"""Validação de CPF e cadastro em lote de clientes."""
+
+import csv
+
+import pytest
+
+import cadastro_lote
+import validacao
+from cadastro_lote import CadastroLote
+from persistencia_sqlite import BancoSQLite
+
+
+@pytest.mark.parametrize('cpf', ['52998224725', '529.982.247-25'])
+def test_cpf_valido(cpf):
+    assert validacao.cpf_valido(validacao.normalizar_cpf(cpf))
+
+
+@pytest.mark.parametrize('cpf', ['52998224726', '11111111111', '5299822472', '²2345678901', '٥2998224725', ''])
+def test_cpf_invalido_nao_levanta(cpf):
+    assert not validacao.cpf_valido(cpf)
+
+
+def _gravar_csv(caminho, linhas):
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(cadastro_lote.CAMPOS)
+        escritor.writerows(linhas)
+
+
+LINHAS = [
+    ('Maria Souza', '01/02/1990', '529.982.247-25', 'Rua A', '10', 'Centro', 'Recife', 'pe'),
+    ('Maria Repetida', '01/02/1990', '52998224725', 'Rua A', '10', 'Centro', 'Recife', 'PE'),
+    ('João', '01/02/1990', '52998224726', 'Rua B', '1', 'Centro', 'Recife', 'PE'),
+    ('Ana', '31/02/1990', '11144477735', 'Rua C', '2', 'Centro', 'Recife', 'PE'),
+    ('Rui', '01/02/1990', '98765432100', 'Rua D', '3', 'Centro', 'Recife', 'XX'),
+]
+
+
+def test_cadastro_valida_deduplica_e_relata(novo_sistema, tmp_path):
+    entrada, rejeicoes = tmp_path / "clientes.csv", tmp_path / "rejeitados.csv"
+    _gravar_csv(entrada, LINHAS)
+    sistema = novo_sistema()
+
+    estatisticas = CadastroLote(sistema, processos=1, abrir_contas=True).executar([str(entrada)], str(rejeicoes))
+
+    assert (estatisticas['lidos'], estatisticas['cadastrados']) == (5, 1)
+    assert estatisticas['rejeitados'] == {'cpf_duplicado': 1, 'cpf_invalido': 1, 'data_invalida': 1,
+                                          'uf_invalida': 1}
+    cliente = sistema.buscar_cliente_por_cpf('52998224725')
+    assert cliente.endereco.endswith('Recife/PE') and len(cliente.contas) == 1
+    with open(rejeicoes, encoding='utf-8') as arquivo:
+        assert len(list(csv.reader(arquivo))) == 5
+
+
+def test_linha_de_comando_grava_no_banco(tmp_path, monkeypatch, capsys):
+    entrada, caminho = tmp_path / "clientes.csv", str(tmp_path / "banco.db")
+    _gravar_csv(entrada, LINHAS[:1])
+    for _ in range(2):  # Na segunda vez o CPF já está no banco
+        monkeypatch.setattr('sys.argv', ['cadastro_lote.py', str(entrada), '--banco', caminho, '--processos', '1'])
+        cadastro_lote.main()
+
+    assert "0 de 1 clientes cadastrados" in capsys.readouterr().out
+    banco = BancoSQLite(caminho)
+    assert banco.contar_clientes() == 1
+    banco.fechar()
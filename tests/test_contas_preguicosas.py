@@ -0,0 +1,72 @@
+"""Contas preguiçosas: carga sob demanda, descarga LRU e acesso sem lock global."""
+
+import builtins
+import gc
+import threading
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from persistencia_sqlite import BancoSQLite
+
+
+def _banco_preguicoso(novo_sistema, abrir_contas, caminho, contas=12, capacidade=3):
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho))
+    abrir_contas(sistema, contas, saldo=100)
+    novo_sistema.encerrar(sistema)
+    preguicoso = novo_sistema(persistencia=BancoSQLite(caminho))
+    assert preguicoso.carregar_persistencia(preguicoso=True, capacidade=capacidade) == contas
+    return preguicoso
+
+
+def test_contas_preguicosas_respeitam_a_capacidade(novo_sistema, abrir_contas, tmp_path):
+    preguicoso = _banco_preguicoso(novo_sistema, abrir_contas, str(tmp_path / "banco.db"))
+    gc.collect()  # Só as contas do sistema preguiçoso devem continuar vivas
+    assert preguicoso.registro.carregadas == 0
+
+    for conta in preguicoso.contas:
+        conta.cliente.realizar_transacao(conta, banco.Saque(10))
+        assert preguicoso.registro.carregadas <= 3
+    gc.collect()
+
+    assert sum(1 for objeto in gc.get_objects() if type(objeto) is banco.ContaCorrente) <= 3
+    # Descarregada e recarregada do banco, cada conta mantém o saque
+    assert [round(conta.saldo, 2) for conta in preguicoso.contas] == [90.0] * 12
+
+
+def test_conta_usada_ganha_segunda_chance(novo_sistema, abrir_contas, tmp_path):
+    preguicoso = _banco_preguicoso(novo_sistema, abrir_contas, str(tmp_path / "banco.db"), contas=5)
+    contas = list(preguicoso.contas)
+    for conta in contas[:3]:
+        conta.saldo
+    contas[0].saldo  # A mais antiga é usada de novo antes da próxima carga
+
+    contas[3].saldo
+
+    assert contas[0].carregada
+    assert not contas[1].carregada
+
+
+def test_acesso_a_conta_carregada_nao_usa_o_lock_do_registro(novo_sistema, abrir_contas, tmp_path):
+    preguicoso = _banco_preguicoso(novo_sistema, abrir_contas, str(tmp_path / "banco.db"), contas=2)
+    conta = preguicoso.contas[0]
+    conta.saldo
+    resultado = []
+
+    with preguicoso.registro._lock:
+        leitor = threading.Thread(target=lambda: resultado.append(conta.saldo))
+        leitor.start()
+        leitor.join(timeout=5)
+
+    assert resultado == [100.0]
+
+
+def test_extrato_de_conta_preguicosa_mostra_os_limites(novo_sistema, abrir_contas, tmp_path, monkeypatch, capsys):
+    preguicoso = _banco_preguicoso(novo_sistema, abrir_contas, str(tmp_path / "banco.db"), contas=2)
+    conta = preguicoso.contas[0]
+    monkeypatch.setattr(preguicoso, 'selecionar_conta', lambda: conta)
+    monkeypatch.setattr(builtins, 'input', lambda *_: '')
+
+    preguicoso.exibir_extrato()
+
+    saida = capsys.readouterr().out
+    assert "Saques realizados hoje: 0/3" in saida
+    assert "Transações realizadas hoje: 1/10" in saida
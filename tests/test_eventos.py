@@ -0,0 +1,60 @@
+"""Event sourcing: replay dos eventos, snapshots e truncamento dos eventos já cobertos."""
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from eventos import LojaEventos
+
+
+def _movimentar(contas):
+    origem, destino = contas
+    for valor in (100, 50, 25):
+        origem.cliente.realizar_transacao(origem, banco.Deposito(valor))
+    origem.cliente.realizar_transacao(origem, banco.Saque(30))
+    origem.cliente.realizar_transacao(origem, banco.Transferencia(45, destino))
+
+
+def test_replay_reconstroi_o_estado_vivo(novo_sistema, abrir_contas):
+    loja = LojaEventos(intervalo_snapshot=3)
+    sistema = novo_sistema(loja_eventos=loja)
+    contas = abrir_contas(sistema, 2)
+    _movimentar(contas)
+
+    for conta in contas:
+        auditoria = loja.auditar(conta)
+        assert auditoria['consistente'], auditoria
+    assert (loja.reconstruir(contas[0].agencia, contas[0].numero).saldo, contas[1].saldo) == (100, 45)
+    # Um registro por evento: o log global é a intercalação dos fluxos das contas
+    por_conta = [loja.eventos_da_conta(conta.agencia, conta.numero) for conta in contas]
+    sequencias = [evento.sequencia for evento in loja.eventos()]
+    assert len(loja) == sum(map(len, por_conta)) == len(sequencias)
+    assert sequencias == list(range(1, len(sequencias) + 1))
+    assert [evento.sequencia for evento in loja.eventos(desde_sequencia=4)] == sequencias[4:]
+
+
+def test_truncar_descarta_so_o_que_o_snapshot_cobre(novo_sistema, abrir_contas):
+    loja = LojaEventos(intervalo_snapshot=3)
+    sistema = novo_sistema(loja_eventos=loja)
+    contas = abrir_contas(sistema, 2)
+    _movimentar(contas)
+    origem = contas[0]
+    eventos_antes = loja.eventos_da_conta(origem.agencia, origem.numero)
+
+    descartados = loja.truncar()
+
+    restantes = loja.eventos_da_conta(origem.agencia, origem.numero)
+    assert descartados > 0 and len(restantes) < 3
+    assert restantes == eventos_antes[len(eventos_antes) - len(restantes):]
+    assert all(loja.auditar(conta)['consistente'] for conta in contas)
+    assert loja.truncar() == 0
+    origem.cliente.realizar_transacao(origem, banco.Deposito(5))
+    assert loja.reconstruir(origem.agencia, origem.numero).saldo == 105
+
+
+def test_truncar_no_snapshot_limita_os_eventos_guardados(novo_sistema, abrir_contas):
+    loja = LojaEventos(intervalo_snapshot=4, truncar_no_snapshot=True)
+    sistema = novo_sistema(loja_eventos=loja)
+    conta, = abrir_contas(sistema, 1)
+    for _ in range(9):
+        conta.cliente.realizar_transacao(conta, banco.Deposito(10))
+
+    assert len(loja.eventos_da_conta(conta.agencia, conta.numero)) < 4
+    assert loja.reconstruir(conta.agencia, conta.numero).saldo == conta.saldo == 90
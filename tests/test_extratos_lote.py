@@ -0,0 +1,53 @@
+"""Extratos em lote: mesma saída com ou sem pool e com ou sem banco."""
+
+import os
+import re
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from extratos_lote import ExtratosLote
+from persistencia_sqlite import BancoSQLite
+
+
+def _carregar(sistema, abrir_contas):
+    contas = abrir_contas(sistema, 7, saldo=200)
+    for conta in contas[:3]:
+        conta.cliente.realizar_transacao(conta, banco.Saque(15))
+    contas[0].cliente.realizar_transacao(contas[0], banco.Transferencia(20, contas[1]))
+
+
+def _executar(sistema, diretorio, **opcoes):
+    estatisticas = ExtratosLote(sistema, str(diretorio), contas_por_particao=3, progresso=lambda *_: None,
+                                **opcoes).executar()
+    conteudo = ''.join(open(caminho, encoding='utf-8').read() for caminho in estatisticas['arquivos'])
+    return estatisticas, conteudo
+
+
+def test_pool_e_processo_unico_geram_os_mesmos_extratos(novo_sistema, abrir_contas, tmp_path):
+    sistema = novo_sistema()
+    _carregar(sistema, abrir_contas)
+
+    local, texto_local = _executar(sistema, tmp_path / "local", processos=1)
+    pool, texto_pool = _executar(sistema, tmp_path / "pool", processos=2)
+
+    assert (local['contas'], local['transacoes'], len(local['arquivos'])) == (7, 12, 3)
+    assert (pool['contas'], pool['transacoes']) == (local['contas'], local['transacoes'])
+    assert texto_pool == texto_local
+    assert "EXTRATO - Ag 0001 - Conta 1" in texto_local and "-R$ 20.00" in texto_local
+
+
+def test_filtro_de_tipo_e_banco_sqlite(novo_sistema, abrir_contas, tmp_path):
+    memoria = novo_sistema()
+    _carregar(memoria, abrir_contas)
+    persistido = novo_sistema(persistencia=BancoSQLite(str(tmp_path / "banco.db")))
+    _carregar(persistido, abrir_contas)
+
+    saques, _ = _executar(memoria, tmp_path / "saques", processos=1, tipo='Saque')
+    _, texto_memoria = _executar(memoria, tmp_path / "memoria", processos=2)
+    _, texto_banco = _executar(persistido, tmp_path / "banco", processos=2)
+
+    assert saques['transacoes'] == 3
+    # Os dois bancos foram carregados em instantes diferentes: compara sem as datas
+    sem_datas = re.compile(r' - \d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}')
+    assert sem_datas.sub('', texto_banco) == sem_datas.sub('', texto_memoria)
+    assert sorted(os.listdir(tmp_path / "banco")) == ['extratos_0000.txt', 'extratos_0001.txt',
+                                                       'extratos_0002.txt']
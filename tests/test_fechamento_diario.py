@@ -0,0 +1,100 @@
+"""Fechamento diário: no máximo uma vez por data, mesmo depois de reiniciar."""
+
+from datetime import date
+import math
+
+import fechamento_diario
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from fechamento_diario import FechamentoDiario, TabelaTarifas
+from persistencia_sqlite import BancoSQLite
+from tests.conftest import criar_cliente
+
+
+def test_segundo_fechamento_da_data_e_ignorado(novo_sistema, abrir_contas, tmp_path):
+    sistema = novo_sistema()
+    abrir_contas(sistema, 5, saldo=500)
+    hoje = date.today()
+
+    primeiro = FechamentoDiario(sistema, data_referencia=hoje, tamanho_bloco=2).executar()
+    saldos = [conta.saldo for conta in sistema.contas]
+    segundo = FechamentoDiario(sistema, data_referencia=hoje, tamanho_bloco=2).executar_paralelo(3)
+
+    assert (primeiro['processadas'], primeiro['ignoradas']) == (5, 0)
+    assert primeiro['tarifas'] > 0
+    assert (segundo['processadas'], segundo['ignoradas']) == (0, 5)
+    assert [conta.saldo for conta in sistema.contas] == saldos
+    assert all(conta.ultimo_fechamento == hoje for conta in sistema.contas)
+
+
+def test_checkpoint_retoma_sem_repetir_blocos(novo_sistema, abrir_contas, tmp_path):
+    sistema = novo_sistema()
+    abrir_contas(sistema, 4, saldo=500)
+    hoje = date.today()
+    diretorio = str(tmp_path / "checkpoints")
+
+    FechamentoDiario(sistema, data_referencia=hoje, tamanho_bloco=2, diretorio_checkpoint=diretorio).executar()
+    retomado = FechamentoDiario(sistema, data_referencia=hoje, tamanho_bloco=2,
+                                diretorio_checkpoint=diretorio).executar()
+
+    # Os blocos do checkpoint não são reprocessados: os totais são os da primeira execução
+    assert (retomado['processadas'], retomado['ignoradas']) == (4, 0)
+
+
+def test_marca_de_fechamento_sobrevive_ao_reinicio(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    hoje = date.today()
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho))
+    abrir_contas(sistema, 3, saldo=500)
+    FechamentoDiario(sistema, data_referencia=hoje).executar()
+    saldos = [round(conta.saldo, 2) for conta in sistema.contas]
+    novo_sistema.encerrar(sistema)
+
+    for preguicoso in (False, True):
+        restaurado = novo_sistema(persistencia=BancoSQLite(caminho))
+        restaurado.carregar_persistencia(preguicoso=preguicoso, capacidade=1)
+        totais = FechamentoDiario(restaurado, data_referencia=hoje).executar()
+
+        assert (totais['processadas'], totais['ignoradas']) == (0, 3)
+        assert [round(conta.saldo, 2) for conta in restaurado.contas] == saldos
+        novo_sistema.encerrar(restaurado)
+
+
+def test_conta_aberta_depois_dentro_de_faixa_concluida_ainda_fecha(novo_sistema, tmp_path):
+    sistema = novo_sistema(agencias=('0001', '0002'))
+    clientes = [criar_cliente(indice) for indice in range(1, 4)]
+    sistema.adicionar_clientes(clientes)
+    sistema.abrir_conta_corrente(clientes[0], agencia='0001')
+    sistema.abrir_conta_corrente(clientes[1], agencia='0002')
+    hoje = date.today()
+    diretorio = str(tmp_path / "checkpoints")
+    FechamentoDiario(sistema, data_referencia=hoje, diretorio_checkpoint=diretorio).executar()
+
+    # (0001, 2) fica entre as chaves do bloco já concluído, mas não foi fechada
+    nova = sistema.abrir_conta_corrente(clientes[2], agencia='0001')
+    totais = FechamentoDiario(sistema, data_referencia=hoje, diretorio_checkpoint=diretorio).executar()
+
+    assert (totais['processadas'], totais['ignoradas']) == (3, 0)
+    assert nova.ultimo_fechamento == hoje
+
+
+def test_saldo_alterado_depois_da_leitura_do_bloco_e_recalculado(novo_sistema, abrir_contas, monkeypatch):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1, saldo=500)
+    tabela = TabelaTarifas()
+    original = fechamento_diario.calcular_juros_tarifas
+    chamadas = []
+
+    def calcular_com_deposito_concorrente(saldos, tabela):
+        chamadas.append(saldos)
+        if len(chamadas) == 1:
+            # Chega depois da leitura dos saldos do bloco, antes de a conta ser travada
+            conta.cliente.realizar_transacao(conta, banco.Deposito(1000))
+        return original(saldos, tabela)
+
+    monkeypatch.setattr(fechamento_diario, 'calcular_juros_tarifas', calcular_com_deposito_concorrente)
+    totais = FechamentoDiario(sistema, tabela, data_referencia=date.today()).executar()
+
+    juros = math.floor(1500 * tabela.taxa_juros_diaria * 100) / 100
+    assert (totais['juros'], totais['tarifas']) == (juros, 0.0)
+    assert chamadas == [[500], [1500]]
+    assert conta.saldo == 1500 + juros
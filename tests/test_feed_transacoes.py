@@ -0,0 +1,60 @@
+"""Feed de mudanças: cursores das assinaturas, perdas e retomada depois de reiniciar."""
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from feed_transacoes import FeedTransacoes
+from persistencia_sqlite import BancoSQLite
+
+
+def _sistema_com_feed(novo_sistema, persistencia=None, capacidade=1024):
+    feed = FeedTransacoes(capacidade=capacidade, persistencia=persistencia, registrar_metricas=False)
+    return novo_sistema(persistencia=persistencia, feed_transacoes=feed), feed
+
+
+def test_cada_assinatura_le_do_seu_cursor(novo_sistema, abrir_contas):
+    sistema, feed = _sistema_com_feed(novo_sistema)
+    todas = feed.assinar('todas')
+    depositos = feed.assinar('depositos', tipos=['Deposito'])
+    conta, = abrir_contas(sistema, 1, saldo=100)
+    conta.cliente.realizar_transacao(conta, banco.Saque(30))
+
+    assert [mudanca.entrada['tipo'] for mudanca in todas.ler(1)] == ['Deposito']
+    assert [mudanca.entrada['tipo'] for mudanca in todas.ler(10)] == ['Saque']
+    assert [mudanca.entrada['tipo'] for mudanca in depositos.ler(10)] == ['Deposito']
+    assert todas.posicao == depositos.posicao == feed.proxima
+    assert todas.ler(10) == []
+
+
+def test_assinatura_lenta_perde_as_mais_antigas(novo_sistema, abrir_contas):
+    sistema, feed = _sistema_com_feed(novo_sistema, capacidade=4)
+    lenta = feed.assinar('lenta')
+    abrir_contas(sistema, 6, saldo=10)
+
+    lote = lenta.ler(100)
+
+    assert lenta.perdidas == 2
+    assert [mudanca.sequencia for mudanca in lote] == [3, 4, 5, 6]
+
+
+def test_cursor_confirmado_retoma_depois_do_reinicio(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema, feed = _sistema_com_feed(novo_sistema, BancoSQLite(caminho))
+    assinatura = feed.assinar('auditoria')
+    conta, = abrir_contas(sistema, 1, saldo=100)
+    conta.cliente.realizar_transacao(conta, banco.Deposito(20))
+    assinatura.ler(1)
+    assinatura.confirmar()
+    assinatura.ler(1)  # Lida mas não confirmada: é entregue de novo depois do reinício
+    novo_sistema.encerrar(sistema)
+
+    restaurado, feed = _sistema_com_feed(novo_sistema, BancoSQLite(caminho), capacidade=4)
+    restaurado.carregar_persistencia()
+    retomada = feed.assinar('auditoria')
+    conta = restaurado.contas[0]
+    conta.cliente.realizar_transacao(conta, banco.Saque(50))
+
+    # O que é anterior ao reinício vem do banco, num lote próprio; depois, o buffer
+    lote = retomada.ler(10) + retomada.ler(10)
+    assert [mudanca.sequencia for mudanca in lote] == [2, 3]
+    # A numeração continua de onde parou antes do reinício
+    assert [(mudanca.entrada['tipo'], mudanca.entrada['valor']) for mudanca in lote] == [('Deposito', 20), ('Saque', 50)]
+    assert retomada.perdidas == 0
@@ -0,0 +1,59 @@
+"""Gerador de carga: a mesma semente gera a mesma carga, válida para o domínio."""
+
+from datetime import datetime
+
+import validacao
+from gerador_carga import GeradorCarga, PerfilCarga
+
+DATA_FINAL = datetime(2025, 6, 30)
+
+
+def _gerador(semente=7, **kwargs):
+    kwargs.setdefault('clientes', 30)
+    kwargs.setdefault('dias', 10)
+    return GeradorCarga(PerfilCarga(data_final=DATA_FINAL, **kwargs), semente=semente)
+
+
+def test_mesma_semente_gera_a_mesma_carga():
+    primeiro, segundo = _gerador(), _gerador()
+
+    assert list(primeiro.clientes()) == list(segundo.clientes())
+    assert list(primeiro.transacoes()) == list(segundo.transacoes())
+    assert list(_gerador(semente=8).clientes()) != list(primeiro.clientes())
+
+
+def test_clientes_nao_mudam_com_a_mistura_de_transacoes():
+    padrao = _gerador()
+    so_depositos = _gerador(mix={'Deposito': 1.0})
+
+    assert list(padrao.clientes()) == list(so_depositos.clientes())
+    assert {tipo for _, _, tipo, _, _ in so_depositos.transacoes()} == {'Deposito'}
+
+
+def test_clientes_e_transacoes_sao_validos():
+    gerador = _gerador(clientes=200)
+    clientes = list(gerador.clientes())
+    transacoes = list(gerador.transacoes())
+
+    assert len({cliente['cpf'] for cliente in clientes}) == 200
+    assert all(validacao.cpf_valido(cliente['cpf']) for cliente in clientes)
+    assert all(validacao.data_valida(cliente['data_nascimento']) for cliente in clientes)
+    datas = [data for data, _, _, _, _ in transacoes]
+    assert datas == sorted(datas) and datas[-1] < datetime(2025, 7, 1)
+    assert all(destino is None or destino != conta for _, conta, _, _, destino in transacoes)
+
+
+def test_carregar_aplica_as_transacoes_nas_contas(novo_sistema):
+    sistema = novo_sistema()
+    gerador = _gerador()
+
+    estatisticas = gerador.carregar(sistema)
+
+    aplicadas = sum(len(conta.historico) for conta in sistema.contas)
+    transferencias = sum(1 for conta in sistema.contas for entrada in conta.historico.transacoes
+                         if entrada['tipo'] == 'Transferencia') // 2
+    assert estatisticas['clientes'] == len(sistema.contas) == 30
+    assert estatisticas['aplicadas'] == aplicadas - transferencias
+    assert estatisticas['aplicadas'] + sum(estatisticas['rejeitadas'].values()) == \
+        sum(1 for _ in gerador.transacoes())
+    assert all(conta.saldo >= 0 for conta in sistema.contas)
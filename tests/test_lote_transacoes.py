@@ -0,0 +1,61 @@
+"""Lotes de transações: tudo ou nada, também no banco."""
+
+import sqlite3
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from persistencia_sqlite import BancoSQLite
+from risco import EstagioRisco, LimiteRajada
+
+
+def test_lote_aprovado_aplica_todos_os_itens(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, outra = abrir_contas(sistema, 2, saldo=1000)
+
+    lote = banco.LoteTransacoes([banco.Deposito(100), banco.Saque(50), banco.Transferencia(200, outra),
+                                 (outra, banco.Saque(30))])
+    assert conta.cliente.realizar_transacao(conta, lote)
+
+    assert (conta.saldo, outra.saldo) == (850, 1170)
+    assert [entrada['tipo'] for entrada in conta.historico.transacoes[-3:]] == ['Deposito', 'Saque', 'Transferencia']
+    assert lote.recusa is None
+
+
+def test_lote_recusado_volta_todas_as_contas(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, outra = abrir_contas(sistema, 2, saldo=100)
+    antes = [(c.saldo, c.saques_realizados, len(c.historico)) for c in (conta, outra)]
+
+    lote = banco.LoteTransacoes([banco.Deposito(100), (outra, banco.Saque(10)), banco.Saque(600)])
+    assert not conta.cliente.realizar_transacao(conta, lote)
+
+    assert lote.recusa[0] == 2
+    assert [(c.saldo, c.saques_realizados, len(c.historico)) for c in (conta, outra)] == antes
+
+
+def test_lote_recusado_nao_grava_nada_no_banco(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho, tamanho_lote=1))
+    conta, = abrir_contas(sistema, 1, saldo=100)
+    sistema.persistencia.confirmar()
+
+    lote = banco.LoteTransacoes([banco.Deposito(50), banco.Saque(20), banco.Saque(500)])
+    assert not conta.cliente.realizar_transacao(conta, lote)
+    sistema.persistencia.confirmar()
+
+    with sqlite3.connect(caminho) as conexao:
+        assert conexao.execute("SELECT saldo FROM contas").fetchone() == (100,)
+        assert conexao.execute("SELECT COUNT(*) FROM historico").fetchone() == (1,)
+
+
+def test_lote_recusado_volta_a_janela_de_risco(novo_sistema, abrir_contas):
+    estagio = EstagioRisco(regras=[LimiteRajada(limite=2)], relogio=lambda: 100.0, registrar_metricas=False)
+    sistema = novo_sistema(estagio_risco=estagio)
+    conta, = abrir_contas(sistema, 1, saldo=1000)
+    janela = estagio.estatisticas(conta).janela(100.0)
+
+    lote = banco.LoteTransacoes([banco.Saque(10), banco.Saque(10), banco.Saque(600)])
+    assert not conta.cliente.realizar_transacao(conta, lote)
+
+    assert estagio.estatisticas(conta).janela(100.0) == janela
+    # Os dois saques recusados com o lote não contam para a rajada
+    assert conta.cliente.realizar_transacao(conta, banco.Saque(10))
@@ -0,0 +1,45 @@
+"""Pegada de memória: ajuste das retas, carga preguiçosa e medição em processo à parte."""
+
+import statistics
+
+import pytest
+
+import memoria
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from persistencia_sqlite import BancoSQLite
+
+
+def test_ajuste_coincide_com_a_regressao_da_biblioteca():
+    xs, ys = [1000, 2000, 4000, 8000], [51_000, 99_500, 203_000, 398_000]
+
+    inclinacao, intercepto, r2 = memoria._ajustar(xs, ys)
+
+    if hasattr(statistics, 'linear_regression'):
+        esperado = statistics.linear_regression(xs, ys)
+        assert (inclinacao, intercepto) == pytest.approx(tuple(esperado))
+        assert r2 == pytest.approx(statistics.correlation(xs, ys) ** 2)
+    assert memoria._ajustar([1, 2, 3], [5, 7, 9]) == pytest.approx((2.0, 3.0, 1.0))
+
+
+def test_pegada_preguicosa_mede_so_as_contas_em_memoria(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho))
+    abrir_contas(sistema, 6, saldo=10)
+    novo_sistema.encerrar(sistema)
+    restaurado = novo_sistema(persistencia=BancoSQLite(caminho))
+    restaurado.carregar_persistencia(preguicoso=True, capacidade=10)
+    conta = restaurado.buscar_conta(banco.AGENCIA_PADRAO, 2)
+    assert conta.saldo == 10
+
+    pegada = memoria.pegada_por_tipo(restaurado)
+
+    assert restaurado.registro.carregadas == 1
+    assert pegada['ContaCorrente']['quantidade'] == 1
+    assert pegada['entrada do Historico']['quantidade'] == 1
+
+
+def test_modelo_de_capacidade_mede_em_processos_separados():
+    modelo = memoria.modelo_capacidade(tamanhos=(20, 40), transacoes_por_conta=(0, 2))
+
+    assert len(modelo.medicoes) == 4
+    assert modelo.bytes_por_conta > 0 and modelo.bytes_por_transacao > 0
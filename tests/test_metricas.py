@@ -0,0 +1,73 @@
+"""Histogramas de latência, exposição Prometheus e ciclo de vida dos medidores."""
+
+import gc
+
+import metricas
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+
+
+class Dono:
+    def __init__(self, valor):
+        self.valor = valor
+
+
+def test_quantis_do_histograma_ficam_dentro_do_erro_dos_buckets():
+    histograma = metricas.HistogramaLatencia()
+    for valor in range(1, 1001):
+        histograma.registrar(valor * 1000)
+
+    assert (histograma.contagem, histograma.maximo) == (1000, 1_000_000)
+    for q in metricas.QUANTIS:
+        exato = q * 1_000_000
+        assert exato <= histograma.quantil(q) <= exato * 1.125
+
+
+def test_exposicao_prometheus_traz_latencias_resultados_e_medidores():
+    registro = metricas.RegistroMetricas()
+    registro.observar('Deposito', 2_000_000, 'sucesso')
+    registro.observar('Saque', 1_000, 'rejeitado')
+    registro.rejeicao('saldo_insuficiente')
+    registro.medidor('contas', lambda: 3, "Contas abertas")
+
+    texto = registro.formato_prometheus()
+
+    assert 'banco_operacao_latencia_segundos_count{operacao="Deposito"} 1' in texto
+    assert 'banco_operacoes_total{operacao="Saque",resultado="rejeitado"} 1' in texto
+    assert 'banco_rejeicoes_total{motivo="saldo_insuficiente"} 1' in texto
+    assert '# HELP banco_contas Contas abertas\n# TYPE banco_contas gauge\nbanco_contas 3' in texto
+
+
+def test_medidor_com_dono_nao_o_mantem_vivo():
+    registro = metricas.RegistroMetricas()
+    dono = Dono(7)
+    registro.medidor('valor', lambda objeto: objeto.valor, dono=dono)
+    assert registro.resumo()['medidores'] == {'valor': 7}
+
+    del dono
+    gc.collect()
+
+    assert registro.resumo()['medidores'] == {}
+
+
+def test_remover_medidores_devolve_o_nome_ao_dono_anterior():
+    registro = metricas.RegistroMetricas()
+    primeiro, segundo = Dono(1), Dono(2)
+    registro.medidor('valor', lambda objeto: objeto.valor, dono=primeiro)
+    registro.medidor('valor', lambda objeto: objeto.valor, dono=segundo)
+    assert registro.resumo()['medidores'] == {'valor': 2}
+
+    registro.remover_medidores(segundo)
+
+    assert registro.resumo()['medidores'] == {'valor': 1}
+
+
+def test_sistema_fechado_sai_do_registro_global(abrir_contas):
+    sistema = banco.SistemaBancario()
+    try:
+        abrir_contas(sistema, 2)
+        assert metricas.registro.resumo()['medidores']['contas'] == 2
+    finally:
+        sistema.fechar()
+
+    medidores = metricas.registro.resumo()['medidores']
+    assert 'contas' not in medidores and 'tarefas_ativas' not in medidores
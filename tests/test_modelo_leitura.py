@@ -0,0 +1,28 @@
+"""Modelo de leitura: projeções consistentes com as contas e encerramento da thread consumidora."""
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from modelo_leitura import ModeloLeitura
+
+
+def test_extrato_projetado_acompanha_a_conta(novo_sistema, abrir_contas):
+    sistema = novo_sistema(modelo_leitura=ModeloLeitura(limite_atraso=0, registrar_metricas=False))
+    conta, = abrir_contas(sistema, 1, saldo=100)
+    conta.cliente.realizar_transacao(conta, banco.Saque(30))
+
+    saldo, saques, transacoes = sistema.dados_extrato(conta)
+
+    assert (saldo, saques) == (70, 1)
+    assert [transacao['tipo'] for transacao in transacoes] == ['Deposito', 'Saque']
+
+
+def test_fechar_drena_a_fila_e_encerra_a_thread(novo_sistema, abrir_contas):
+    modelo = ModeloLeitura(registrar_metricas=False)
+    sistema = novo_sistema(modelo_leitura=modelo)
+    abrir_contas(sistema, 3, saldo=10)
+
+    novo_sistema.encerrar(sistema)
+
+    assert not modelo._thread.is_alive()
+    assert modelo.pendentes == 0
+    assert sorted(resumo['saldo'] for resumo in modelo.listar_contas()) == [10, 10, 10]
+    modelo.fechar()  # Fechar de novo não espera por uma thread que já terminou
@@ -0,0 +1,49 @@
+"""Detector de operações lentas: capturas gravadas fora da thread da operação, com rotação."""
+
+import json
+import os
+import threading
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from operacoes_lentas import DetectorLentidao
+
+
+def _detector(tmp_path, **kwargs):
+    return DetectorLentidao(limiar_ms=0, diretorio=str(tmp_path / "capturas"), registrar_metricas=False, **kwargs)
+
+
+def test_captura_e_gravada_pela_thread_escritora(tmp_path, novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1, saldo=10)
+    detector = _detector(tmp_path, modo='perfil')
+    gravacoes = []
+    gravar = detector._gravar
+
+    def registrar_thread(*argumentos):
+        gravacoes.append(threading.current_thread().name)
+        gravar(*argumentos)
+
+    detector._gravar = registrar_thread
+    with banco.travar_contas(conta):
+        with detector.monitorar('Conta.depositar', (conta, 5)):
+            sum(range(1000))
+        detector.aguardar()  # Não depende do lock da conta, que esta thread ainda segura
+
+    (arquivo, operacao, _), = detector.capturas()
+    assert operacao == 'Conta.depositar' and detector.total == 1
+    assert gravacoes and gravacoes[0].startswith('capturas-lentas')
+    with open(os.path.join(detector.diretorio, arquivo), encoding='utf-8') as entrada:
+        captura = json.load(entrada)
+    assert captura['argumentos'][0] == f"ContaCorrente {conta.agencia}/{conta.numero}"
+    assert captura['tamanho_historico'] == 1
+    assert 'cumulative' in captura['perfil']
+
+
+def test_diretorio_guarda_so_as_capturas_mais_recentes(tmp_path):
+    detector = _detector(tmp_path, maximo_capturas=2)
+    for indice in range(4):
+        with detector.monitorar(f'operacao.{indice}'):
+            pass
+
+    assert [operacao for _, operacao, _ in detector.capturas()] == ['operacao.3', 'operacao.2']
+    assert len(os.listdir(detector.diretorio)) == 2
@@ -0,0 +1,39 @@
+"""Persistência SQLite: ida e volta do estado e numeração depois de um reinício."""
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from persistencia_sqlite import BancoSQLite
+
+
+def _estado(conta):
+    return (conta.agencia, conta.numero, conta.cliente.cpf, round(conta.saldo, 2), conta.saques_realizados,
+            [dict(entrada) for entrada in conta.historico.transacoes])
+
+
+def test_estado_sobrevive_ao_reinicio(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho, janela_quente=2))
+    conta, outra = abrir_contas(sistema, 2, saldo=300)
+    conta.cliente.realizar_transacao(conta, banco.Saque(40))
+    conta.cliente.realizar_transacao(conta, banco.Transferencia(60, outra))
+    esperado = sorted(_estado(c) for c in sistema.contas)
+    novo_sistema.encerrar(sistema)
+
+    restaurado = novo_sistema(persistencia=BancoSQLite(caminho, janela_quente=2))
+    assert restaurado.carregar_persistencia() == 2
+
+    assert sorted(_estado(c) for c in restaurado.contas) == esperado
+    assert restaurado.buscar_cliente_por_cpf(conta.cliente.cpf).nome == conta.cliente.nome
+
+
+def test_numeracao_continua_depois_do_reinicio(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho))
+    abrir_contas(sistema, 2)
+    novo_sistema.encerrar(sistema)
+
+    restaurado = novo_sistema(persistencia=BancoSQLite(caminho))
+    restaurado.carregar_persistencia()
+    nova, = abrir_contas(restaurado, 1, inicio=3)
+
+    assert nova.numero == 3
+
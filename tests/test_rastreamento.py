@@ -0,0 +1,51 @@
+"""Rastreamento: spans aninhados de uma transação exportados no formato Chrome trace-event."""
+
+import json
+
+import pytest
+
+import rastreamento
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+
+
+@pytest.fixture
+def rastreador_ligado(tmp_path):
+    caminho = tmp_path / "trace.json"
+    rastreamento.configurar(str(caminho), taxa_amostragem=1.0)
+    yield caminho
+    rastreamento.rastreador.configurar(0.0, None)
+
+
+def _eventos(caminho):
+    rastreamento.rastreador.descarregar()
+    # O arquivo é um JSON Array sem o "]" final, aceito pelos visualizadores
+    return json.loads(caminho.read_text(encoding='utf-8') + "]")
+
+
+def test_deposito_gera_spans_aninhados_num_mesmo_trace(rastreador_ligado, novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1)
+    inicio = len(_eventos(rastreador_ligado))
+
+    conta.cliente.realizar_transacao(conta, banco.Deposito(50))
+
+    eventos = _eventos(rastreador_ligado)[inicio:]
+    raiz, = [evento for evento in eventos if evento['args']['pai_id'] is None]
+    assert raiz['name'].endswith('realizar_transacao') and raiz['ph'] == 'X'
+    assert len(eventos) > 1
+    assert {evento['args']['trace_id'] for evento in eventos} == {raiz['args']['trace_id']}
+    ids = {evento['args']['span_id'] for evento in eventos}
+    assert all(evento['args']['pai_id'] in ids for evento in eventos if evento is not raiz)
+    assert all(raiz['ts'] <= evento['ts'] and evento['dur'] <= raiz['dur'] for evento in eventos)
+
+
+def test_raiz_nao_amostrada_descarta_os_filhos(tmp_path):
+    exportador = rastreamento.ExportadorChromeTrace(str(tmp_path / "trace.json"))
+    rastreador = rastreamento.Rastreador(taxa_amostragem=1e-12, exportador=exportador)
+
+    with rastreador.span('raiz'):
+        with rastreador.span('filho') as filho:
+            filho.definir('valor', 1)
+    exportador.descarregar()
+
+    assert json.loads((tmp_path / "trace.json").read_text(encoding='utf-8') + "]") == []
@@ -0,0 +1,68 @@
+"""Estágio de risco: janela deslizante por conta, regras plugáveis e bloqueio antes do débito."""
+
+from types import SimpleNamespace
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from risco import BLOQUEAR, PERMITIR, SINALIZAR, DesvioValor, EstagioRisco, LimiteRajada, LimiteVelocidade
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+CONTA = SimpleNamespace(agencia='0001', numero=1)
+
+
+def _estagio(regras, relogio):
+    return EstagioRisco(regras, janela=60.0, baldes=12, orcamento_ns=10**12, relogio=relogio,
+                        registrar_metricas=False)
+
+
+def test_rajada_bloqueia_e_libera_quando_a_janela_passa():
+    relogio = Relogio()
+    estagio = _estagio([LimiteRajada(limite=2)], relogio)
+
+    acoes = [estagio.avaliar(CONTA, 'Saque', 10).acao for _ in range(3)]
+    relogio.agora += 61
+
+    assert acoes == [PERMITIR, PERMITIR, BLOQUEAR]
+    assert estagio.avaliar(CONTA, 'Saque', 10).acao == PERMITIR
+
+
+def test_debito_bloqueado_nao_entra_na_janela():
+    relogio = Relogio()
+    estagio = _estagio([LimiteVelocidade(limite=100)], relogio)
+
+    assert estagio.avaliar(CONTA, 'Saque', 80).acao == PERMITIR
+    decisao = estagio.avaliar(CONTA, 'Saque', 30)
+
+    assert (decisao.acao, decisao.motivos) == (BLOQUEAR, ['velocidade'])
+    assert estagio.estatisticas(CONTA).janela(relogio()) == (1, 80)
+    assert estagio.avaliar(CONTA, 'Saque', 20).acao == PERMITIR
+
+
+def test_valor_fora_do_tipico_sinaliza_sem_bloquear():
+    relogio = Relogio()
+    estagio = _estagio([DesvioValor(desvios=4.0, minimo_amostras=5), LimiteRajada(limite=100)], relogio)
+    for _ in range(5):
+        estagio.avaliar(CONTA, 'Saque', 50)
+
+    decisao = estagio.avaliar(CONTA, 'Saque', 500)
+
+    assert (decisao.acao, decisao.motivos) == (SINALIZAR, ['desvio_valor'])
+    assert estagio.avaliar(CONTA, 'Saque', 55).motivos == []
+
+
+def test_saque_bloqueado_nao_debita_a_conta(novo_sistema, abrir_contas):
+    sistema = novo_sistema(estagio_risco=_estagio([LimiteVelocidade(limite=100)], Relogio()))
+    conta, = abrir_contas(sistema, 1, saldo=400)
+
+    assert conta.cliente.realizar_transacao(conta, banco.Saque(90))
+    assert not conta.cliente.realizar_transacao(conta, banco.Saque(20))
+
+    assert conta.saldo == 310
+    assert [transacao['tipo'] for transacao in conta.historico.visao()] == ['Deposito', 'Saque']
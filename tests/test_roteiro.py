@@ -0,0 +1,64 @@
+"""Roteiros: uma linha JSON por comando, erros registrados sem interromper a execução."""
+
+import io
+import json
+
+from roteiro import ExecutorRoteiro
+from tests.conftest import criar_cliente
+
+ROTEIRO = """
+# Dois clientes, duas contas e algumas operações
+cliente "Ana" 01/01/1990 {cpf_a} "Rua A, 1 - Centro - Recife/PE"
+cliente "Bia" 01/01/1990 {cpf_b} "Rua B, 2 - Centro - Recife/PE"
+conta {cpf_a}
+conta {cpf_b}
+deposito 0001/1 500
+saque 1 800
+transferencia 0001/1 0001/2 120
+extrato 0001/2
+deposito 0001/9 10
+"""
+
+
+def _executar(sistema, texto, **kwargs):
+    saida = io.StringIO()
+    totais = ExecutorRoteiro(sistema, saida, **kwargs).executar(texto.splitlines())
+    return totais, [json.loads(linha) for linha in saida.getvalue().splitlines()]
+
+
+def _roteiro():
+    return ROTEIRO.format(cpf_a=criar_cliente(1).cpf, cpf_b=criar_cliente(2).cpf)
+
+
+def test_roteiro_reproduz_as_operacoes(novo_sistema):
+    sistema = novo_sistema()
+
+    (executados, erros), resultados = _executar(sistema, _roteiro())
+
+    assert (executados, erros) == (9, 1)
+    assert [resultado['ok'] for resultado in resultados] == [True] * 5 + [False, True, True, False]
+    assert resultados[5]['dados'] == {'saldo': 500}  # Saque acima do saldo: recusado, não é erro
+    assert resultados[7]['dados']['saldo'] == 120
+    assert resultados[8]['erro'] == "conta não encontrada: 0001/9"
+    assert resultados[8]['linha'] == 11  # Linhas em branco e comentários também contam
+
+
+def test_excecao_inesperada_vira_linha_de_erro_e_o_roteiro_continua(novo_sistema, monkeypatch):
+    sistema = novo_sistema()
+
+    def falhar(conta):
+        raise RuntimeError("projeção indisponível")
+
+    monkeypatch.setattr(sistema, 'dados_extrato', falhar)
+    (executados, erros), resultados = _executar(sistema, _roteiro())
+
+    assert (executados, erros) == (9, 2)
+    assert resultados[7]['erro'] == "RuntimeError: projeção indisponível"
+    assert resultados[8]['comando'] == 'deposito'
+
+
+def test_parar_no_erro_interrompe_o_roteiro(novo_sistema):
+    (executados, erros), resultados = _executar(novo_sistema(), "saque 1 10\ndeposito 1 10\n", parar_no_erro=True)
+
+    assert (executados, erros) == (1, 1)
+    assert len(resultados) == 1
@@ -0,0 +1,98 @@
+"""Tarefas em segundo plano: estado, falhas, cancelamento cooperativo e conciliação de saldos."""
+
+import sqlite3
+import threading
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+import tarefas
+from persistencia_sqlite import BancoSQLite
+
+
+def _gerenciador():
+    return tarefas.GerenciadorTarefas(registrar_metricas=False)
+
+
+def test_tarefa_conclui_ou_registra_a_falha():
+    gerenciador = _gerenciador()
+
+    def somar(tarefa, itens):
+        tarefa.informar(len(itens), len(itens))
+        return sum(itens)
+
+    def quebrar(tarefa):
+        raise RuntimeError("disco cheio")
+
+    concluida = gerenciador.submeter('somar', somar, [1, 2, 3])
+    falha = gerenciador.submeter('quebrar', quebrar)
+    gerenciador.fechar(cancelar=False)
+
+    assert (concluida.estado, concluida.resultado, concluida.percentual) == (tarefas.CONCLUIDA, 6, 100.0)
+    assert (falha.estado, falha.erro) == (tarefas.FALHOU, "RuntimeError: disco cheio")
+
+
+def test_cancelamento_interrompe_no_proximo_informar():
+    gerenciador = _gerenciador()
+    comecou = threading.Event()
+
+    def sem_fim(tarefa):
+        comecou.set()
+        feitos = 0
+        while True:
+            feitos += 1
+            tarefa.informar(feitos)
+
+    tarefa = gerenciador.submeter('sem_fim', sem_fim)
+    assert comecou.wait(timeout=10)
+
+    assert gerenciador.cancelar(tarefa.id)
+    gerenciador.fechar(cancelar=False)
+
+    assert tarefa.estado == tarefas.CANCELADA
+    assert not gerenciador.cancelar(tarefa.id)
+    assert gerenciador.tarefas(ativas=True) == []
+
+
+def test_conciliacao_aponta_saldo_que_nao_fecha_com_o_historico(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, outra = abrir_contas(sistema, 2, saldo=100)
+    conta.cliente.realizar_transacao(conta, banco.Transferencia(30, outra))
+    outra._saldo += 5
+
+    gerenciador = _gerenciador()
+    tarefa = gerenciador.submeter('conciliar', tarefas.conciliar_saldos, sistema)
+    gerenciador.fechar(cancelar=False)
+
+    assert tarefa.resultado == {'contas': 2, 'divergencias': [
+        {'agencia': outra.agencia, 'numero': outra.numero, 'saldo': 135, 'historico': 130}]}
+
+
+def test_conciliacao_no_banco_soma_os_historicos_persistidos(novo_sistema, abrir_contas, tmp_path):
+    sistema = novo_sistema(persistencia=BancoSQLite(str(tmp_path / "banco.db")))
+    conta, outra, _ = abrir_contas(sistema, 3, saldo=100)
+    conta.cliente.realizar_transacao(conta, banco.Saque(40))
+    conta.cliente.realizar_transacao(conta, banco.Transferencia(20, outra))
+
+    gerenciador = _gerenciador()
+    tarefa = gerenciador.submeter('conciliar', tarefas.conciliar_saldos, sistema)
+    gerenciador.fechar(cancelar=False)
+
+    assert tarefa.estado == tarefas.CONCLUIDA
+    assert tarefa.resultado == {'contas': 3, 'divergencias': []}
+    assert (tarefa.feitos, tarefa.total) == (3, 3)
+
+
+def test_conciliacao_no_banco_confere_as_suspeitas_na_memoria(novo_sistema, abrir_contas, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    sistema = novo_sistema(persistencia=BancoSQLite(caminho))
+    conta, outra = abrir_contas(sistema, 2, saldo=100)
+    sistema.persistencia.confirmar()
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute("UPDATE contas SET saldo = saldo + 5")
+    conta._saldo += 5  # Só esta diverge também na memória; a outra é um falso alarme do banco
+
+    gerenciador = _gerenciador()
+    tarefa = gerenciador.submeter('conciliar', tarefas.conciliar_saldos, sistema)
+    gerenciador.fechar(cancelar=False)
+
+    assert tarefa.resultado == {'contas': 2, 'divergencias': [
+        {'agencia': conta.agencia, 'numero': conta.numero, 'saldo': 105, 'historico': 100}]}
@@ -0,0 +1,108 @@
+"""Transferências atômicas, ordem dos locks e liquidação em lote."""
+
+import threading
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+
+
+class LockRegistrado:
+    """RLock que anota em ordem qual conta foi travada"""
+
+    def __init__(self, chave, ordem):
+        self._lock = threading.RLock()
+        self._chave = chave
+        self._ordem = ordem
+
+    def acquire(self, blocking=True, timeout=-1):
+        adquirido = self._lock.acquire(blocking, timeout)
+        if adquirido:
+            self._ordem.append(self._chave)
+        return adquirido
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *excecao):
+        self.release()
+
+
+def test_transferencia_debita_credita_e_liga_as_pontas(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    origem, destino = abrir_contas(sistema, 2, saldo=100)
+
+    assert origem.cliente.realizar_transacao(origem, banco.Transferencia(30, destino))
+
+    assert (origem.saldo, destino.saldo) == (70, 130)
+    debito, credito = origem.historico.transacoes[-1], destino.historico.transacoes[-1]
+    assert (debito['direcao'], credito['direcao']) == ('debito', 'credito')
+    assert debito['id_transferencia'] == credito['id_transferencia']
+    assert debito['contrapartida'] == f"{destino.agencia}/{destino.numero}"
+    assert credito['contrapartida'] == f"{origem.agencia}/{origem.numero}"
+
+
+def test_transferencia_recusada_nao_altera_nenhuma_conta(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    origem, destino = abrir_contas(sistema, 2, saldo=100)
+    historicos = (len(origem.historico), len(destino.historico))
+
+    assert not origem.cliente.realizar_transacao(origem, banco.Transferencia(500, destino))
+
+    assert (origem.saldo, destino.saldo) == (100, 100)
+    assert (len(origem.historico), len(destino.historico)) == historicos
+
+
+def test_locks_sao_adquiridos_em_ordem_de_chave(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    contas = abrir_contas(sistema, 3)
+    ordem = []
+    for conta in contas:
+        conta._lock = LockRegistrado(conta.numero, ordem)
+
+    with banco.travar_contas(contas[2], contas[0], contas[1], contas[0]):
+        pass
+
+    assert ordem == sorted(conta.numero for conta in contas)
+
+
+def test_transferencias_cruzadas_nao_entram_em_deadlock(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta_a, conta_b = abrir_contas(sistema, 2, saldo=1000)
+    inicio = threading.Barrier(2)
+
+    def transferir(origem, destino):
+        inicio.wait()
+        for _ in range(200):
+            with banco.travar_contas(origem, destino):
+                origem.transferir(1, destino)
+
+    threads = [threading.Thread(target=transferir, args=(conta_a, conta_b)),
+               threading.Thread(target=transferir, args=(conta_b, conta_a))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert conta_a.saldo + conta_b.saldo == 2000
+
+
+def test_liquidacao_aplica_so_o_liquido_de_cada_par(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta_a, conta_b = abrir_contas(sistema, 2, saldo=100)
+    liquidacao = banco.LiquidacaoTransferencias()
+    liquidacao.adicionar(conta_a, conta_b, 50)
+    liquidacao.adicionar(conta_b, conta_a, 20)
+    liquidacao.adicionar(conta_a, conta_b, 10)
+
+    resultados = liquidacao.liquidar()
+
+    assert len(resultados) == 1
+    resultado = resultados[0]
+    assert (resultado['origem'], resultado['destino']) == (conta_a, conta_b)
+    assert (resultado['valor'], resultado['quantidade'], resultado['sucesso']) == (40, 3, True)
+    assert (conta_a.saldo, conta_b.saldo) == (60, 140)
+    assert liquidacao.pendentes == 0
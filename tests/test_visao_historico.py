@@ -0,0 +1,45 @@
+"""Visões MVCC do histórico: leituras estáveis enquanto a conta continua recebendo lançamentos."""
+
+import pytest
+
+import sistema_bancario_POO_decoradores_relatorios_limites as banco
+from armazenamento_historico import ArmazenamentoHistorico
+
+
+def test_visao_nao_enxerga_lancamentos_posteriores(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1, saldo=10)
+    visao = conta.historico.visao()
+
+    conta.cliente.realizar_transacao(conta, banco.Deposito(5))
+
+    assert (len(visao), visao.versao) == (1, 1)
+    assert [transacao['valor'] for transacao in visao] == [10]
+    assert len(conta.historico.visao()) == 2
+    with pytest.raises(IndexError):
+        visao[1]
+
+
+def test_entradas_da_visao_sao_somente_leitura(novo_sistema, abrir_contas):
+    sistema = novo_sistema()
+    conta, = abrir_contas(sistema, 1, saldo=10)
+
+    with pytest.raises(TypeError):
+        conta.historico.visao()[0]['valor'] = 1_000_000
+
+    assert conta.historico.visao()[-1]['valor'] == 10
+
+
+def test_visao_continua_valida_depois_da_descarga(tmp_path, novo_sistema, abrir_contas):
+    sistema = novo_sistema(armazenamento_historico=ArmazenamentoHistorico(str(tmp_path), janela_quente=2))
+    conta, = abrir_contas(sistema, 1)
+    for valor in range(1, 5):
+        conta.cliente.realizar_transacao(conta, banco.Deposito(valor))
+    visao = conta.historico.visao()
+
+    conta.historico.descarregar()
+    conta.cliente.realizar_transacao(conta, banco.Deposito(5))
+
+    assert [transacao['valor'] for transacao in visao] == [1, 2, 3, 4]
+    assert [transacao['valor'] for transacao in conta.historico.visao()] == [1, 2, 3, 4, 5]
+    assert conta.historico.visao()[0]['valor'] == 1
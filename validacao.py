@@ -0,0 +1,55 @@
+"""Validações de cadastro de clientes: CPF com dígitos verificadores, data e endereço."""
+
+from datetime import datetime
+import re
+
+
+_DATA = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+_NAO_DIGITOS = re.compile(r'[^0-9]')  # Só ASCII: isdigit() e \d aceitam '²', '٣'...
+_CPF = re.compile(r'[0-9]{11}')
+_UFS = frozenset((
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+))
+
+
+def digitos_verificadores_cpf(base):
+    """Calcula os dois dígitos verificadores para os 9 primeiros dígitos do CPF"""
+    digitos = [int(d) for d in base]
+    for peso_inicial in (10, 11):
+        soma = sum(d * peso for d, peso in zip(digitos, range(peso_inicial, 1, -1)))
+        resto = soma * 10 % 11
+        digitos.append(0 if resto == 10 else resto)
+    return f"{digitos[-2]}{digitos[-1]}"
+
+
+def normalizar_cpf(cpf):
+    """Remove pontuação do CPF (529.982.247-25 -> 52998224725)"""
+    return _NAO_DIGITOS.sub('', cpf)
+
+
+def cpf_valido(cpf):
+    """Valida o CPF: 11 dígitos, não repetidos, com os dígitos verificadores corretos"""
+    if not _CPF.fullmatch(cpf) or cpf == cpf[0] * 11:
+        return False
+    return digitos_verificadores_cpf(cpf[:9]) == cpf[9:]
+
+
+def data_valida(data, hoje=None):
+    """Valida uma data DD/MM/AAAA existente e que não esteja no futuro"""
+    if not _DATA.fullmatch(data):
+        return False
+    try:
+        convertida = datetime.strptime(data, '%d/%m/%Y')
+    except ValueError:
+        return False
+    return convertida <= (hoje or datetime.now())
+
+
+def motivo_endereco_invalido(logradouro, numero, bairro, cidade, sigla_estado):
+    """Retorna o motivo da rejeição do endereço, ou None se ele for válido"""
+    if not all([logradouro, numero, bairro, cidade, sigla_estado]):
+        return "endereco_incompleto"
+    if sigla_estado.upper() not in _UFS:
+        return "uf_invalida"
+    return None